@@ -2,23 +2,16 @@
 # Purpose: Create the main agent using LangGraph's create_react_agent with streaming support
 
 from typing import Any, Dict, List, AsyncGenerator
-from langchain_core.messages import AnyMessage, SystemMessage
+from langchain_core.messages import AIMessage, AnyMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
 from langgraph.graph import StateGraph
 from langgraph.prebuilt.chat_agent_executor import AgentState
 
 from agent.state import AgentState as VisaAgentState, validate_agent_state, create_error_record
-from agent.prompts import get_system_prompt
-from config.settings import llm, stream_llm_safe, app_config
-from tools.greetings import greetings_tool
-from tools.visa_information import general_enquiry_tool  
-from tools.application_basic import base_information_collector_tool
-from tools.database_visa_lookup import database_visa_lookup_tool
-from tools.workflow_executor import workflow_executor_tool
-from tools.application_detailed import application_detailed_tool
-from tools.document_processing import document_processing_tool
-from tools.session_management import session_management_tool
-from tools.start_workflow_tool import start_detailed_application_process
+from agent.prompts import get_system_prompt_segments
+from agent.router import IntentRouter
+from agent.tool_registry import tool_registry
+from config.settings import llm, llm_config, stream_llm_safe, app_config
 
 
 class VisaAssistantAgent:
@@ -30,25 +23,21 @@ class VisaAssistantAgent:
     def __init__(self):
         self.tools = self._initialize_tools()
         self.agent = self._create_agent()
+        self.router = IntentRouter(
+            self.tools,
+            threshold=app_config.intent_router_threshold,
+            enabled=app_config.intent_router_enabled
+        )
         
     def _initialize_tools(self) -> List:
-        """Initialize all available tools for the agent"""
-        tools = [
-            greetings_tool,
-            general_enquiry_tool,
-            base_information_collector_tool,
-            database_visa_lookup_tool,
-            workflow_executor_tool,
-            application_detailed_tool,
-            document_processing_tool,
-            session_management_tool,
-            start_detailed_application_process
-        ]
-        return tools
+        """Initialize all available tools for the agent (see agent/tool_registry.py)"""
+        return tool_registry.tools()
     
     def _create_agent(self):
         """Create the React Agent with custom state and prompt"""
         
+        use_cache_control = any(name in llm_config.model_name.lower() for name in ("anthropic", "claude"))
+        
         def custom_prompt(state: VisaAgentState) -> List[AnyMessage]:
             """
             Generate system prompt based on current state context.
@@ -59,11 +48,18 @@ class VisaAssistantAgent:
             if not is_valid:
                 print(f"State validation issues: {issues}")
             
-            # Get base system prompt
-            system_prompt = get_system_prompt(state)
+            # Get base system prompt (static prefix + memoized context segment)
+            static_prefix, context_prompt = get_system_prompt_segments(state)
             
             # Add system message to conversation
-            messages = [SystemMessage(content=system_prompt)]
+            if use_cache_control:
+                # Anthropic only caches blocks marked explicitly; Gemini caches matching prefixes implicitly
+                messages = [SystemMessage(content=[
+                    {"type": "text", "text": static_prefix, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": context_prompt}
+                ])]
+            else:
+                messages = [SystemMessage(content=f"{static_prefix}\n\n{context_prompt}")]
             
             # Add conversation history
             if state.get("messages"):
@@ -103,6 +99,36 @@ class VisaAssistantAgent:
             print(f"Agent invocation error: {e}")
             return self._handle_agent_error(input_data, str(e))
     
+    async def ainvoke(self, input_data: Dict[str, Any], config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Async invoke for API handlers - runs the ReAct loop without blocking the event loop.
+        Sync tools are dispatched by LangGraph to the loop's default (bounded) executor.
+        """
+        try:
+            # Prepare state with safety checks
+            state = self._prepare_state(input_data)
+            
+            # High-confidence trivial turns skip the ReAct planning call
+            routed = await self.router.route(state, config)
+            if routed:
+                return self._process_result({
+                    **state,
+                    "messages": list(state["messages"]) + [AIMessage(content=routed["response"])]
+                })
+            
+            # Invoke agent with config if provided
+            if config:
+                result = await self.agent.ainvoke(state, config=config)
+            else:
+                result = await self.agent.ainvoke(state)
+            
+            # Validate and clean result
+            return self._process_result(result)
+            
+        except Exception as e:
+            print(f"Agent invocation error: {e}")
+            return self._handle_agent_error(input_data, str(e))
+    
     async def stream(self, input_data: Dict[str, Any], config: Dict[str, Any] = None) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream agent responses for real-time UI updates.
@@ -111,6 +137,17 @@ class VisaAssistantAgent:
         try:
             # Prepare state
             state = self._prepare_state(input_data)
+            
+            # High-confidence trivial turns skip the ReAct planning call
+            routed = await self.router.route(state, config)
+            if routed:
+                yield {
+                    "token": routed["response"],
+                    "type": "token",
+                    "metadata": {"langgraph_node": "router", "intent": routed["intent"]}
+                }
+                return
+            
             # Stream with messages mode for token-level streaming (following LangGraph docs)
             if config:
                 async for message_chunk, metadata in self.agent.astream(state, stream_mode="messages", config=config):
@@ -280,6 +317,10 @@ def invoke_agent(input_data: Dict[str, Any], config: Dict[str, Any] = None) -> D
     """Invoke the visa agent with input data"""
     return visa_agent.invoke(input_data, config)
 
+async def ainvoke_agent(input_data: Dict[str, Any], config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Invoke the visa agent asynchronously with input data"""
+    return await visa_agent.ainvoke(input_data, config)
+
 async def stream_agent(input_data: Dict[str, Any], config: Dict[str, Any] = None) -> AsyncGenerator[Dict[str, Any], None]:
     """Stream visa agent responses"""
     async for chunk in visa_agent.stream(input_data, config):
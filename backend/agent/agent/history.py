@@ -0,0 +1,295 @@
+# Conversation history compaction
+# Purpose: Keep the prompt bounded on long threads by folding older turns into
+# `conversation_summary`, keeping a sliding window of recent turns verbatim and
+# pinning workflow facts (basic info, visa recommendation) that must not be paraphrased
+
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from config.settings import app_config, ainvoke_llm_safe
+
+
+# Markers the system prompt tells the agent to look for in earlier messages
+BASIC_INFO_MARKER = "BASIC_INFO_COMPLETE"
+RECOMMENDATION_MARKER = "recommend the **"
+
+# Per-message cap when rendering older turns for the summarizer
+SUMMARY_INPUT_CHARS = 500
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for thresholds and reporting"""
+    return len(text) // 4
+
+
+def _message_text(message: Any) -> str:
+    content = getattr(message, "content", "")
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content or "")
+
+
+def _messages_tokens(messages: List[Any]) -> int:
+    return sum(estimate_tokens(_message_text(message)) for message in messages)
+
+
+class ConversationCompactor:
+    """
+    Folds older turns into a running summary once a thread crosses the turn or token
+    threshold.
+
+    A turn starts at a HumanMessage; the window is cut only on those boundaries so an
+    AI tool call is never separated from its tool result. Summaries are incremental:
+    the previous summary plus the turns being dropped are condensed into a new one.
+    Workflow facts are pinned verbatim from the dropped messages, since later tool
+    selection depends on their exact wording.
+
+    Compaction runs in the background after a turn's reply has been saved, so the
+    summarization round trip never delays the user, and its write is checked
+    against the thread's revision so it never overwrites a newer turn. A token-triggered compaction
+    is skipped when the kept window alone is over budget, since dropping older
+    turns could not bring the thread back under it.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_turns: int,
+        max_tokens: int,
+        keep_recent_turns: int,
+        summary_max_words: int
+    ):
+        self.enabled = enabled
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.summary_max_words = summary_max_words
+        self.compactions = 0
+        self.failures = 0
+        self.turns = 0
+        self.saved_tokens = 0
+        self.skipped = 0
+        self.conflicts = 0
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def record_turn(self, state: Dict[str, Any]) -> int:
+        """Count a turn; returns the estimated prompt tokens saved versus the full history"""
+        if not self.enabled:
+            return 0
+
+        saved = self._saved_tokens(state)
+        self.turns += 1
+        self.saved_tokens += saved
+        if state.get("compacted_tokens"):
+            print(f"DEBUG HISTORY: {len(state['messages'])} messages in window, "
+                  f"~{saved} prompt tokens saved this turn")
+        return saved
+
+    def schedule(self, thread_id: str, state: Dict[str, Any], store: Any) -> None:
+        """
+        Compact a thread in the background once its turn is saved. `store` is the
+        thread state store (`revision`, `get` and a revision-checked `save`).
+        """
+        if not self.enabled or thread_id in self._running or self._split(state) is None:
+            return
+
+        self._running.add(thread_id)
+        task = asyncio.get_running_loop().create_task(self.compact(thread_id, state, store))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def compact(self, thread_id: str, state: Dict[str, Any], store: Any) -> bool:
+        """
+        Fold older turns into the summary and save the state; False if nothing changed.
+
+        The write only succeeds if the thread's revision is still the one read
+        before summarizing. If another worker saved a turn meanwhile, the newer
+        state is reloaded once and the summary applied to it; if that also
+        conflicts, or the older turns are no longer its prefix, compaction is skipped.
+        """
+        try:
+            revision = store.revision(thread_id)
+            split = self._split(state)
+            if split is None:
+                return False
+            older, recent = split
+
+            summary = await self._summarize(state.get("conversation_summary"), older)
+            if summary is None:
+                # Keep the full history; the next turn retries
+                self.failures += 1
+                return False
+
+            if self._starts_with(state, older):
+                compacted = self._compacted(state, summary, older)
+                if await store.save(thread_id, compacted, expected_revision=revision):
+                    # Turns this worker appended during the save stay after the kept window
+                    state.update({**compacted, "messages": state["messages"][len(older):]})
+                    self._record_compaction(older, compacted)
+                    return True
+
+            # Another worker saved the thread (or this copy was replaced): retry once on the newest state
+            latest = await store.get(thread_id)
+            if latest is not None and self._starts_with(latest, older):
+                compacted = self._compacted(latest, summary, older)
+                if await store.save(thread_id, compacted, expected_revision=store.revision(thread_id)):
+                    self._record_compaction(older, compacted)
+                    return True
+
+            self.conflicts += 1
+            print(f"Skipped compaction for {thread_id}: history changed while summarizing")
+            return False
+        except Exception as e:
+            self.failures += 1
+            print(f"Conversation compaction failed for {thread_id}: {e}")
+            return False
+        finally:
+            self._running.discard(thread_id)
+
+    def _split(self, state: Dict[str, Any]) -> Optional[Tuple[List[Any], List[Any]]]:
+        """(older, recent) messages when a threshold is crossed, else None"""
+        messages = state.get("messages", [])
+        turn_starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+        if len(turn_starts) <= self.keep_recent_turns:
+            return None
+
+        cut = turn_starts[-self.keep_recent_turns]
+        older, recent = messages[:cut], messages[cut:]
+        if len(turn_starts) > self.max_turns:
+            return older, recent
+
+        if _messages_tokens(messages) > self.max_tokens:
+            if _messages_tokens(recent) > self.max_tokens:
+                # The kept window alone is over budget; compacting would re-trigger every turn
+                self.skipped += 1
+                return None
+            return older, recent
+        return None
+
+    @staticmethod
+    def _starts_with(state: Dict[str, Any], older: List[Any]) -> bool:
+        """True if the state's messages still begin with `older` (by type and content, so reloaded copies compare equal)"""
+        messages = state.get("messages", [])
+        return len(messages) >= len(older) and all(
+            a is b or (getattr(a, "type", None) == getattr(b, "type", None) and _message_text(a) == _message_text(b))
+            for a, b in zip(messages, older)
+        )
+
+    def _compacted(self, state: Dict[str, Any], summary: str, older: List[Any]) -> Dict[str, Any]:
+        """A copy of the state with `older` folded into `summary`"""
+        pinned = dict(state.get("pinned_facts") or {})
+        pinned.update(self._extract_pinned_facts(older))
+        self._pin_state_facts(state, pinned)
+
+        return {
+            **state,
+            "conversation_summary": summary,
+            "pinned_facts": pinned,
+            "compacted_tokens": state.get("compacted_tokens", 0) + _messages_tokens(older),
+            "messages": list(state.get("messages", [])[len(older):])
+        }
+
+    def _record_compaction(self, older: List[Any], compacted: Dict[str, Any]) -> None:
+        self.compactions += 1
+        print(f"Compacted {len(older)} older messages into conversation summary "
+              f"({len(compacted['messages'])} recent messages kept)")
+
+    async def _summarize(self, previous_summary: Optional[str], older: List[Any]) -> Optional[str]:
+        transcript = "\n".join(
+            f"{getattr(message, 'type', 'message')}: {_message_text(message)[:SUMMARY_INPUT_CHARS]}"
+            for message in older
+            if _message_text(message).strip()
+        )
+        prompt = f"""Update the running summary of a visa assistant conversation.
+
+PREVIOUS SUMMARY:
+{previous_summary or "(none)"}
+
+NEW MESSAGES TO FOLD IN:
+{transcript}
+
+Write the updated summary in at most {self.summary_max_words} words. Keep the destination
+country, purpose of travel, travellers, dates, any visa type discussed or recommended,
+questions the user already asked and what is still pending. Plain text, no preamble."""
+
+        try:
+            response = await ainvoke_llm_safe([HumanMessage(content=prompt)])
+            summary = _message_text(response).strip()
+            return summary or None
+        except Exception as e:
+            print(f"Conversation summarization failed: {e}")
+            return None
+
+    def _extract_pinned_facts(self, messages: List[Any]) -> Dict[str, str]:
+        """Latest verbatim workflow markers found in the messages being dropped"""
+        facts = {}
+        for message in messages:
+            text = _message_text(message)
+            if BASIC_INFO_MARKER in text:
+                facts["basic_info"] = re.split(r"\n\s*\n", text.strip(), maxsplit=1)[0][:SUMMARY_INPUT_CHARS]
+            if getattr(message, "type", None) == "ai" and RECOMMENDATION_MARKER in text:
+                for line in text.splitlines():
+                    if RECOMMENDATION_MARKER in line:
+                        facts["visa_recommendation"] = line.strip()[:SUMMARY_INPUT_CHARS]
+                        break
+        return facts
+
+    def _pin_state_facts(self, state: Dict[str, Any], pinned: Dict[str, str]) -> None:
+        initial_info = state.get("initial_info")
+        if initial_info:
+            pinned["initial_info"] = ", ".join(f"{key}: {value}" for key, value in initial_info.items() if value)
+        if state.get("country_code"):
+            pinned["country_code"] = state["country_code"]
+
+    def _saved_tokens(self, state: Dict[str, Any]) -> int:
+        """Tokens of dropped history minus what the summary and pinned facts add back"""
+        compacted = state.get("compacted_tokens", 0)
+        if not compacted:
+            return 0
+        overhead = estimate_tokens(state.get("conversation_summary") or "")
+        overhead += sum(estimate_tokens(value) for value in (state.get("pinned_facts") or {}).values())
+        return max(0, compacted - overhead)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "compactions": self.compactions,
+            "failures": self.failures,
+            "skipped_over_budget_window": self.skipped,
+            "skipped_on_conflict": self.conflicts,
+            "running": len(self._running),
+            "turns": self.turns,
+            "prompt_tokens_saved": self.saved_tokens,
+            "avg_prompt_tokens_saved_per_turn": round(self.saved_tokens / self.turns, 1) if self.turns else 0.0
+        }
+
+
+def build_history_context(state: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Summary and pinned-facts prompt blocks for the system prompt, if any"""
+    summary_block = None
+    pinned_block = None
+    if state.get("conversation_summary"):
+        summary_block = f"""
+EARLIER CONVERSATION (summarized):
+{state["conversation_summary"]}"""
+    pinned = state.get("pinned_facts")
+    if pinned:
+        lines = "\n".join(f"- {key}: {value}" for key, value in pinned.items())
+        pinned_block = f"""
+PINNED WORKFLOW FACTS (verbatim from earlier turns):
+{lines}"""
+    return summary_block, pinned_block
+
+
+# Global compactor
+conversation_compactor = ConversationCompactor(
+    enabled=app_config.history_compaction_enabled,
+    max_turns=app_config.history_max_turns,
+    max_tokens=app_config.history_max_tokens,
+    keep_recent_turns=app_config.history_keep_turns,
+    summary_max_words=app_config.history_summary_max_words
+)
@@ -0,0 +1,220 @@
+# Knowledge base subsystem for visa information
+# Purpose: Preload every knowledge_base/{country}/visa_info.json once, index it by section,
+# hot-reload on file change, and hand the LLM only the sections a question needs
+
+import json
+import os
+import pprint
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from agent.response_cache import content_hash
+
+
+KNOWLEDGE_BASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "knowledge_base")
+KNOWLEDGE_FILE = "visa_info.json"
+
+# Sections sent with every question - small and useful for context
+BASE_SECTIONS = ["visa_type", "overview"]
+
+# Sections for broad questions ("Vietnam visa requirements?") that match no topic
+DEFAULT_SECTIONS = ["required_documents", "validity_and_usage", "processing_timeline"]
+
+# Question keywords -> sections that answer them
+TOPIC_SECTIONS = {
+    "documents": (
+        {"document", "documents", "docs", "passport", "photo", "photos", "picture", "requirements", "requirement", "need", "bring"},
+        ["required_documents", "document_verification", "eligibility_requirements"]
+    ),
+    "fees": (
+        {"fee", "fees", "cost", "costs", "price", "pricing", "pay", "payment", "charge", "charges", "expensive", "refund"},
+        []  # Fees live in overview.cost, which is always included
+    ),
+    "processing_time": (
+        {"long", "processing", "time", "days", "fast", "quick", "urgent", "emergency", "expedite", "timeline", "wait"},
+        ["processing_timeline"]
+    ),
+    "ports_of_entry": (
+        {"port", "ports", "airport", "airports", "border", "borders", "gate", "gates", "seaport", "seaports", "land", "entry", "enter"},
+        ["entry_ports"]
+    ),
+    "validity": (
+        {"valid", "validity", "stay", "duration", "expire", "expiry", "extend", "extension", "overstay", "multiple", "single"},
+        ["validity_and_usage"]
+    ),
+    "process": (
+        {"steps", "step", "process", "procedure", "how", "apply", "application", "online", "submit"},
+        ["application_process", "common_mistakes"]
+    ),
+    "eligibility": (
+        {"eligible", "eligibility", "exempt", "exemption", "children", "child", "kids", "nationality", "citizens"},
+        ["eligibility_requirements", "special_cases"]
+    ),
+    "problems": (
+        {"rejected", "refused", "denied", "wrong", "mistake", "mistakes", "error", "status", "track", "check"},
+        ["troubleshooting", "common_mistakes"]
+    ),
+    "contact": (
+        {"contact", "support", "helpline", "email", "phone", "embassy"},
+        ["contact_information", "official_websites"]
+    ),
+    "updates": (
+        {"new", "latest", "recent", "update", "updates", "changes", "change", "2025"},
+        ["recent_updates"]
+    ),
+}
+
+# Sections used by the application workflow, never needed to answer enquiries
+EXCLUDED_SECTIONS = {"application_form_fields", "assumed_defaults", "ai_workflow_steps"}
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split()
+
+
+class CountryKnowledge:
+    """Parsed knowledge for one country with a pre-rendered section index"""
+
+    def __init__(self, country: str, path: str, data: Dict[str, Any], mtime: float):
+        self.country = country
+        self.path = path
+        self.data = data
+        self.mtime = mtime
+        self.content_hash = content_hash(data)
+
+        # Pre-render each section once instead of pprinting the whole file per request
+        self.sections: Dict[str, str] = {
+            name: pprint.pformat(value, indent=2, width=100)
+            for name, value in data.items()
+            if name not in EXCLUDED_SECTIONS
+        }
+        self.full_size = sum(len(text) for text in self.sections.values())
+
+        # Section-name words ("entry_ports" -> entry, ports) and FAQ keys are searchable too
+        self.keyword_index: Dict[str, List[str]] = {}
+        for name in self.sections:
+            for word in name.split("_"):
+                if len(word) > 3 and word != "visa":
+                    self.keyword_index.setdefault(word, []).append(name)
+        for faq_key in (data.get("faqs") or {}):
+            for word in faq_key.split("_"):
+                if len(word) > 3:
+                    self.keyword_index.setdefault(word, []).append("faqs")
+
+    def select_sections(self, question: str) -> List[str]:
+        """Return the section names relevant to a question, in file order"""
+        words = set(_tokenize(question))
+        selected = set()
+
+        for keywords, sections in TOPIC_SECTIONS.values():
+            if words & keywords:
+                selected.update(sections)
+
+        for word in words:
+            selected.update(self.keyword_index.get(word, []))
+
+        if not selected - set(BASE_SECTIONS):
+            selected.update(DEFAULT_SECTIONS)
+        selected.update(BASE_SECTIONS)
+
+        return [name for name in self.sections if name in selected]
+
+
+class KnowledgeBase:
+    """
+    In-memory visa knowledge base.
+
+    All country files are loaded at construction. Accessors re-check file mtimes at
+    most every `reload_interval` seconds and reload changed or new countries.
+    """
+
+    def __init__(self, base_dir: str = KNOWLEDGE_BASE_DIR, reload_interval: float = 5.0):
+        self.base_dir = base_dir
+        self.reload_interval = reload_interval
+        self._countries: Dict[str, CountryKnowledge] = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.context_chars_sent = 0
+        self.context_chars_full = 0
+        self.load_all()
+
+    def load_all(self) -> None:
+        """Scan the knowledge directory and (re)load every changed country file"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            if not os.path.isdir(self.base_dir):
+                print(f"Knowledge base directory not found: {self.base_dir}")
+                return
+
+            found = set()
+            for country in sorted(os.listdir(self.base_dir)):
+                path = os.path.join(self.base_dir, country, KNOWLEDGE_FILE)
+                if not os.path.isfile(path):
+                    continue
+                found.add(country)
+
+                mtime = os.path.getmtime(path)
+                current = self._countries.get(country)
+                if current and current.mtime == mtime:
+                    continue
+
+                try:
+                    with open(path, "r") as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    # Keep serving the last good version if an edit is mid-write or invalid
+                    print(f"Knowledge base load failed for {country}: {e}")
+                    continue
+
+                if current:
+                    self.reloads += 1
+                    print(f"Knowledge base reloaded for {country}")
+                self._countries[country] = CountryKnowledge(country, path, data, mtime)
+
+            for country in set(self._countries) - found:
+                del self._countries[country]
+
+    def get(self, country: str) -> Optional[CountryKnowledge]:
+        """Get knowledge for a country (lowercase directory name)"""
+        if not country:
+            return None
+        self._maybe_reload()
+        return self._countries.get(country.lower())
+
+    def relevant_context(self, country: str, question: str) -> Optional[str]:
+        """Render only the sections relevant to the question, or None if the country is unknown"""
+        knowledge = self.get(country)
+        if not knowledge:
+            return None
+
+        sections = knowledge.select_sections(question)
+        context = "\n\n".join(f"{name.upper()}:\n{knowledge.sections[name]}" for name in sections)
+
+        self.context_chars_sent += len(context)
+        self.context_chars_full += knowledge.full_size
+        return context
+
+    def countries(self) -> List[str]:
+        self._maybe_reload()
+        return sorted(self._countries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Load and prompt-size counters for monitoring"""
+        return {
+            "countries": sorted(self._countries),
+            "reloads": self.reloads,
+            "context_chars_sent": self.context_chars_sent,
+            "context_chars_full": self.context_chars_full,
+            "context_reduction": round(1 - self.context_chars_sent / self.context_chars_full, 4) if self.context_chars_full else 0.0
+        }
+
+    def _maybe_reload(self) -> None:
+        if time.monotonic() - self._last_check >= self.reload_interval:
+            self.load_all()
+
+
+# Global knowledge base, loaded at import (process startup)
+knowledge_base = KnowledgeBase(reload_interval=float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "5")))
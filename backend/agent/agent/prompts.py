@@ -1,19 +1,17 @@
 # System prompts for visa assistant agent
 # Purpose: Define the agent's personality, role, and behavior guidelines
 
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
 from agent.state import AgentState
+from agent.history import build_history_context, estimate_tokens
 
 
-def get_system_prompt(state: AgentState) -> str:
-    """
-    Generate context-aware system prompt based on current agent state.
-    Provides agent with relevant instructions and context.
-    """
-    
-    
-    # Base system prompt
-    base_prompt = """You are a professional visa assistant agent with access to specialized tools. Your role is to help users with visa consultations and applications.
+# Static instructions shared by every model call. Built once at import and always sent
+# first, byte-identical, so provider-side prompt caching (Gemini implicit caching,
+# Anthropic cache_control) can reuse it; only the small context segment varies.
+STATIC_SYSTEM_PROMPT = """You are a professional visa assistant agent with access to specialized tools. Your role is to help users with visa consultations and applications.
 
 CORE RESPONSIBILITIES:
 1. Answer visa-related questions using general_enquiry tool
@@ -165,24 +163,139 @@ CONVERSATIONAL FLOW RULES:
 - Build naturally on previous exchanges
 - Use phrases like "Great!", "Perfect!", "I still need", "Next, I need" """
 
-    # Add context-specific instructions based on current state
-    context_prompt = _get_context_specific_prompt(state)
-    
-    # Combine base and context prompts
-    final_prompt = f"{base_prompt}\n\n{context_prompt}"
-    return final_prompt
+STATIC_PREFIX_TOKENS = estimate_tokens(STATIC_SYSTEM_PROMPT)
+
+
+class PromptStats:
+    """Prompt construction and prompt-cache counters for monitoring"""
+
+    def __init__(self):
+        self.builds = 0
+        self.cacheable_prefix_tokens = 0
+        self.provider_calls = 0
+        self.provider_input_tokens = 0
+        self.provider_cached_tokens = 0
+
+    def stats(self) -> Dict[str, Any]:
+        memo = _render_context.cache_info()
+        return {
+            "builds": self.builds,
+            "static_prefix_tokens": STATIC_PREFIX_TOKENS,
+            "cacheable_prefix_tokens": self.cacheable_prefix_tokens,
+            "context_memo_hits": memo.hits,
+            "context_memo_misses": memo.misses,
+            "context_memo_size": memo.currsize,
+            "provider_calls": self.provider_calls,
+            "provider_input_tokens": self.provider_input_tokens,
+            "provider_cached_tokens": self.provider_cached_tokens,
+            "provider_cache_hit_rate": round(self.provider_cached_tokens / self.provider_input_tokens, 3) if self.provider_input_tokens else 0.0
+        }
+
+
+prompt_stats = PromptStats()
+
+
+class PromptCacheUsageHandler(BaseCallbackHandler):
+    """Records provider-reported input and cache-read tokens from LLM responses"""
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                prompt_stats.provider_calls += 1
+                prompt_stats.provider_input_tokens += usage.get("input_tokens", 0)
+                prompt_stats.provider_cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+
+prompt_cache_usage_handler = PromptCacheUsageHandler()
+
+
+def get_system_prompt(state: AgentState) -> str:
+    """
+    Generate context-aware system prompt based on current agent state.
+    Provides agent with relevant instructions and context.
+    """
+    static_prefix, context_prompt = get_system_prompt_segments(state)
+    return f"{static_prefix}\n\n{context_prompt}"
+
+
+def get_system_prompt_segments(state: AgentState) -> Tuple[str, str]:
+    """
+    System prompt as (static prefix, context segment).
+    The context segment is memoized on the state fields it depends on, so ReAct
+    iterations within a turn reuse the same string.
+    """
+    prompt_stats.builds += 1
+    prompt_stats.cacheable_prefix_tokens += STATIC_PREFIX_TOKENS
+    return STATIC_SYSTEM_PROMPT, _get_context_specific_prompt(state)
 
 
 def _get_context_specific_prompt(state: AgentState) -> str:
     """Generate context-specific instructions based on current state"""
+    return _render_context(_context_key(state))
+
+
+def _context_key(state: AgentState) -> tuple:
+    """The state fields the context segment depends on, as a hashable memo key"""
+    initial_info = state.get("initial_info") or {}
+    pinned_facts = state.get("pinned_facts") or {}
+    return (
+        state.get("conversation_summary"),
+        tuple(pinned_facts.items()),
+        bool(state.get("incomplete_session_id")),
+        tuple(state.get("multiple_applications") or ()),
+        bool(state.get("collection_in_progress")),
+        (initial_info.get("country", "unknown"), initial_info.get("purpose_of_travel", "unknown")) if initial_info else None,
+        state.get("conversation_context"),
+        (state.get("extraction_retry_count") or 0) > 0,
+        (state.get("tool_call_count") or 0) > 5
+    )
+
+
+@lru_cache(maxsize=512)
+def _render_context(key: tuple) -> str:
+    """
+    Build the context segment. Segments are ordered from least to most volatile
+    (history, then session, then per-turn modes) so consecutive calls share the
+    longest possible prefix.
+    """
+    (conversation_summary, pinned_facts, incomplete_session, applications, collection_in_progress,
+     application, conversation_context, retrying, many_tool_calls) = key
     
     context_parts = []
     
+    # Compacted history context
+    summary_block, pinned_block = build_history_context({
+        "conversation_summary": conversation_summary,
+        "pinned_facts": dict(pinned_facts)
+    })
+    if summary_block:
+        context_parts.append(summary_block)
+    if pinned_block:
+        context_parts.append(pinned_block)
+    
+    # Session context
+    if incomplete_session:
+        context_parts.append("""
+SESSION RESUMPTION:
+- User has an incomplete application they may want to resume
+- Offer to continue previous application or start fresh
+- Use session_management tool if user wants to resume""")
+    
+    # Multiple applications context
+    if applications:
+        context_parts.append(f"""
+MULTI-APPLICATION CONTEXT:
+- User has applications for: {', '.join(applications)}
+- Keep track of which country is being discussed
+- Use session_management tool to switch between applications""")
+    
     # Collection context
-    if state.get("collection_in_progress"):
-        if state.get("initial_info"):
-            country = state["initial_info"].get("country", "unknown")
-            purpose = state["initial_info"].get("purpose_of_travel", "unknown")
+    if collection_in_progress:
+        if application:
+            country, purpose = application
             context_parts.append(f"""
 CURRENT APPLICATION CONTEXT:
 - User is applying for {country} visa for {purpose}
@@ -197,7 +310,6 @@ COLLECTION CONTEXT:
 - Use base_information_collector tool to gather missing initial information""")
     
     # Conversation context
-    conversation_context = state.get("conversation_context")
     if conversation_context == "consultation":
         context_parts.append("""
 CONSULTATION MODE:
@@ -212,7 +324,7 @@ APPLICATION MODE:
 - Minimize distractions but handle urgent questions""")
     
     # Error context
-    if state.get("extraction_retry_count", 0) > 0:
+    if retrying:
         context_parts.append("""
 ERROR RECOVERY MODE:
 - Previous information extraction had issues
@@ -221,31 +333,13 @@ ERROR RECOVERY MODE:
 - If extraction fails again, offer to start fresh""")
     
     # Tool call context
-    tool_call_count = state.get("tool_call_count", 0)
-    if tool_call_count > 5:
+    if many_tool_calls:
         context_parts.append("""
 EFFICIENCY MODE:
 - Multiple tool calls have been made
 - Try to resolve user needs more directly
 - Consider if you need to clarify user intent""")
     
-    # Session context
-    if state.get("incomplete_session_id"):
-        context_parts.append("""
-SESSION RESUMPTION:
-- User has an incomplete application they may want to resume
-- Offer to continue previous application or start fresh
-- Use session_management tool if user wants to resume""")
-    
-    # Multiple applications context
-    if state.get("multiple_applications"):
-        countries = list(state["multiple_applications"].keys())
-        context_parts.append(f"""
-MULTI-APPLICATION CONTEXT:
-- User has applications for: {', '.join(countries)}
-- Keep track of which country is being discussed
-- Use session_management tool to switch between applications""")
-    
     return "\n".join(context_parts) if context_parts else "CONTEXT: New conversation - no specific context"
 
 
@@ -0,0 +1,57 @@
+# Readiness probe for the production API
+# Purpose: Run dependency checks (database, LLM, tracing, SMS) concurrently on demand instead
+# of at import time, with per-check timeouts and a short result cache so frequent probes
+# don't turn into a stream of remote calls
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ReadinessProbe:
+    """
+    Named async checks. A check passes when it returns without raising; critical
+    checks decide overall readiness, non-critical ones are reported only. Results
+    are cached for `ttl` seconds and concurrent callers share one in-flight run.
+    """
+
+    def __init__(self, ttl: float, timeout: float):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._checks: Dict[str, Tuple[Callable[[], Awaitable[Any]], bool]] = {}
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def register(self, name: str, check: Callable[[], Awaitable[Any]], critical: bool = True) -> None:
+        self._checks[name] = (check, critical)
+
+    async def check(self, force: bool = False) -> Dict[str, Any]:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and self._result and time.monotonic() - self._checked_at < self.ttl:
+                return self._result
+
+            names = list(self._checks)
+            outcomes = await asyncio.gather(*(self._run(name) for name in names))
+            checks = dict(zip(names, outcomes))
+            self._result = {
+                "ready": all(outcome["ok"] for outcome in checks.values() if outcome["critical"]),
+                "checks": checks
+            }
+            self._checked_at = time.monotonic()
+            return self._result
+
+    async def _run(self, name: str) -> Dict[str, Any]:
+        check, critical = self._checks[name]
+        started = time.perf_counter()
+        outcome: Dict[str, Any] = {"ok": True, "critical": critical}
+        try:
+            await asyncio.wait_for(check(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            outcome.update(ok=False, error=f"timed out after {self.timeout}s")
+        except Exception as e:
+            outcome.update(ok=False, error=str(e)[:200])
+        outcome["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return outcome
@@ -0,0 +1,216 @@
+# Semantic response cache for knowledge-base answers
+# Purpose: Reuse LLM answers for repeated or near-duplicate visa questions, keyed by
+# country, normalized question and knowledge-base content hash
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import app_config
+
+
+# Filler words dropped before keying, so "what documents do I need for a Vietnam visa?"
+# and "what documents do I need for Vietnam visa" share a key
+STOP_WORDS = {
+    "a", "an", "the", "i", "me", "my", "we", "our", "you", "your", "for", "of", "to", "please",
+    "would", "tell", "about", "any", "in", "on"
+}
+
+# Words that say what is being asked ("how much" is cost, "do I need" is eligibility);
+# they stay in the key and, like numbers, must match exactly
+INTENT_WORDS = {
+    "how", "much", "many", "long", "what", "whats", "which", "when", "where", "why", "who",
+    "do", "does", "did", "is", "are", "was", "there", "need", "needed", "required", "get",
+    "can", "could"
+}
+
+# Words that flip a question's meaning; like numbers they must match exactly
+NEGATIONS = {
+    "not", "no", "non", "without", "never", "cannot", "cant", "dont", "doesnt", "isnt", "arent",
+    "wont", "didnt", "havent", "hasnt", "except"
+}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and filler words, and sort so word order does not matter"""
+    words = re.sub(r"[^a-z0-9 ]+", " ", question.lower().replace("'", "").replace("\u2019", "")).split()
+    return " ".join(sorted(set(word for word in words if word not in STOP_WORDS)))
+
+
+def content_hash(content: Any) -> str:
+    """Stable hash of knowledge-base content, used to invalidate answers when it changes"""
+    serialized = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()[:16]
+
+
+def _is_exact_token(token: str) -> bool:
+    """Numbers, negations and intent words change the answer, so they never match fuzzily"""
+    return token in NEGATIONS or token in INTENT_WORDS or any(char.isdigit() for char in token)
+
+
+def tokens_match(a: List[str], b: List[str], threshold: float) -> bool:
+    """
+    True when two normalized questions have the same content words up to typos
+    and plurals: equal word counts, identical numbers, negations and intent words, and every
+    other word paired one-to-one with a word whose similarity reaches `threshold`.
+    """
+    if len(a) != len(b):
+        return False
+    exact_a = {token for token in a if _is_exact_token(token)}
+    if exact_a != {token for token in b if _is_exact_token(token)}:
+        return False
+
+    remaining = [token for token in b if token not in exact_a and token not in a]
+    for token in a:
+        if token in exact_a or token in b:
+            continue
+        best, best_score = None, 0.0
+        for candidate in remaining:
+            score = SequenceMatcher(None, token, candidate).ratio()
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < threshold:
+            return False
+        remaining.remove(best)
+    return True
+
+
+class SemanticResponseCache:
+    """
+    LRU/TTL cache of generated answers with near-duplicate matching.
+
+    Exact hits match on (country, normalized question, knowledge hash). Misses fall
+    back to a cached question for the same country and knowledge hash whose words
+    pair up one-to-one with the question's (see `tokens_match`), so a typo or
+    plural still hits but an extra word, a different number, intent or negation does
+    not. Called from tools running in worker threads, so every access holds a lock.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, similarity_threshold: float = 0.85, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._knowledge_hashes: Dict[str, str] = {}
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self.invalidations = 0
+
+    def get(self, country: str, question: str, knowledge_hash: str) -> Optional[str]:
+        """Return a cached answer for this or a near-duplicate question"""
+        if not self.enabled:
+            return None
+
+        normalized = normalize_question(question)
+        key = (country, knowledge_hash, normalized)
+
+        with self._lock:
+            self._check_knowledge_version(country, knowledge_hash)
+            entry = self._live_entry(key)
+            if entry:
+                self.exact_hits += 1
+            else:
+                entry = self._most_similar(country, knowledge_hash, normalized)
+                if entry:
+                    self.similar_hits += 1
+
+            if not entry:
+                self.misses += 1
+                return None
+
+            self.saved_tokens += entry["tokens"]
+            return entry["response"]
+
+    def put(self, country: str, question: str, knowledge_hash: str, response: str, tokens: int) -> None:
+        """Store an answer with the token cost it took to generate"""
+        if not self.enabled:
+            return
+
+        normalized = normalize_question(question)
+        key = (country, knowledge_hash, normalized)
+
+        with self._lock:
+            self._check_knowledge_version(country, knowledge_hash)
+            self._entries[key] = {
+                "response": response,
+                "tokens": tokens,
+                "words": normalized.split(),
+                "created_at": time.monotonic()
+            }
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, country: Optional[str] = None) -> None:
+        """Drop cached answers for one country, or all of them"""
+        with self._lock:
+            self._invalidate(country)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and saved-token counters for monitoring"""
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "saved_tokens": self.saved_tokens,
+                "invalidations": self.invalidations
+            }
+
+    # The helpers below expect the caller to hold self._lock
+
+    def _invalidate(self, country: Optional[str]) -> None:
+        for key in [k for k in self._entries if country is None or k[0] == country]:
+            del self._entries[key]
+        self.invalidations += 1
+
+    def _check_knowledge_version(self, country: str, knowledge_hash: str) -> None:
+        """Invalidate a country's answers as soon as its knowledge content changes"""
+        previous = self._knowledge_hashes.get(country)
+        if previous and previous != knowledge_hash:
+            print(f"Knowledge base changed for {country} - invalidating cached answers")
+            self._invalidate(country)
+        self._knowledge_hashes[country] = knowledge_hash
+
+    def _live_entry(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["created_at"] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _most_similar(self, country: str, knowledge_hash: str, normalized: str) -> Optional[Dict[str, Any]]:
+        words = normalized.split()
+        match = next((
+            key for key, entry in self._entries.items()
+            if key[0] == country and key[1] == knowledge_hash
+            and tokens_match(words, entry["words"], self.similarity_threshold)
+        ), None)
+        return self._live_entry(match) if match else None
+
+
+# Cache for general_enquiry_tool answers
+enquiry_cache = SemanticResponseCache(
+    max_entries=app_config.enquiry_cache_max_entries,
+    ttl=app_config.enquiry_cache_ttl,
+    similarity_threshold=app_config.enquiry_cache_similarity,
+    enabled=app_config.enable_caching
+)
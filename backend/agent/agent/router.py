@@ -0,0 +1,193 @@
+# Deterministic intent router for the visa assistant
+# Purpose: Classify trivial, unambiguous turns with rules and dispatch them straight
+# to their tool, skipping the ReAct planning call. Anything else falls back to the agent.
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+
+@dataclass
+class IntentMatch:
+    """Result of rule-based intent classification"""
+    intent: str
+    confidence: float
+    tool_name: str
+    tool_args: Dict[str, Any] = field(default_factory=dict)
+
+
+# Whole-message phrases; matching is on normalized text, not substrings
+GREETING_PHRASES = {
+    "hi", "hii", "hello", "hey", "hey there", "hi there", "hello there",
+    "good morning", "good afternoon", "good evening", "hola", "namaste"
+}
+THANKS_PHRASES = {
+    "thanks", "thank you", "thanks a lot", "thank you so much", "thx", "ty",
+    "many thanks", "thanks so much", "appreciate it", "great thanks"
+}
+FAREWELL_PHRASES = {
+    "bye", "goodbye", "bye bye", "see you", "see you later", "farewell", "good night"
+}
+
+# Words that mean the turn carries real visa intent and needs the agent
+DOMAIN_KEYWORDS = {
+    "visa", "apply", "application", "passport", "document", "documents", "fee", "fees",
+    "travel", "trip", "country", "upload", "uploaded", "requirements", "require", "need",
+    "yes", "proceed", "start", "ok", "okay", "sure"
+}
+
+UPLOAD_PATTERNS = [
+    re.compile(r"\bi(?: have|'ve)? (?:just )?uploaded\b"),
+    re.compile(r"\buploaded my (?:passport|photo|documents?)\b"),
+    re.compile(r"\b(?:passport|photo|document|documents) (?:is |are |has been |have been )?uploaded\b"),
+]
+
+
+def _normalize(text: str) -> str:
+    """Lowercase and strip punctuation/emoji so phrase lookups are exact"""
+    text = re.sub(r"[^a-z0-9' ]+", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _has_active_workflow(thread_id: Optional[str]) -> bool:
+    """Check whether the intelligent workflow agent has a session for this thread"""
+    if not thread_id:
+        return False
+    # Local cache only (the router is synchronous); misses just fall back to the agent.
+    # The session store module is light, so this doesn't load the workflow agent.
+    try:
+        from agent.agents.workflow_session_store import workflow_sessions
+        return workflow_sessions.peek(thread_id) is not None
+    except ImportError:
+        return False
+
+
+class IntentRouter:
+    """
+    Rule-based pre-router in front of the ReAct agent.
+
+    Each rule returns an IntentMatch with a confidence; only matches at or above
+    `threshold` are dispatched directly. Counters record how many turns were
+    routed versus handed to the agent.
+    """
+
+    def __init__(self, tools: List, threshold: float = 0.9, enabled: bool = True):
+        self.tools = {t.name: t for t in tools}
+        self.threshold = threshold
+        self.enabled = enabled
+        self.rules: List[Callable[[str, Dict[str, Any]], Optional[IntentMatch]]] = [
+            self._match_small_talk,
+            self._match_document_upload,
+        ]
+        self.routed = 0
+        self.fallback = 0
+        self.routed_by_intent: Dict[str, int] = {}
+        self.errors = 0
+
+    def classify(self, user_message: str, state: Dict[str, Any]) -> Optional[IntentMatch]:
+        """Return the highest-confidence match for the message, if any rule fires"""
+        best = None
+        for rule in self.rules:
+            match = rule(user_message, state)
+            if match and (best is None or match.confidence > best.confidence):
+                best = match
+        return best
+
+    async def route(self, state: Dict[str, Any], config: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Try to handle the latest user turn without the agent.
+        Returns {"intent", "response"} when dispatched, or None to fall back.
+        """
+        if not self.enabled:
+            return None
+
+        user_message = self._latest_user_message(state)
+        match = self.classify(user_message, state) if user_message else None
+
+        if not match or match.confidence < self.threshold or match.tool_name not in self.tools:
+            self.fallback += 1
+            return None
+
+        try:
+            response = await self.tools[match.tool_name].ainvoke(match.tool_args, config=config)
+        except Exception as e:
+            print(f"Intent router dispatch error ({match.intent}): {e}")
+            self.errors += 1
+            self.fallback += 1
+            return None
+
+        self.routed += 1
+        self.routed_by_intent[match.intent] = self.routed_by_intent.get(match.intent, 0) + 1
+        print(f"DEBUG ROUTER: Routed '{match.intent}' to {match.tool_name} (confidence {match.confidence:.2f})")
+        return {"intent": match.intent, "response": str(response)}
+
+    def stats(self) -> Dict[str, Any]:
+        """Routed vs. fallback counters for monitoring"""
+        total = self.routed + self.fallback
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "routed": self.routed,
+            "fallback": self.fallback,
+            "routed_ratio": round(self.routed / total, 4) if total else 0.0,
+            "routed_by_intent": dict(self.routed_by_intent),
+            "dispatch_errors": self.errors
+        }
+
+    def _latest_user_message(self, state: Dict[str, Any]) -> Optional[str]:
+        messages = state.get("messages") or []
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return None
+        content = messages[-1].content
+        return content if isinstance(content, str) else None
+
+    def _match_small_talk(self, user_message: str, state: Dict[str, Any]) -> Optional[IntentMatch]:
+        """Greetings, thanks and farewells that greetings_tool already answers by keyword"""
+        normalized = _normalize(user_message)
+        if not normalized:
+            return None
+
+        words = normalized.split()
+        if any(word in DOMAIN_KEYWORDS for word in words):
+            return None
+
+        for intent, phrases in (("greeting", GREETING_PHRASES), ("thanks", THANKS_PHRASES), ("farewell", FAREWELL_PHRASES)):
+            if normalized in phrases:
+                confidence = 0.95
+            elif any(normalized.startswith(phrase + " ") for phrase in phrases) and len(words) <= 4:
+                # "hi veazy", "thanks a ton" - likely small talk, but leave room for the agent
+                confidence = 0.8
+            else:
+                continue
+
+            return IntentMatch(
+                intent=intent,
+                confidence=confidence,
+                tool_name="greetings_tool",
+                tool_args={"user_message": user_message}
+            )
+
+        return None
+
+    def _match_document_upload(self, user_message: str, state: Dict[str, Any]) -> Optional[IntentMatch]:
+        """Upload confirmations, which always go to workflow_executor_tool during a workflow"""
+        normalized = _normalize(user_message)
+        if not any(pattern.search(normalized) for pattern in UPLOAD_PATTERNS):
+            return None
+
+        # Questions ("how do I upload?") and uploads outside a workflow need the agent
+        in_workflow = _has_active_workflow(state.get("session_id"))
+        confidence = 0.95 if in_workflow and "?" not in user_message else 0.6
+
+        return IntentMatch(
+            intent="document_upload",
+            confidence=confidence,
+            tool_name="workflow_executor_tool",
+            tool_args={
+                "user_message": user_message,
+                "intent_type": "document_processed",
+                "state": state
+            }
+        )
@@ -75,6 +75,7 @@ class AgentState(TypedDict):
     # Performance optimization
     cached_visa_info: Optional[dict[str, Any]]                 # Cache frequently requested country data
     conversation_summary: Optional[str]                        # Condensed history for long conversations
+    pinned_facts: Optional[dict[str, str]]                     # Workflow facts kept verbatim when older turns are summarized
     state_version: Optional[int]                               # For conflict resolution and state validation
 
 
@@ -0,0 +1,302 @@
+# SSE streaming helpers for the production API
+# Purpose: Coalesce model tokens into fewer, cheaper SSE frames (time window or byte
+# threshold), with optional compact delta frames and a final consolidated message event.
+# Runs are cancelled when the client disconnects or the stream exceeds its time budget.
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class StreamStats:
+    """Process-wide streaming counters for monitoring"""
+
+    def __init__(self):
+        self.streams = 0
+        self.tokens = 0
+        self.frames = 0
+        self.bytes = 0
+        self.heartbeats = 0
+        self.disconnects = 0
+        self.timeouts = 0
+
+    def record_frame(self, frame: str) -> str:
+        self.frames += 1
+        self.bytes += len(frame)
+        return frame
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "streams": self.streams,
+            "tokens": self.tokens,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "heartbeats": self.heartbeats,
+            "cancelled_on_disconnect": self.disconnects,
+            "timed_out": self.timeouts,
+            "tokens_per_frame": round(self.tokens / self.frames, 2) if self.frames else 0.0
+        }
+
+
+stream_stats = StreamStats()
+
+
+class SSEFrameFormatter:
+    """
+    Builds SSE frames for one turn.
+
+    Standard frames keep the shape the chat UI parses ({"type": "ai", "content": ...}),
+    with the id and timestamp encoded once per turn so each frame only JSON-encodes
+    its text. Compact frames are `event: delta` with a bare JSON string payload.
+    """
+
+    def __init__(self, thread_id: str, compact: bool = False):
+        self.compact = compact
+        self.message_id = f"ai_{thread_id}_{uuid.uuid4().hex[:8]}"
+        self.created_at = datetime.utcnow().isoformat() + "Z"
+        self._ai_prefix = (
+            'data: {"id": ' + json.dumps(self.message_id)
+            + ', "type": "ai", "created_at": ' + json.dumps(self.created_at)
+            + ', "content": '
+        )
+
+    def human(self, thread_id: str, content: str) -> str:
+        return self._data({
+            "id": f"user_{thread_id}",
+            "type": "human",
+            "content": content,
+            "created_at": self.created_at
+        })
+
+    def delta(self, content: str) -> str:
+        if self.compact:
+            return f"event: delta\ndata: {json.dumps(content)}\n\n"
+        return self._ai_prefix + json.dumps(content) + "}\n\n"
+
+    def final(self, content: str) -> str:
+        """Whole reply in one event; ignored by clients that only concatenate "ai" frames"""
+        return "event: message\n" + self._data({
+            "id": self.message_id,
+            "type": "ai_final",
+            "content": content,
+            "created_at": self.created_at
+        })
+
+    def heartbeat(self) -> str:
+        """SSE comment line; keeps proxies and clients from idling out, ignored by parsers"""
+        return ": heartbeat\n\n"
+
+    def error(self, content: str) -> str:
+        return self._data({
+            "id": self.message_id,
+            "type": "ai",
+            "content": content,
+            "created_at": self.created_at
+        })
+
+    def _data(self, payload: Dict[str, Any]) -> str:
+        return f"data: {json.dumps(payload)}\n\n"
+
+
+class TokenCoalescer:
+    """
+    Buffers tokens and decides when to flush.
+
+    The first token is flushed immediately (first-token latency is unchanged);
+    after that the buffer is flushed once it holds `max_bytes` or `flush_interval`
+    seconds have passed since the last flush. `max_bytes <= 0` disables coalescing.
+    """
+
+    def __init__(self, max_bytes: int, flush_interval: float):
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._last_flush: Optional[float] = None
+
+    def add(self, token: str) -> None:
+        self._buffer.append(token)
+        self._buffered_bytes += len(token.encode("utf-8"))
+
+    def should_flush(self) -> bool:
+        if not self._buffer:
+            return False
+        return (
+            self.max_bytes <= 0
+            or self._last_flush is None
+            or self._buffered_bytes >= self.max_bytes
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def time_until_flush(self) -> Optional[float]:
+        """Seconds until buffered text is due, or None when nothing is buffered"""
+        if not self._buffer:
+            return None
+        if self._last_flush is None:
+            return 0.0
+        return max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+
+    def drain(self) -> str:
+        text = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        return text
+
+
+_END = object()
+
+
+class SSETokenStream:
+    """
+    Turns `stream_agent` chunks into coalesced SSE frames.
+
+    The agent stream is consumed by a producer task feeding a queue, so the
+    consumer can wake up while the agent is quiet (e.g. during a tool call) to
+    flush buffered text, send heartbeat comments, poll for client disconnects
+    and enforce the overall timeout. Disconnects and timeouts cancel the producer,
+    which cancels the agent's astream and its in-flight tool coroutines.
+
+    Once `frames()` finishes, `text` holds the reply and `completed` tells whether
+    the agent ran to the end.
+    """
+
+    def __init__(
+        self,
+        formatter: SSEFrameFormatter,
+        coalescer: TokenCoalescer,
+        final_event: bool = True,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        heartbeat_interval: float = 15.0,
+        disconnect_check_interval: float = 1.0,
+        timeout: Optional[float] = None
+    ):
+        self.formatter = formatter
+        self.coalescer = coalescer
+        self.final_event = final_event
+        self.is_disconnected = is_disconnected
+        self.heartbeat_interval = heartbeat_interval
+        self.disconnect_check_interval = disconnect_check_interval
+        self.timeout = timeout
+        self.text = ""
+        self.completed = False
+        self.disconnected = False
+        self.timed_out = False
+
+    async def frames(self, source: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+        stream_stats.streams += 1
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._produce(source, queue))
+
+        started = time.monotonic()
+        last_frame = started
+        last_disconnect_check = started
+
+        try:
+            while True:
+                now = time.monotonic()
+
+                if self.timeout and now - started >= self.timeout:
+                    self.timed_out = True
+                    stream_stats.timeouts += 1
+                    print(f"Stream exceeded {self.timeout}s - cancelling agent run")
+                    await self._cancel(producer)
+                    if self.coalescer.time_until_flush() is not None:
+                        yield self._flush()
+                    yield stream_stats.record_frame(self.formatter.error(
+                        "\n\nThis is taking longer than expected. Please try again in a moment."
+                    ))
+                    return
+
+                if self.is_disconnected and now - last_disconnect_check >= self.disconnect_check_interval:
+                    last_disconnect_check = now
+                    if await self.is_disconnected():
+                        self.disconnected = True
+                        stream_stats.disconnects += 1
+                        print("Client disconnected - cancelling agent run")
+                        await self._cancel(producer)
+                        return
+
+                if now - last_frame >= self.heartbeat_interval:
+                    stream_stats.heartbeats += 1
+                    last_frame = now
+                    yield stream_stats.record_frame(self.formatter.heartbeat())
+                    continue
+
+                try:
+                    item = await asyncio.wait_for(queue.get(), self._next_wakeup(now, started, last_frame, last_disconnect_check))
+                except asyncio.TimeoutError:
+                    flush_in = self.coalescer.time_until_flush()
+                    if flush_in is not None and flush_in <= 0:
+                        last_frame = time.monotonic()
+                        yield self._flush()
+                    continue
+
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                token = item.get("token", "")
+                if not token:
+                    continue
+                stream_stats.tokens += 1
+                self.text += token
+                self.coalescer.add(token)
+                if self.coalescer.should_flush():
+                    last_frame = time.monotonic()
+                    yield self._flush()
+
+            self.completed = True
+            if self.coalescer.time_until_flush() is not None:
+                yield self._flush()
+            if self.final_event and self.text:
+                yield stream_stats.record_frame(self.formatter.final(self.text))
+        finally:
+            # Also reached when the server cancels the response on disconnect
+            producer.cancel()
+
+    def _next_wakeup(self, now: float, started: float, last_frame: float, last_disconnect_check: float) -> float:
+        """Seconds until the next flush, heartbeat, disconnect check or timeout is due"""
+        deadlines = [last_frame + self.heartbeat_interval]
+        if self.timeout:
+            deadlines.append(started + self.timeout)
+        if self.is_disconnected:
+            deadlines.append(last_disconnect_check + self.disconnect_check_interval)
+        flush_in = self.coalescer.time_until_flush()
+        if flush_in is not None:
+            deadlines.append(now + flush_in)
+        return max(0.0, min(deadlines) - now)
+
+    def _flush(self) -> str:
+        return stream_stats.record_frame(self.formatter.delta(self.coalescer.drain()))
+
+    async def _cancel(self, producer: asyncio.Task) -> None:
+        """Cancel the agent run and wait for its tasks to unwind"""
+        producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def _produce(self, source: AsyncIterator[Dict[str, Any]], queue: asyncio.Queue) -> None:
+        try:
+            async for chunk in source:
+                if chunk and chunk.get("type") == "token":
+                    await queue.put(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+            return
+        finally:
+            # Close the agent stream so LangGraph cancels any running tool/LLM tasks
+            if hasattr(source, "aclose"):
+                try:
+                    await source.aclose()
+                except Exception:
+                    pass
+        await queue.put(_END)
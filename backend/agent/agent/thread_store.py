@@ -0,0 +1,268 @@
+# Thread state store for the production API
+# Purpose: Bounded in-process LRU/TTL tier with an optional MongoDB durable tier,
+# so any worker can serve any thread and per-process memory stays flat
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from pymongo import ReturnDocument
+
+from config.settings import app_config
+
+
+class InMemoryThreadStateBackend:
+    """
+    In-process LRU cache of thread states with idle-time expiry.
+    Entries untouched for `ttl` seconds expire and the least recently used
+    thread is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry["touched_at"] > self.ttl:
+            del self._entries[thread_id]
+            self.expirations += 1
+            return None
+
+        entry["touched_at"] = time.monotonic()
+        self._entries.move_to_end(thread_id)
+        return entry
+
+    def set(self, thread_id: str, state: Dict[str, Any], revision: int) -> None:
+        self._entries[thread_id] = {
+            "state": state,
+            "revision": revision,
+            "touched_at": time.monotonic()
+        }
+        self._entries.move_to_end(thread_id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, thread_id: str) -> None:
+        self._entries.pop(thread_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MongoThreadStateBackend:
+    """
+    Durable thread state tier stored in the `thread_states` collection through
+    the shared motor client. Documents expire via a TTL index on `updated_at`.
+    """
+
+    def __init__(self, collection_name: str, ttl: int):
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self._indexes_ready = False
+
+    async def _collection(self):
+        # Imported lazily so the agent package stays importable without the backend root on sys.path
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            raise RuntimeError("MongoDB is not connected")
+
+        collection = database[self.collection_name]
+        if not self._indexes_ready:
+            await collection.create_index("updated_at", expireAfterSeconds=self.ttl)
+            self._indexes_ready = True
+        return collection
+
+    async def load(self, thread_id: str, newer_than: int = 0) -> Optional[Dict[str, Any]]:
+        """Load a thread document, skipping the payload if it is not newer than `newer_than`"""
+        collection = await self._collection()
+        query = {"_id": thread_id}
+        if newer_than:
+            query["revision"] = {"$gt": newer_than}
+
+        document = await collection.find_one(query)
+        if not document:
+            return None
+
+        state = document.get("state", {})
+        state["messages"] = messages_from_dict(document.get("messages", []))
+        return {"state": state, "revision": document.get("revision", 0)}
+
+    async def save(self, thread_id: str, state: Dict[str, Any], expected_revision: Optional[int] = None) -> Optional[int]:
+        """
+        Persist a thread state and return its new revision. With `expected_revision`
+        the write only happens if the stored revision is still that one; None otherwise.
+        """
+        collection = await self._collection()
+        fields = {
+            key: value for key, value in state.items()
+            if key != "messages" and value is not None
+        }
+
+        query = {"_id": thread_id}
+        if expected_revision is not None:
+            query["revision"] = expected_revision
+        document = await collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "state": fields,
+                    "messages": messages_to_dict(state.get("messages", [])),
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {"revision": 1}
+            },
+            upsert=expected_revision is None,
+            projection={"revision": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if expected_revision is not None and document is None:
+            return None
+        return document.get("revision", 0) if document else 0
+
+    async def delete(self, thread_id: str) -> None:
+        collection = await self._collection()
+        await collection.delete_one({"_id": thread_id})
+
+
+class ThreadStateStore:
+    """
+    Two-tier thread state store used by the production API.
+
+    Reads are served from the local LRU tier when the durable tier confirms the
+    cached revision is current, so a thread can move between workers without
+    serving stale history. Writes go to both tiers.
+    """
+
+    def __init__(self, local: InMemoryThreadStateBackend, durable: Optional[MongoThreadStateBackend] = None):
+        self.local = local
+        self.durable = durable
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Get thread state or None if the thread is unknown or expired"""
+        cached = self.local.get(thread_id)
+
+        if self.durable:
+            try:
+                newer_than = cached["revision"] if cached else 0
+                loaded = await self.durable.load(thread_id, newer_than=newer_than)
+                if loaded:
+                    self.misses += 1
+                    self.local.set(thread_id, loaded["state"], loaded["revision"])
+                    return loaded["state"]
+            except Exception as e:
+                print(f"Thread store read error for {thread_id}: {e}")
+
+        if cached:
+            self.hits += 1
+            return cached["state"]
+
+        self.misses += 1
+        return None
+
+    async def get_or_create(self, thread_id: str, **defaults) -> Dict[str, Any]:
+        """Get thread state, creating a fresh one with `defaults` when missing"""
+        state = await self.get(thread_id)
+        if state is None:
+            state = {
+                "messages": [],
+                "session_id": thread_id,
+                "tool_call_count": 0,
+                "state_version": 1
+            }
+            state.update({key: value for key, value in defaults.items() if value is not None})
+            await self.save(thread_id, state)
+        return state
+
+    async def save(self, thread_id: str, state: Dict[str, Any], expected_revision: Optional[int] = None) -> bool:
+        """
+        Write thread state through to every tier. With `expected_revision` nothing
+        is written (and False returned) unless the thread is still at that revision,
+        so a background writer can't overwrite a turn another worker saved.
+        """
+        cached = self.local.get(thread_id)
+        revision = cached["revision"] if cached else 0
+
+        if self.durable:
+            try:
+                saved = await self.durable.save(thread_id, state, expected_revision)
+                if saved is None:
+                    return False
+                revision = saved
+            except Exception as e:
+                print(f"Thread store write error for {thread_id}: {e}")
+                if expected_revision is not None:
+                    return False
+        else:
+            if expected_revision is not None and revision != expected_revision:
+                return False
+            revision += 1
+
+        self.local.set(thread_id, state, revision)
+        return True
+
+    def revision(self, thread_id: str) -> int:
+        """Revision of the state this worker last read or wrote (0 if not cached)"""
+        cached = self.local.get(thread_id)
+        return cached["revision"] if cached else 0
+
+    def peek(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Synchronous local-tier lookup for callers that cannot await"""
+        cached = self.local.get(thread_id)
+        return cached["state"] if cached else None
+
+    async def delete(self, thread_id: str) -> None:
+        self.local.delete(thread_id)
+        if self.durable:
+            try:
+                await self.durable.delete(thread_id)
+            except Exception as e:
+                print(f"Thread store delete error for {thread_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics for monitoring"""
+        return {
+            "backend": "mongo" if self.durable else "memory",
+            "cached_threads": len(self.local),
+            "max_threads": self.local.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations
+        }
+
+
+def create_thread_state_store() -> ThreadStateStore:
+    """Build the thread state store selected by THREAD_STATE_BACKEND ("mongo" or "memory")"""
+    local = InMemoryThreadStateBackend(
+        max_entries=app_config.max_sessions,
+        ttl=app_config.session_timeout
+    )
+
+    durable = None
+    if app_config.thread_state_backend == "mongo":
+        durable = MongoThreadStateBackend(
+            collection_name=os.getenv("THREAD_STATE_COLLECTION", "thread_states"),
+            ttl=app_config.session_timeout
+        )
+
+    return ThreadStateStore(local, durable)
+
+
+# Global thread state store
+thread_state_store = create_thread_state_store()
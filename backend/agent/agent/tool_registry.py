@@ -0,0 +1,82 @@
+# Tool registry for the visa assistant agent
+# Purpose: Load tool modules from one list (timing each import) and defer heavy provider
+# SDKs behind lazy module proxies that import on first use, so worker boot only pays for
+# what the agent needs to bind its tools
+
+import importlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# (module, attribute) for every tool bound to the main agent, in prompt order
+AGENT_TOOL_SPECS: List[Tuple[str, str]] = [
+    ("tools.greetings", "greetings_tool"),
+    ("tools.visa_information", "general_enquiry_tool"),
+    ("tools.application_basic", "base_information_collector_tool"),
+    ("tools.database_visa_lookup", "database_visa_lookup_tool"),
+    ("tools.workflow_executor", "workflow_executor_tool"),
+    ("tools.application_detailed", "application_detailed_tool"),
+    ("tools.document_processing", "document_processing_tool"),
+    ("tools.session_management", "session_management_tool"),
+    ("tools.start_workflow_tool", "start_detailed_application_process"),
+]
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, registry: "ToolRegistry", name: str):
+        self._registry = registry
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        if self._module is None:
+            self._module = self._registry._import(self._name, deferred=True)
+        return getattr(self._module, attribute)
+
+
+class ToolRegistry:
+    """
+    Tool modules are imported once, when the agent first asks for its tools.
+    Import times are recorded per module, both for tool modules and for SDKs
+    deferred with `lazy_import`, and reported through `stats()`.
+    """
+
+    def __init__(self, specs: List[Tuple[str, str]]):
+        self.specs = specs
+        self._tools: Optional[List] = None
+        self.import_ms: Dict[str, float] = {}
+        self.deferred_import_ms: Dict[str, float] = {}
+
+    def tools(self) -> List:
+        if self._tools is None:
+            self._tools = [getattr(self._import(module), attribute) for module, attribute in self.specs]
+        return self._tools
+
+    def lazy_import(self, name: str) -> LazyModule:
+        return LazyModule(self, name)
+
+    def _import(self, name: str, deferred: bool = False):
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = round((time.perf_counter() - started) * 1000, 1)
+        target = self.deferred_import_ms if deferred else self.import_ms
+        target.setdefault(name, elapsed)
+        return module
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tools_loaded": len(self._tools or []),
+            "tool_module_import_ms": self.import_ms,
+            "deferred_import_ms": self.deferred_import_ms
+        }
+
+
+# Global registry
+tool_registry = ToolRegistry(AGENT_TOOL_SPECS)
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Defer importing a heavy SDK until it is first used"""
+    return tool_registry.lazy_import(name)
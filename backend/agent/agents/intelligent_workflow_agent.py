@@ -15,9 +15,9 @@ from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.types import Command
 from config.settings import invoke_llm_safe, llm
 from database.models.comprehensive_visa_application import ComprehensiveVisaApplication
-
-# Global state store for workflow sessions
-workflow_sessions: Dict[str, Dict[str, Any]] = {}
+from config.workflow_registry import workflow_registry
+from agent.agents.workflow_session_store import workflow_sessions
+from services.application_write_buffer import application_writes
 
 @tool
 async def initialize_workflow_session(
@@ -32,16 +32,7 @@ async def initialize_workflow_session(
     
     try:
         # Store session data
-        workflow_sessions[thread_id] = {
-            "handoff_data": handoff_data,
-            "workflow_json": None,
-            "current_stage_index": 0,
-            "collected_data": {},
-            "uploaded_documents": {},
-            "stage_completion": {},
-            "session_start": datetime.now().isoformat(),
-            "status": "initialized"
-        }
+        await workflow_sessions.create(thread_id, handoff_data)
         
         print(f"DEBUG: Workflow session stored successfully")
         
@@ -61,66 +52,52 @@ async def load_workflow_dynamically(
     
     print(f"DEBUG: load_workflow_dynamically called with thread_id={thread_id}, visa_type={visa_type}")
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         print(f"DEBUG: Thread {thread_id} not found in workflow_sessions")
         return "Error: Workflow session not found. Please initialize first."
     
-    session = workflow_sessions[thread_id]
-    print(f"DEBUG: Found session: {session}")
+    print(f"DEBUG: Found session: {session.data}")
     
     try:
-        # Dynamic workflow file mapping - completely extensible
-        import os
-        # Use absolute path to avoid any path resolution issues
-        backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-        workflow_files = {
-            "Vietnam Tourism Single Entry": os.path.abspath(os.path.join(backend_dir, "VNM_tourism_single_entry_workflow_optimized.json")),
-        }
-        
-        print(f"DEBUG: Available workflows: {list(workflow_files.keys())}")
-        print(f"DEBUG: Backend directory resolved to: {backend_dir}")
+        # Dynamic workflow mapping - any workflow definition in the registry, by visa type
+        print(f"DEBUG: Available workflows: {workflow_registry.available()}")
         
-        workflow_file = workflow_files.get(visa_type)
-        print(f"DEBUG: Resolved workflow file path: {workflow_file}")
-        if not workflow_file:
+        # Compiled once per process and shared; the session keeps only its id and version
+        workflow = workflow_registry.get(visa_type)
+        if not workflow:
             print(f"DEBUG: No workflow found for visa type: {visa_type}")
-            return f"No workflow found for visa type: {visa_type}. Available workflows: {list(workflow_files.keys())}"
-        
-        print(f"DEBUG: Loading workflow file: {workflow_file}")
-        
-        # Load and parse workflow JSON
-        with open(workflow_file, 'r') as f:
-            workflow_json = json.load(f)
+            return f"No workflow found for visa type: {visa_type}. Available workflows: {workflow_registry.available()}"
         
-        print(f"DEBUG: Workflow JSON loaded successfully")
+        print(f"DEBUG: Workflow {workflow.workflow_id} ({workflow.version}) loaded successfully")
         
-        session["workflow_json"] = workflow_json
-        session["status"] = "workflow_loaded"
+        session.bind_workflow(workflow)
+        session.set("status", "workflow_loaded")
+        await workflow_sessions.save(session)
         
         # Analyze workflow structure dynamically
-        stages = workflow_json.get("collection_sequence", [])
+        stages = workflow.stages
         total_stages = len(stages)
         
         print(f"DEBUG: Found {total_stages} stages in workflow")
         
         analysis = f"**Workflow Analysis for {visa_type}**\n\n"
         analysis += f"**Total Stages:** {total_stages}\n"
-        analysis += f"**Description:** {workflow_json.get('workflow_description', 'No description available')}\n\n"
+        analysis += f"**Description:** {workflow.get('workflow_description', 'No description available')}\n\n"
         analysis += "**Stage Overview:**\n"
         
         for i, stage in enumerate(stages, 1):
-            stage_title = stage.get("stage_title", f"Stage {i}")
-            stage_desc = stage.get("stage_description", "No description")
+            stage_desc = stage.config.get("stage_description", "No description")
             
             # Count requirements dynamically
-            doc_count = len(stage.get("required_documents", []))
-            field_count = len(stage.get("fields", {}))
+            doc_count = len(stage.documents)
+            field_count = len(stage.fields)
             
-            analysis += f"{i}. **{stage_title}**\n"
+            analysis += f"{i}. **{stage.title}**\n"
             analysis += f"   - {stage_desc}\n"
             analysis += f"   - Documents: {doc_count}, Fields: {field_count}\n"
         
-        analysis += f"\nReady to begin stage 1: {stages[0].get('stage_title', 'First Stage')}"
+        analysis += f"\nReady to begin stage 1: {stages[0].title}"
         
         print(f"DEBUG: Analysis complete: {analysis[:200]}...")
         
@@ -139,29 +116,28 @@ async def execute_current_stage(
 ) -> str:
     """Dynamically execute current stage based on workflow JSON structure"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "Workflow session not found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
+    workflow = session.workflow
     
-    if not workflow_json:
+    if not workflow:
         return "No workflow loaded. Please load workflow first."
     
-    stages = workflow_json.get("collection_sequence", [])
+    stages = workflow.stages
     current_index = session["current_stage_index"]
     
     if current_index >= len(stages):
         return "All stages completed! Ready to generate final output."
     
     current_stage = stages[current_index]
-    stage_title = current_stage.get("stage_title", f"Stage {current_index + 1}")
-    stage_desc = current_stage.get("stage_description", "")
+    stage_desc = current_stage.config.get("stage_description", "")
     
-    requirements = f"**Current Stage: {stage_title}**\n{stage_desc}\n\n**Requirements:**\n\n"
+    requirements = f"**Current Stage: {current_stage.title}**\n{stage_desc}\n\n**Requirements:**\n\n"
     
     # Process document requirements dynamically
-    docs = current_stage.get("required_documents", [])
+    docs = current_stage.documents.values()
     if docs:
         requirements += "**Documents Needed:**\n"
         for doc in docs:
@@ -177,7 +153,7 @@ async def execute_current_stage(
             requirements += "\n"
     
     # Process field requirements dynamically
-    fields = current_stage.get("fields", {})
+    fields = current_stage.fields
     if fields:
         requirements += "**Information Needed:**\n"
         for field_name, field_info in fields.items():
@@ -216,6 +192,16 @@ async def execute_current_stage(
     
     return requirements
 
+def _new_application_fields(session, state: Optional[dict]) -> Dict[str, Any]:
+    """Top-level fields for the comprehensive application if the buffer's flush creates it"""
+    handoff_data = session.get("handoff_data") or {}
+    fields: Dict[str, Any] = {"basic_info": handoff_data}
+    if handoff_data.get("visa_type"):
+        fields["visa_type"] = handoff_data["visa_type"]
+    if state and state.get("user_id"):
+        fields["user_id"] = state["user_id"]
+    return fields
+
 @tool
 async def collect_data_item(
     thread_id: Annotated[str, "Thread ID for this workflow session"],
@@ -225,16 +211,15 @@ async def collect_data_item(
 ) -> str:
     """Collect and validate field data according to workflow specifications"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "Workflow session not found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
+    workflow = session.workflow
     
     # Find field definition in current stage
-    stages = workflow_json.get("collection_sequence", [])
-    current_stage = stages[session["current_stage_index"]]
-    field_definition = current_stage.get("fields", {}).get(field_name)
+    current_stage = workflow.stages[session["current_stage_index"]]
+    field_definition = current_stage.fields.get(field_name)
     
     # Apply validation if defined
     if field_definition:
@@ -250,19 +235,16 @@ async def collect_data_item(
         if validation.get("max_length") and len(field_value) > validation["max_length"]:
             return f"Error: {field_name} must be no more than {validation['max_length']} characters."
     
-    # Store the data
-    session["collected_data"][field_name] = field_value
+    # Store the data: one delta write for the session so any worker sees the field
+    session.set_collected(field_name, field_value)
+    await workflow_sessions.save(session)
     
-    # Update database if available
-    try:
-        db_application = await ComprehensiveVisaApplication.find_one({"thread_id": thread_id})
-        if db_application:
-            if not db_application.collected_data:
-                db_application.collected_data = {}
-            db_application.collected_data[field_name] = field_value
-            await db_application.save()
-    except Exception as e:
-        print(f"DEBUG: Database update error: {e}")
+    # The first flush creates the application, so pass what a new one should carry
+    await application_writes.set_fields(
+        thread_id,
+        {field_name: field_value},
+        on_insert=_new_application_fields(session, state)
+    )
     
     return f"Collected **{field_name.replace('_', ' ').title()}**: {field_value}"
 
@@ -275,41 +257,36 @@ async def process_document_extraction(
 ) -> str:
     """Process document upload and map extracted data according to workflow"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "Workflow session not found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
+    workflow = session.workflow
     
     # Find document definition in current stage
-    stages = workflow_json.get("collection_sequence", [])
-    current_stage = stages[session["current_stage_index"]]
-    
-    # Find the document definition
-    doc_definition = None
-    for doc in current_stage.get("required_documents", []):
-        if doc["type"] == document_type:
-            doc_definition = doc
-            break
+    current_stage = workflow.stages[session["current_stage_index"]]
+    doc_definition = current_stage.documents.get(document_type)
     
     if not doc_definition:
         return f"Document type {document_type} not expected in current stage."
     
     # Store document info
-    session["uploaded_documents"][document_type] = {
+    session.set_document(document_type, {
         "upload_time": datetime.now().isoformat(),
         "extraction_results": extraction_results
-    }
+    })
     
     # Auto-populate extracted fields based on workflow definition
-    expected_extracts = doc_definition.get("extracts", [])
+    expected_extracts = current_stage.extracts[document_type]
     extracted_fields = []
     
     for field_name in expected_extracts:
         if field_name in extraction_results and extraction_results[field_name]:
-            session["collected_data"][field_name] = extraction_results[field_name]
+            session.set_collected(field_name, extraction_results[field_name])
             extracted_fields.append(f"   - {field_name.replace('_', ' ').title()}: {extraction_results[field_name]}")
     
+    await workflow_sessions.save(session)
+    
     result = f"**{document_type.replace('_', ' ').title()}** processed successfully!\n\n"
     if extracted_fields:
         result += "**Auto-extracted data:**\n" + "\n".join(extracted_fields)
@@ -325,16 +302,16 @@ async def validate_stage_completion(
 ) -> str:
     """Check if current stage is complete according to workflow requirements"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "Workflow session not found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
+    workflow = session.workflow
     
-    if not workflow_json:
+    if not workflow:
         return "No workflow loaded."
     
-    stages = workflow_json.get("collection_sequence", [])
+    stages = workflow.stages
     current_index = session["current_stage_index"]
     
     if current_index >= len(stages):
@@ -344,13 +321,13 @@ async def validate_stage_completion(
     missing_items = []
     
     # Check required documents
-    for doc in current_stage.get("required_documents", []):
-        if doc.get("required", True) and doc["type"] not in session["uploaded_documents"]:
+    for doc_type, doc in current_stage.documents.items():
+        if doc_type in current_stage.required_documents and doc_type not in session["uploaded_documents"]:
             missing_items.append(f"Document: {doc['name']}")
     
     # Check required fields
-    for field_name, field_info in current_stage.get("fields", {}).items():
-        if field_info.get("required", True) and field_name not in session["collected_data"]:
+    for field_name in current_stage.fields:
+        if field_name in current_stage.required_fields and field_name not in session["collected_data"]:
             missing_items.append(f"Field: {field_name.replace('_', ' ').title()}")
     
     if missing_items:
@@ -365,33 +342,33 @@ async def advance_to_next_stage(
 ) -> str:
     """Advance to the next stage in the workflow"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "Workflow session not found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
-    
-    stages = workflow_json.get("collection_sequence", [])
+    stages = session.workflow.stages
     current_index = session["current_stage_index"]
     
     # Mark current stage as complete
-    current_stage = stages[current_index]
-    stage_name = current_stage.get("stage", f"stage_{current_index}")
-    session["stage_completion"][stage_name] = True
+    session.complete_stage(stages[current_index].name)
     
     # Advance to next stage
-    session["current_stage_index"] += 1
+    session.set("current_stage_index", current_index + 1)
+    
+    await application_writes.flush(thread_id, reason="stage")
     
     # Check if workflow is complete
     if session["current_stage_index"] >= len(stages):
-        session["status"] = "complete"
+        session.set("status", "complete")
+        await workflow_sessions.save(session)
         return "**All stages completed!** Ready to generate final JS file for automation."
     
+    await workflow_sessions.save(session)
+    
     # Move to next stage
     next_stage = stages[session["current_stage_index"]]
-    next_title = next_stage.get("stage_title", f"Stage {session['current_stage_index'] + 1}")
     
-    return f"**Stage completed!** Advanced to next stage: **{next_title}**"
+    return f"**Stage completed!** Advanced to next stage: **{next_stage.title}**"
 
 @tool
 async def generate_automation_js_file(
@@ -400,17 +377,17 @@ async def generate_automation_js_file(
 ) -> str:
     """Generate the final JS file for automation using workflow mapping rules"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "Workflow session not found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
+    workflow = session.workflow
     
     if session["status"] != "complete":
         return "Cannot generate JS file - workflow not complete."
     
     # Get automation output mapping from workflow
-    output_mapping = workflow_json.get("automation_output_mapping", {})
+    output_mapping = workflow.get("automation_output_mapping", {})
     target_format = output_mapping.get("target_format", "personal-info.properties.js")
     
     # Prepare the JS data structure
@@ -427,7 +404,7 @@ async def generate_automation_js_file(
     automation_data.update(collected_data)
     
     # Apply any default values from workflow
-    default_values = workflow_json.get("default_values", {})
+    default_values = workflow.get("default_values", {})
     for key, value in default_values.items():
         if key not in automation_data:
             automation_data[key] = value
@@ -465,11 +442,13 @@ export const personalInfoConfig = {{
             f.write(js_content)
         
         # Update session status
-        session["status"] = "js_generated"
-        session["output_file"] = output_filename
+        session.set("status", "js_generated")
+        session.set("output_file", output_filename)
+        await workflow_sessions.save(session)
         
-        # Update database
+        # Update database (after pending field writes, which this full save would overwrite)
         try:
+            await application_writes.flush(thread_id, reason="stage")
             db_application = await ComprehensiveVisaApplication.find_one({"thread_id": thread_id})
             if db_application:
                 db_application.automation_ready_data = automation_data
@@ -497,16 +476,16 @@ async def get_workflow_status(
 ) -> str:
     """Get current workflow status and progress summary"""
     
-    if thread_id not in workflow_sessions:
+    session = await workflow_sessions.get(thread_id)
+    if session is None:
         return "No workflow session found."
     
-    session = workflow_sessions[thread_id]
-    workflow_json = session.get("workflow_json")
+    workflow = session.workflow
     
-    if not workflow_json:
+    if not workflow:
         return "No workflow loaded."
     
-    stages = workflow_json.get("collection_sequence", [])
+    stages = workflow.stages
     current_index = session["current_stage_index"]
     
     status = f"""**Workflow Status Report**
@@ -527,7 +506,7 @@ async def get_workflow_status(
         else:
             status_icon = "PENDING"
         
-        status += f"{status_icon} - {stage.get('stage_title', f'Stage {i+1}')}\n"
+        status += f"{status_icon} - {stage.title}\n"
     
     status += f"\n**Data Collected:** {len(session['collected_data'])} fields"
     status += f"\n**Documents Uploaded:** {len(session['uploaded_documents'])} documents"
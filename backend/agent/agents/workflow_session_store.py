@@ -0,0 +1,254 @@
+# Workflow session store for the intelligent workflow agent
+# Purpose: Persist workflow sessions in MongoDB (`workflow_sessions` collection) behind a
+# bounded in-process write-back cache. Sessions keep a reference (id and version) to their
+# compiled workflow in the workflow registry instead of a copy of the workflow JSON.
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from config.workflow_registry import CompiledWorkflow, workflow_registry
+
+SESSION_COLLECTION = os.getenv("WORKFLOW_SESSION_COLLECTION", "workflow_sessions")
+SESSION_CACHE_SIZE = int(os.getenv("WORKFLOW_SESSION_CACHE_SIZE", "1000"))
+SESSION_CACHE_TTL = int(os.getenv("WORKFLOW_SESSION_CACHE_TTL", "3600"))          # Idle seconds before a cached session is dropped
+SESSION_TTL = int(os.getenv("WORKFLOW_SESSION_TTL", str(30 * 24 * 3600)))        # Idle seconds before a stored session expires
+SESSION_BACKEND = os.getenv("WORKFLOW_SESSION_BACKEND", "mongo").lower()         # "mongo" or "memory"
+
+
+class WorkflowSession:
+    """
+    One applicant's workflow progress. Reads go through item access like the old
+    session dict; writes go through the setters, which record the changed paths so
+    `WorkflowSessionStore.save` persists only the delta.
+    """
+
+    def __init__(self, thread_id: str, data: Dict[str, Any], revision: int = 0, persisted: bool = False):
+        self.thread_id = thread_id
+        self.data = data
+        self.revision = revision
+        self.persisted = persisted  # False until a document exists in the collection
+        self._dirty: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    @property
+    def workflow(self) -> Optional[CompiledWorkflow]:
+        return workflow_registry.get(self.data.get("workflow_ref"), self.data.get("workflow_version"))
+
+    def bind_workflow(self, workflow: CompiledWorkflow) -> None:
+        self.set("workflow_ref", workflow.workflow_id)
+        self.set("workflow_version", workflow.version)
+
+    def set(self, key: str, value: Any) -> None:
+        self.data[key] = value
+        self._dirty[key] = value
+
+    def set_collected(self, field_name: str, value: Any) -> None:
+        self.data["collected_data"][field_name] = value
+        self._dirty[f"collected_data.{field_name}"] = value
+
+    def set_document(self, document_type: str, info: Dict[str, Any]) -> None:
+        self.data["uploaded_documents"][document_type] = info
+        self._dirty[f"uploaded_documents.{document_type}"] = info
+
+    def complete_stage(self, stage_name: str) -> None:
+        self.data["stage_completion"][stage_name] = True
+        self._dirty[f"stage_completion.{stage_name}"] = True
+
+    def pop_changes(self) -> Dict[str, Any]:
+        changes, self._dirty = self._dirty, {}
+        return changes
+
+    def restore_changes(self, changes: Dict[str, Any]) -> None:
+        """Put back changes whose write failed; anything set since then is newer and wins"""
+        self._dirty = {**changes, **self._dirty}
+
+
+class WorkflowSessionStore:
+    """
+    Write-back cache over the `workflow_sessions` collection.
+
+    Sessions are cached per process (LRU with idle expiry). A read checks the stored
+    revision so a session moved between workers is never served stale; `save` sends
+    the accumulated changes as a single upserting `$set`. A session whose document
+    was never written (or has expired) is written in full instead, and changes from
+    a failed write are kept for the next save.
+    """
+
+    def __init__(self, collection_name: str, max_entries: int, cache_ttl: int, ttl: int, durable: bool = True):
+        self.collection_name = collection_name
+        self.max_entries = max_entries
+        self.cache_ttl = cache_ttl
+        self.ttl = ttl
+        self.durable = durable
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._indexes_ready = False
+        self.hits = 0
+        self.loads = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.evictions = 0
+
+    async def _collection(self):
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            raise RuntimeError("MongoDB is not connected")
+
+        collection = database[self.collection_name]
+        if not self._indexes_ready:
+            await collection.create_index("updated_at", expireAfterSeconds=self.ttl)
+            self._indexes_ready = True
+        return collection
+
+    def _cached(self, thread_id: str) -> Optional[WorkflowSession]:
+        entry = self._cache.get(thread_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["touched_at"] > self.cache_ttl:
+            del self._cache[thread_id]
+            return None
+        entry["touched_at"] = time.monotonic()
+        self._cache.move_to_end(thread_id)
+        return entry["session"]
+
+    def _remember(self, session: WorkflowSession) -> None:
+        self._cache[session.thread_id] = {"session": session, "touched_at": time.monotonic()}
+        self._cache.move_to_end(session.thread_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, thread_id: str) -> Optional[WorkflowSession]:
+        """Synchronous local-cache lookup for callers that cannot await"""
+        return self._cached(thread_id)
+
+    async def create(self, thread_id: str, handoff_data: Dict[str, Any]) -> WorkflowSession:
+        data = {
+            "handoff_data": handoff_data,
+            "workflow_ref": None,
+            "workflow_version": None,
+            "current_stage_index": 0,
+            "collected_data": {},
+            "uploaded_documents": {},
+            "stage_completion": {},
+            "session_start": datetime.now().isoformat(),
+            "status": "initialized"
+        }
+        session = WorkflowSession(thread_id, data)
+        if self.durable:
+            try:
+                collection = await self._collection()
+                document = await collection.find_one_and_update(
+                    {"_id": thread_id},
+                    {"$set": {**data, "updated_at": datetime.utcnow()}, "$inc": {"revision": 1}},
+                    upsert=True,
+                    projection={"revision": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                session.revision = document.get("revision", 0) if document else 0
+                session.persisted = True
+                self.writes += 1
+            except Exception as e:
+                print(f"Workflow session write error for {thread_id}: {e}")
+        self._remember(session)
+        return session
+
+    async def get(self, thread_id: str) -> Optional[WorkflowSession]:
+        """Session for a thread, or None if there is no active workflow"""
+        cached = self._cached(thread_id)
+        if not self.durable:
+            if cached:
+                self.hits += 1
+            return cached
+
+        try:
+            collection = await self._collection()
+            query = {"_id": thread_id}
+            if cached:
+                query["revision"] = {"$gt": cached.revision}
+            document = await collection.find_one(query)
+        except Exception as e:
+            print(f"Workflow session read error for {thread_id}: {e}")
+            return cached
+
+        if not document:
+            if cached:
+                self.hits += 1
+            return cached
+
+        self.loads += 1
+        revision = document.pop("revision", 0)
+        document.pop("_id", None)
+        document.pop("updated_at", None)
+        session = WorkflowSession(thread_id, document, revision, persisted=True)
+        self._remember(session)
+        return session
+
+    async def save(self, session: WorkflowSession) -> bool:
+        """Persist the session's pending changes in one update; False if the write failed"""
+        if not self.durable:
+            session.pop_changes()
+            return True
+        changes = session.pop_changes()
+        if not changes and session.persisted:
+            return True
+        try:
+            collection = await self._collection()
+            # Field paths alone would upsert a partial document, so unsaved sessions go in full
+            fields = changes if session.persisted else session.data
+            document = await self._write(collection, session.thread_id, fields)
+            if session.persisted and document and document.get("revision") == 1:
+                # The stored document had expired and the upsert recreated it from the delta
+                document = await self._write(collection, session.thread_id, session.data)
+            if document:
+                session.revision = document.get("revision", session.revision)
+            session.persisted = True
+            self.writes += 1
+            return True
+        except Exception as e:
+            session.restore_changes(changes)
+            self.write_errors += 1
+            print(f"Workflow session write error for {session.thread_id} ({len(changes)} changes kept for retry): {e}")
+            return False
+
+    async def _write(self, collection, thread_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await collection.find_one_and_update(
+            {"_id": thread_id},
+            {"$set": {**fields, "updated_at": datetime.utcnow()}, "$inc": {"revision": 1}},
+            upsert=True,
+            projection={"revision": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "mongo" if self.durable else "memory",
+            "cached_sessions": len(self._cache),
+            "max_sessions": self.max_entries,
+            "cache_hits": self.hits,
+            "loads": self.loads,
+            "writes": self.writes,
+            "write_errors": self.write_errors,
+            "evictions": self.evictions
+        }
+
+
+# Global session store
+workflow_sessions = WorkflowSessionStore(
+    collection_name=SESSION_COLLECTION,
+    max_entries=SESSION_CACHE_SIZE,
+    cache_ttl=SESSION_CACHE_TTL,
+    ttl=SESSION_TTL,
+    durable=SESSION_BACKEND == "mongo"
+)
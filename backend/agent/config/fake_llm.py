@@ -0,0 +1,111 @@
+# Fake chat model for local tests and benchmarks
+# Purpose: Stand-in LLM provider (LLM_PROVIDER=fake) with configurable latency and canned,
+# prompt-matched replies, so tool and load benchmarks run without API keys or quota
+
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# (substring of the last message, reply) - first match wins. Covers the structured
+# extraction helpers so the tools parse a realistic answer.
+DEFAULT_FAKE_RULES: List[Tuple[str, str]] = [
+    ("Extract the country name", "thailand"),
+    ("Extract visa application information", "Country: thailand\nPurpose: tourism\nTravelers: 2\nDates: 24/01/26 to 02/02/26"),
+    ("Analyze this message about document upload",
+     '{"document_types": ["passport_bio_page"], "upload_status": "completed", "message_intent": "upload_confirmation"}'),
+]
+
+DEFAULT_FAKE_RESPONSE = "This is a response from the fake LLM provider."
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model. Replies are picked by substring match on the last
+    message, after sleeping `latency` seconds; streaming yields one chunk per word.
+    It never emits tool calls, so a ReAct agent on top of it answers directly.
+    """
+
+    model_name: str = "fake"
+    latency: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "50")) / 1000
+    rules: List[Tuple[str, str]] = DEFAULT_FAKE_RULES
+    default_response: str = os.getenv("FAKE_LLM_RESPONSE", DEFAULT_FAKE_RESPONSE)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content) if messages else ""
+        for needle, reply in self.rules:
+            if needle in prompt:
+                return reply
+        return self.default_response
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        reply = self._reply(messages)
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        message = AIMessage(content=reply, usage_metadata={
+            "input_tokens": prompt_tokens,
+            "output_tokens": len(reply) // 4,
+            "total_tokens": prompt_tokens + len(reply) // 4
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for word in self._words(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for word in self._words(messages):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    def _words(self, messages: List[BaseMessage]) -> List[str]:
+        words = self._reply(messages).split(" ")
+        return [word if i == len(words) - 1 else word + " " for i, word in enumerate(words)]
@@ -0,0 +1,156 @@
+# Model registry for per-task LLM routing
+# Purpose: Named routes ("main", "extraction") each bound to a provider/model with its own
+# timeout and concurrency limit, so cheap structured-extraction calls go to a small, fast
+# model while the ReAct agent keeps the main model
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+from langchain_core.language_models import BaseChatModel
+
+MAIN_ROUTE = "main"
+EXTRACTION_ROUTE = "extraction"
+
+
+def create_chat_model(provider: str, model_name: str, max_tokens: int, temperature: float, timeout: int) -> BaseChatModel:
+    """Build a chat model for a provider name ("gemini" or "fake")"""
+    if provider == "fake":
+        from config.fake_llm import FakeChatModel
+        return FakeChatModel(model_name=model_name)
+
+    if provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        google_api_key = os.getenv("GOOGLE_API_KEY")
+        if not google_api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable is required")
+
+        return ChatGoogleGenerativeAI(
+            model=model_name,
+            google_api_key=google_api_key,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout
+        )
+
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+class ModelRoute:
+    """
+    One named model binding. The model is built on first use; calls through the
+    route are limited to `max_concurrency` in flight (separately for sync and async
+    callers) and bounded by `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        provider: str,
+        model_name: str,
+        timeout: int,
+        max_concurrency: int,
+        max_tokens: int,
+        temperature: float,
+        llm: Optional[BaseChatModel] = None
+    ):
+        self.name = name
+        self.provider = provider
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self._llm = llm
+        self._llm_lock = threading.Lock()
+        # Created inside the running loop: on Python 3.9 a semaphore binds to the
+        # loop current at construction, which at import time isn't uvicorn's
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self._async_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+
+    @property
+    def llm(self) -> BaseChatModel:
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = create_chat_model(
+                        self.provider, self.model_name, self.max_tokens, self.temperature, self.timeout
+                    )
+        return self._llm
+
+    @contextmanager
+    def sync_slot(self):
+        with self._sync_slots:
+            with self._track():
+                yield
+
+    @asynccontextmanager
+    async def async_slot(self):
+        async with self._loop_slots():
+            with self._track():
+                yield
+
+    def _loop_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._async_slots is None or self._async_slots_loop is not loop:
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+            self._async_slots_loop = loop
+        return self._async_slots
+
+    @contextmanager
+    def _track(self):
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except (asyncio.TimeoutError, TimeoutError):
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.calls += 1
+            self.total_latency += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "model": self.model_name,
+            "timeout": self.timeout,
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_latency_ms": round(self.total_latency / self.calls * 1000, 1) if self.calls else 0.0
+        }
+
+
+class ModelRegistry:
+    """Named model routes; unknown route names fall back to the main route"""
+
+    def __init__(self):
+        self.routes: Dict[str, ModelRoute] = {}
+
+    def register(self, route: ModelRoute) -> ModelRoute:
+        self.routes[route.name] = route
+        return route
+
+    def get(self, name: Optional[str] = None) -> ModelRoute:
+        return self.routes.get(name or MAIN_ROUTE) or self.routes[MAIN_ROUTE]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: route.stats() for name, route in self.routes.items()}
@@ -3,16 +3,16 @@
 
 import os
 import time
+import asyncio
+import threading
 from typing import Any, Optional
 # from langchain.chat_models import init_chat_model  # Anthropic - commented out
 from langchain_core.language_models import BaseChatModel
 # from langchain_groq import ChatGroq  # Groq has LangGraph compatibility issues
-from langchain_google_genai import ChatGoogleGenerativeAI  # Using Gemini for LangGraph compatibility
+# Gemini (langchain_google_genai) is imported by create_chat_model when the model is first built
 from dotenv import load_dotenv
 
-# Langfuse imports for observability
-from langfuse import Langfuse
-from langfuse.langchain import CallbackHandler
+from config.model_registry import ModelRegistry, ModelRoute, MAIN_ROUTE, EXTRACTION_ROUTE
 
 load_dotenv()
 
@@ -26,15 +26,46 @@ class LLMConfig:
         # self.model_name = os.getenv("LLM_MODEL", "anthropic:claude-sonnet-4-20250514")
         
         # Gemini configuration - new (using recommended model for LangGraph)
+        self.provider = os.getenv("LLM_PROVIDER", "gemini").lower()  # "gemini" or "fake" (local tests/benchmarks)
         self.model_name = os.getenv("LLM_MODEL", "gemini-2.5-flash")
         self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "8192"))
         self.temperature = float(os.getenv("LLM_TEMPERATURE", "0"))
         self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
         self.retry_delay = float(os.getenv("LLM_RETRY_DELAY", "1.0"))
         self.timeout = int(os.getenv("LLM_TIMEOUT", "30"))
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
         self.streaming_enabled = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
         
-        self.llm = self._initialize_llm()
+        # Models are built on first use (no network); check_ready() makes the first live call
+        self.registry = self._initialize_registry()
+    
+    @property
+    def llm(self) -> BaseChatModel:
+        """Main model, built on first access"""
+        return self._initialize_llm()
+    
+    def _initialize_registry(self) -> ModelRegistry:
+        """Main route serves the agent's model; extraction route gets a small, fast model"""
+        registry = ModelRegistry()
+        registry.register(ModelRoute(
+            MAIN_ROUTE,
+            provider=self.provider,
+            model_name=self.model_name,
+            timeout=self.timeout,
+            max_concurrency=self.max_concurrency,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
+        ))
+        registry.register(ModelRoute(
+            EXTRACTION_ROUTE,
+            provider=os.getenv("LLM_EXTRACTION_PROVIDER", self.provider).lower(),
+            model_name=os.getenv("LLM_EXTRACTION_MODEL", "gemini-2.5-flash-lite"),
+            timeout=int(os.getenv("LLM_EXTRACTION_TIMEOUT", "10")),
+            max_concurrency=int(os.getenv("LLM_EXTRACTION_MAX_CONCURRENCY", "16")),
+            max_tokens=int(os.getenv("LLM_EXTRACTION_MAX_TOKENS", "512")),
+            temperature=0
+        ))
+        return registry
     
     def _initialize_llm(self) -> BaseChatModel:
         """Initialize LLM with error handling and validation"""
@@ -53,39 +84,34 @@ class LLMConfig:
             #     timeout=self.timeout
             # )
             
-            # Gemini initialization - new
-            google_api_key = os.getenv("GOOGLE_API_KEY")
-            if not google_api_key:
-                raise ValueError("GOOGLE_API_KEY environment variable is required")
-
-            llm = ChatGoogleGenerativeAI(
-                model=self.model_name,
-                google_api_key=google_api_key,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                timeout=self.timeout
-            )
-            
-            # Test the model
-            from langchain_core.messages import HumanMessage
-            test_response = llm.invoke([HumanMessage(content="Hello")])
-            if not test_response or not test_response.content:
-                raise RuntimeError("LLM initialization test failed")
-            
-            # LLM initialized successfully - no print for clean terminal
-            return llm
+            # Gemini initialization - new (LLM_PROVIDER=fake swaps in the local fake model)
+            # Construction is local; the live test call moved to check_ready()
+            return self.registry.get(MAIN_ROUTE).llm
             
         except Exception as e:
             print(f"LLM initialization failed: {e}")
             raise RuntimeError(f"Failed to initialize LLM: {e}")
     
-    def invoke_with_retry(self, messages: list, **kwargs) -> Any:
+    async def check_ready(self) -> None:
+        """Readiness probe: one live call to the main model, raises if it fails or is empty"""
+        from langchain_core.messages import HumanMessage
+        model_route = self.registry.get(MAIN_ROUTE)
+        test_response = await asyncio.wait_for(
+            self.llm.ainvoke([HumanMessage(content="Hello")]),
+            timeout=model_route.timeout
+        )
+        if not test_response or not test_response.content:
+            raise RuntimeError("LLM readiness test failed")
+    
+    def invoke_with_retry(self, messages: list, route: Optional[str] = None, **kwargs) -> Any:
         """Invoke LLM with retry logic and error handling"""
         last_error = None
+        model_route = self.registry.get(route)
         
         for attempt in range(self.max_retries + 1):
             try:
-                response = self.llm.invoke(messages, timeout=self.timeout, **kwargs)
+                with model_route.sync_slot():
+                    response = model_route.llm.invoke(messages, timeout=model_route.timeout, **kwargs)
                 
                 if not response or not response.content:
                     raise RuntimeError("Empty response from LLM")
@@ -108,14 +134,16 @@ class LLMConfig:
         
         raise RuntimeError(f"LLM invocation failed after all retries: {last_error}")
     
-    def stream_with_retry(self, messages: list, **kwargs):
+    def stream_with_retry(self, messages: list, route: Optional[str] = None, **kwargs):
         """Stream LLM response with retry logic"""
         last_error = None
+        model_route = self.registry.get(route)
         
         for attempt in range(self.max_retries + 1):
             try:
-                for chunk in self.llm.stream(messages, timeout=self.timeout, **kwargs):
-                    yield chunk
+                with model_route.sync_slot():
+                    for chunk in model_route.llm.stream(messages, timeout=model_route.timeout, **kwargs):
+                        yield chunk
                 return
                 
             except Exception as e:
@@ -134,6 +162,71 @@ class LLMConfig:
         
         raise RuntimeError(f"LLM streaming failed after all retries: {last_error}")
     
+    async def ainvoke_with_retry(self, messages: list, route: Optional[str] = None, **kwargs) -> Any:
+        """Invoke LLM asynchronously with retry logic, without blocking the event loop"""
+        last_error = None
+        model_route = self.registry.get(route)
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with model_route.async_slot():
+                    response = await asyncio.wait_for(
+                        model_route.llm.ainvoke(messages, timeout=model_route.timeout, **kwargs),
+                        timeout=model_route.timeout
+                    )
+                
+                if not response or not response.content:
+                    raise RuntimeError("Empty response from LLM")
+                
+                return response
+                
+            except Exception as e:
+                last_error = e
+                
+                if self._is_non_retryable_error(e):
+                    print(f"Non-retryable LLM error: {e}")
+                    raise e
+                
+                if attempt < self.max_retries:
+                    wait_time = self.retry_delay * (2 ** attempt)
+                    print(f"LLM attempt {attempt + 1} failed: {e}. Retrying in {wait_time}s...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    print(f"LLM failed after {self.max_retries + 1} attempts: {e}")
+        
+        raise RuntimeError(f"LLM invocation failed after all retries: {last_error}")
+    
+    async def astream_with_retry(self, messages: list, route: Optional[str] = None, **kwargs):
+        """Stream LLM response asynchronously with retry logic"""
+        last_error = None
+        model_route = self.registry.get(route)
+        
+        for attempt in range(self.max_retries + 1):
+            yielded = False
+            try:
+                async with model_route.async_slot():
+                    async for chunk in model_route.llm.astream(messages, timeout=model_route.timeout, **kwargs):
+                        yielded = True
+                        yield chunk
+                return
+                
+            except Exception as e:
+                last_error = e
+                
+                # Retrying after partial output would duplicate tokens already sent
+                if yielded or self._is_non_retryable_error(e):
+                    print(f"Non-retryable streaming error: {e}")
+                    raise e
+                
+                if attempt < self.max_retries:
+                    wait_time = self.retry_delay * (2 ** attempt)
+                    print(f"Streaming attempt {attempt + 1} failed: {e}. Retrying in {wait_time}s...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    print(f"Streaming failed after {self.max_retries + 1} attempts: {e}")
+        
+        raise RuntimeError(f"LLM streaming failed after all retries: {last_error}")
+    
     def _is_non_retryable_error(self, error: Exception) -> bool:
         """Determine if error should not be retried"""
         error_str = str(error).lower()
@@ -160,10 +253,16 @@ class AppConfig:
         # Session management
         self.session_timeout = int(os.getenv("SESSION_TIMEOUT", "3600"))
         self.max_sessions = int(os.getenv("MAX_SESSIONS", "1000"))
+        self.thread_state_backend = os.getenv("THREAD_STATE_BACKEND", "mongo").lower()  # "mongo" or "memory"
         
         # Tool settings
         self.max_tool_calls_per_turn = int(os.getenv("MAX_TOOL_CALLS", "10"))
         self.tool_timeout = int(os.getenv("TOOL_TIMEOUT", "30"))
+        self.sync_tool_workers = int(os.getenv("SYNC_TOOL_WORKERS", "16"))  # Thread pool size for sync tools in async runs
+        
+        # Intent routing (rule-based pre-routing in front of the ReAct agent)
+        self.intent_router_enabled = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+        self.intent_router_threshold = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.9"))
         
         # Error handling
         self.max_error_history = int(os.getenv("MAX_ERROR_HISTORY", "50"))
@@ -172,10 +271,30 @@ class AppConfig:
         # Performance
         self.enable_caching = os.getenv("ENABLE_CACHING", "true").lower() == "true"
         self.cache_ttl = int(os.getenv("CACHE_TTL", "300"))
+        self.enquiry_cache_ttl = int(os.getenv("ENQUIRY_CACHE_TTL", "86400"))
+        self.enquiry_cache_max_entries = int(os.getenv("ENQUIRY_CACHE_MAX_ENTRIES", "500"))
+        self.enquiry_cache_similarity = float(os.getenv("ENQUIRY_CACHE_SIMILARITY", "0.85"))
+        
+        # Conversation history compaction (older turns folded into conversation_summary)
+        self.history_compaction_enabled = os.getenv("HISTORY_COMPACTION_ENABLED", "true").lower() == "true"
+        self.history_max_turns = int(os.getenv("HISTORY_MAX_TURNS", "10"))        # User turns before compacting
+        self.history_max_tokens = int(os.getenv("HISTORY_MAX_TOKENS", "4000"))    # Estimated history tokens before compacting
+        self.history_keep_turns = int(os.getenv("HISTORY_KEEP_TURNS", "4"))       # Recent turns always kept verbatim
+        self.history_summary_max_words = int(os.getenv("HISTORY_SUMMARY_MAX_WORDS", "200"))
         
         # Streaming settings
-        self.streaming_chunk_size = int(os.getenv("STREAMING_CHUNK_SIZE", "1024"))
-        self.streaming_timeout = int(os.getenv("STREAMING_TIMEOUT", "60"))
+        self.streaming_chunk_size = int(os.getenv("STREAMING_CHUNK_SIZE", "1024"))  # Bytes buffered before a flush; 0 = one frame per token
+        self.streaming_flush_interval = int(os.getenv("STREAMING_FLUSH_INTERVAL_MS", "50")) / 1000
+        self.streaming_compact_frames = os.getenv("STREAMING_COMPACT_FRAMES", "false").lower() == "true"
+        self.streaming_final_event = os.getenv("STREAMING_FINAL_EVENT", "true").lower() == "true"
+        self.streaming_timeout = int(os.getenv("STREAMING_TIMEOUT", "60"))  # Whole-run budget; the run is cancelled after it
+        self.streaming_heartbeat_interval = float(os.getenv("STREAMING_HEARTBEAT_INTERVAL", "15"))  # Seconds of silence before a heartbeat comment
+        
+        # Startup and readiness (remote checks run on /health/ready, not at import)
+        self.readiness_cache_ttl = float(os.getenv("READINESS_CACHE_TTL", "30"))  # Seconds a readiness result is reused
+        self.readiness_timeout = float(os.getenv("READINESS_TIMEOUT", "10"))      # Per-check timeout
+        self.warmup_on_startup = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"  # Run readiness checks in the background at boot
+        self.index_audit_on_startup = os.getenv("INDEX_AUDIT_ON_STARTUP", "false").lower() == "true"  # explain() hot queries at boot, log collection scans
 
 
 # Langfuse Configuration
@@ -190,35 +309,56 @@ class LangfuseConfig:
         # Try LANGFUSE_BASE_URL first (standard), then fall back to LANGFUSE_HOST
         self.host = os.getenv("LANGFUSE_BASE_URL") or os.getenv("LANGFUSE_HOST", "https://cloud.langfuse.com")
 
-        # Initialize Langfuse client if credentials are provided
+        # Langfuse client is created on first use; the auth check runs in check_ready()
         self.client = None
         self.handler = None
+        self._initialized = False
+        self._lock = threading.Lock()
 
-        if self.enabled and self.public_key and self.secret_key:
+        if self.enabled and not (self.public_key and self.secret_key):
+            print("⚠️ Langfuse credentials not found. Tracing disabled.")
+            self.enabled = False
+
+    def _initialize(self) -> None:
+        """Create the Langfuse client and callback handler once, without network calls"""
+        with self._lock:
+            if self._initialized:
+                return
             try:
+                # Langfuse imports for observability (deferred: they pull in OpenTelemetry)
+                from langfuse import Langfuse
+                from langfuse.langchain import CallbackHandler
+
                 self.client = Langfuse(
                     public_key=self.public_key,
                     secret_key=self.secret_key,
                     host=self.host
                 )
-                # Test connection
-                self.client.auth_check()
-                print("✅ Langfuse initialized successfully")
 
                 # Create callback handler for LangChain integration
                 # Note: CallbackHandler reads from environment variables automatically
                 self.handler = CallbackHandler()
+                print("✅ Langfuse initialized successfully")
             except Exception as e:
                 print(f"⚠️ Langfuse initialization failed: {e}")
                 self.enabled = False
-        elif self.enabled:
-            print("⚠️ Langfuse credentials not found. Tracing disabled.")
-            self.enabled = False
+            self._initialized = True
 
-    def get_callback_handler(self) -> Optional[CallbackHandler]:
+    def get_callback_handler(self) -> Optional[Any]:
         """Get Langfuse callback handler for agent invocation"""
+        if not self.enabled:
+            return None
+        if not self._initialized:
+            self._initialize()
         return self.handler if self.enabled else None
 
+    async def check_ready(self) -> None:
+        """Readiness probe: Langfuse auth check, run off the event loop"""
+        if not self.get_callback_handler():
+            return
+        if not await asyncio.to_thread(self.client.auth_check):
+            raise RuntimeError("Langfuse auth check failed")
+
 
 # Global Instances
 
@@ -226,17 +366,28 @@ llm_config = LLMConfig()
 app_config = AppConfig()
 langfuse_config = LangfuseConfig()
 
-# Export LLM instance for backward compatibility
-llm = llm_config.llm
+# Export LLM instance for backward compatibility (resolved on first access, see __getattr__)
+def __getattr__(name: str) -> Any:
+    if name == "llm":
+        return llm_config.llm
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Export enhanced LLM functions
-def invoke_llm_safe(messages: list, **kwargs) -> Any:
-    """Safe LLM invocation with retry logic"""
-    return llm_config.invoke_with_retry(messages, **kwargs)
+def invoke_llm_safe(messages: list, route: Optional[str] = None, **kwargs) -> Any:
+    """Safe LLM invocation with retry logic; `route` picks a registry model (default: main)"""
+    return llm_config.invoke_with_retry(messages, route=route, **kwargs)
 
-def stream_llm_safe(messages: list, **kwargs):
+def stream_llm_safe(messages: list, route: Optional[str] = None, **kwargs):
     """Safe LLM streaming with retry logic"""
-    return llm_config.stream_with_retry(messages, **kwargs)
+    return llm_config.stream_with_retry(messages, route=route, **kwargs)
+
+async def ainvoke_llm_safe(messages: list, route: Optional[str] = None, **kwargs) -> Any:
+    """Safe async LLM invocation with retry logic (use from async tools)"""
+    return await llm_config.ainvoke_with_retry(messages, route=route, **kwargs)
+
+def astream_llm_safe(messages: list, route: Optional[str] = None, **kwargs):
+    """Safe async LLM streaming with retry logic (use from async tools)"""
+    return llm_config.astream_with_retry(messages, route=route, **kwargs)
 
 
 # Environment Validation
@@ -248,6 +399,8 @@ def validate_environment() -> tuple[bool, list[str]]:
     # required_vars = ["ANTHROPIC_API_KEY"]  # Anthropic - commented out
     # required_vars = ["GROQ_API_KEY"]  # Groq - commented out
     required_vars = ["GOOGLE_API_KEY"]  # Gemini - new
+    if all(route.provider == "fake" for route in llm_config.registry.routes.values()):
+        required_vars = []
     for var in required_vars:
         if not os.getenv(var):
             issues.append(f"Missing required environment variable: {var}")
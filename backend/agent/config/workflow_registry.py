@@ -0,0 +1,344 @@
+# Workflow definition registry
+# Purpose: Load every visa workflow definition once (from the workflow JSON files or the
+# `workflow_definitions` collection), validate it and compile it into an immutable object
+# with per-stage lookup indexes that all sessions share. Definitions are versioned by
+# content hash and can be hot-reloaded; sessions pinned to an older version keep it.
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+WORKFLOW_SOURCE = os.getenv("WORKFLOW_SOURCE", "files").lower()                   # "files" or "mongo"
+WORKFLOW_GLOB = os.getenv("WORKFLOW_GLOB", os.path.join(BACKEND_DIR, "*_workflow*.json"))
+WORKFLOW_COLLECTION = os.getenv("WORKFLOW_COLLECTION", "workflow_definitions")
+WORKFLOW_RELOAD_INTERVAL = int(os.getenv("WORKFLOW_RELOAD_INTERVAL", "60"))       # Seconds between reload checks; 0 disables
+WORKFLOW_VERSIONS_RETAINED = int(os.getenv("WORKFLOW_VERSIONS_RETAINED", "3"))   # Older versions kept for pinned sessions
+
+
+class WorkflowDefinitionError(ValueError):
+    """A workflow definition failed validation"""
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _version_key(version: Any) -> Tuple:
+    parts = []
+    for part in str(version or "0").split("."):
+        parts.append((0, int(part), "") if part.isdigit() else (1, 0, part))
+    return tuple(parts)
+
+
+def validate_definition(definition: Dict[str, Any]) -> None:
+    """Raise WorkflowDefinitionError if the definition can't be executed"""
+    workflow_id = definition.get("_id")
+    if not workflow_id or not definition.get("visa_type"):
+        raise WorkflowDefinitionError("workflow needs '_id' and 'visa_type'")
+
+    stages = definition.get("collection_sequence")
+    if not isinstance(stages, list) or not stages:
+        raise WorkflowDefinitionError(f"{workflow_id}: 'collection_sequence' must be a non-empty list")
+
+    seen = set()
+    for index, stage in enumerate(stages):
+        name = stage.get("stage") if isinstance(stage, dict) else None
+        if not name:
+            raise WorkflowDefinitionError(f"{workflow_id}: stage {index} has no 'stage' name")
+        if name in seen:
+            raise WorkflowDefinitionError(f"{workflow_id}: duplicate stage '{name}'")
+        seen.add(name)
+
+        if not isinstance(stage.get("fields", {}), dict):
+            raise WorkflowDefinitionError(f"{workflow_id}: stage '{name}' fields must be an object")
+        documents = stage.get("required_documents", [])
+        if not isinstance(documents, list):
+            raise WorkflowDefinitionError(f"{workflow_id}: stage '{name}' required_documents must be a list")
+        for document in documents:
+            if not isinstance(document, dict) or not document.get("type"):
+                raise WorkflowDefinitionError(f"{workflow_id}: stage '{name}' has a document without 'type'")
+            extracts = document.get("extracts") or []
+            if not isinstance(extracts, list) or not all(isinstance(field, str) for field in extracts):
+                raise WorkflowDefinitionError(f"{workflow_id}: document '{document['type']}' extracts must be a list of field names")
+
+
+@dataclass(frozen=True)
+class CompiledStage:
+    index: int
+    name: str
+    title: str
+    config: Mapping[str, Any]                         # The stage as defined (read-only)
+    fields: Mapping[str, Mapping[str, Any]]           # Field name -> field definition
+    documents: Mapping[str, Mapping[str, Any]]        # Document type -> document definition
+    required_fields: FrozenSet[str]
+    required_documents: FrozenSet[str]
+    extracts: Mapping[str, Tuple[str, ...]]           # Document type -> fields it fills
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """
+    A validated workflow definition. Read-only: `definition` is a frozen view of the
+    JSON (so `.get()` and item access work as on the parsed dict), `json_text` is its
+    serialized form for prompts, and the stage indexes replace per-call list scans.
+    """
+    workflow_id: str
+    visa_type: str
+    declared_version: str
+    version: str                                      # Content hash; changes on every edit
+    source: str
+    loaded_at: float
+    definition: Mapping[str, Any]
+    json_text: str
+    stages: Tuple[CompiledStage, ...]
+    stage_index: Mapping[str, int]
+    field_stage: Mapping[str, str]                    # Field name -> first stage that collects it
+    document_extracts: Mapping[str, Tuple[str, ...]]  # Document type -> fields, across all stages
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.definition.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.definition[key]
+
+    def stage(self, name: str) -> Optional[CompiledStage]:
+        index = self.stage_index.get(name)
+        return self.stages[index] if index is not None else None
+
+
+def compile_workflow(definition: Dict[str, Any], source: str) -> CompiledWorkflow:
+    validate_definition(definition)
+    json_text = json.dumps(definition, indent=2, default=str)
+    version = hashlib.sha256(json.dumps(definition, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+    stages = []
+    field_stage: Dict[str, str] = {}
+    document_extracts: Dict[str, Tuple[str, ...]] = {}
+    for index, stage in enumerate(definition["collection_sequence"]):
+        fields = stage.get("fields", {})
+        documents = {document["type"]: document for document in stage.get("required_documents", [])}
+        extracts = {doc_type: tuple(document.get("extracts") or ()) for doc_type, document in documents.items()}
+
+        for field_name in fields:
+            field_stage.setdefault(field_name, stage["stage"])
+        for doc_type, fields_filled in extracts.items():
+            document_extracts.setdefault(doc_type, fields_filled)
+
+        stages.append(CompiledStage(
+            index=index,
+            name=stage["stage"],
+            title=stage.get("stage_title", f"Stage {index + 1}"),
+            config=_freeze(stage),
+            fields=_freeze(fields),
+            documents=_freeze(documents),
+            required_fields=frozenset(name for name, info in fields.items() if info.get("required", True)),
+            required_documents=frozenset(t for t, document in documents.items() if document.get("required", True)),
+            extracts=MappingProxyType(extracts)
+        ))
+
+    return CompiledWorkflow(
+        workflow_id=str(definition["_id"]),
+        visa_type=definition["visa_type"],
+        declared_version=str(definition.get("version", "")),
+        version=version,
+        source=source,
+        loaded_at=time.time(),
+        definition=_freeze(definition),
+        json_text=json_text,
+        stages=tuple(stages),
+        stage_index=MappingProxyType({stage.name: stage.index for stage in stages}),
+        field_stage=MappingProxyType(field_stage),
+        document_extracts=MappingProxyType(document_extracts)
+    )
+
+
+class WorkflowRegistry:
+    """
+    Compiled workflows by id, with visa types as aliases (the highest declared
+    version wins when several files define the same visa type). `reload()` only
+    recompiles definitions whose content changed and keeps the last few versions
+    of each workflow so in-flight sessions can finish on the one they started.
+    """
+
+    def __init__(self, source: str, pattern: str, collection_name: str, retained_versions: int):
+        self.source = source
+        self.pattern = pattern
+        self.collection_name = collection_name
+        self.retained_versions = retained_versions
+        self._current: Dict[str, CompiledWorkflow] = {}
+        self._versions: Dict[str, "OrderedDict[str, CompiledWorkflow]"] = {}
+        self._aliases: Dict[str, str] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.loads = 0
+        self.reloads = 0
+        self.errors: Dict[str, str] = {}
+
+    # Loading
+
+    def _read_files(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Definitions from files that are new or changed since the last read"""
+        definitions = []
+        for path in sorted(glob.glob(self.pattern)):
+            mtime = os.path.getmtime(path)
+            if self._mtimes.get(path) == mtime:
+                continue
+            try:
+                with open(path, 'r') as f:
+                    definitions.append((os.path.basename(path), json.load(f)))
+                self._mtimes[path] = mtime
+            except (OSError, ValueError) as e:
+                self.errors[os.path.basename(path)] = str(e)
+                print(f"Workflow definition {path} could not be read: {e}")
+        return definitions
+
+    async def _read_collection(self) -> List[Tuple[str, Dict[str, Any]]]:
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            raise RuntimeError("MongoDB is not connected")
+        documents = await database[self.collection_name].find({}).to_list(length=None)
+        return [(f"{self.collection_name}/{document['_id']}", document) for document in documents]
+
+    def _install(self, definitions: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Compile and publish definitions; returns how many changed"""
+        changed = 0
+        for source, definition in definitions:
+            try:
+                compiled = compile_workflow(definition, source)
+            except WorkflowDefinitionError as e:
+                # Keep serving the previous version of a workflow whose edit is invalid
+                self.errors[source] = str(e)
+                print(f"Workflow definition {source} rejected: {e}")
+                continue
+            self.errors.pop(source, None)
+
+            versions = self._versions.setdefault(compiled.workflow_id, OrderedDict())
+            if compiled.version in versions:
+                # Unchanged, or reverted to a version that is still retained
+                if self._current.get(compiled.workflow_id) is versions[compiled.version]:
+                    continue
+                compiled = versions[compiled.version]
+                versions.move_to_end(compiled.version)
+            else:
+                versions[compiled.version] = compiled
+                while len(versions) > self.retained_versions:
+                    versions.popitem(last=False)
+            self._current[compiled.workflow_id] = compiled
+            changed += 1
+            print(f"Workflow {compiled.workflow_id} loaded (version {compiled.declared_version}, {compiled.version}) from {source}")
+
+        by_visa_type: Dict[str, CompiledWorkflow] = {}
+        for compiled in self._current.values():
+            best = by_visa_type.get(compiled.visa_type)
+            if best is None or _version_key(compiled.declared_version) > _version_key(best.declared_version):
+                by_visa_type[compiled.visa_type] = compiled
+        self._aliases = {visa_type: compiled.workflow_id for visa_type, compiled in by_visa_type.items()}
+        return changed
+
+    def load_files(self) -> int:
+        with self._lock:
+            changed = self._install(self._read_files())
+            self._loaded = True
+            self.loads += 1
+            return changed
+
+    async def load(self) -> int:
+        """Load (or reload) every definition from the configured source"""
+        if self.source == "mongo":
+            try:
+                definitions = await self._read_collection()
+                with self._lock:
+                    changed = self._install(definitions)
+                    self._loaded = True
+                    self.loads += 1
+                if self._current:
+                    return changed
+                print(f"No workflow definitions in '{self.collection_name}', falling back to files")
+            except Exception as e:
+                print(f"Workflow definitions could not be read from MongoDB: {e}")
+        return await asyncio.to_thread(self.load_files)
+
+    async def reload(self) -> int:
+        changed = await self.load()
+        if changed:
+            self.reloads += 1
+        return changed
+
+    async def watch(self, interval: float) -> None:
+        """Poll for edited definitions until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"Workflow reload error: {e}")
+
+    # Lookup
+
+    def get(self, workflow_ref: Optional[str], version: Optional[str] = None) -> Optional[CompiledWorkflow]:
+        """
+        Workflow by id or visa type. With `version`, the pinned version if it is
+        still retained, otherwise the current one.
+        """
+        if not workflow_ref:
+            return None
+        if not self._loaded:
+            self.load_files()
+        workflow_id = workflow_ref if workflow_ref in self._current else self._aliases.get(workflow_ref)
+        if workflow_id is None:
+            return None
+        if version:
+            pinned = self._versions.get(workflow_id, {}).get(version)
+            if pinned is not None:
+                return pinned
+        return self._current[workflow_id]
+
+    def available(self) -> List[str]:
+        if not self._loaded:
+            self.load_files()
+        return sorted(self._aliases)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "workflows": {
+                workflow_id: {
+                    "visa_type": compiled.visa_type,
+                    "declared_version": compiled.declared_version,
+                    "version": compiled.version,
+                    "stages": len(compiled.stages),
+                    "retained_versions": list(self._versions.get(workflow_id, {}))
+                }
+                for workflow_id, compiled in self._current.items()
+            },
+            "aliases": dict(self._aliases),
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "errors": dict(self.errors)
+        }
+
+
+# Global registry
+workflow_registry = WorkflowRegistry(
+    source=WORKFLOW_SOURCE,
+    pattern=WORKFLOW_GLOB,
+    collection_name=WORKFLOW_COLLECTION,
+    retained_versions=WORKFLOW_VERSIONS_RETAINED
+)
@@ -1,28 +1,42 @@
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from typing import List, Dict, Any
 import os
 import uuid
-import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.messages import HumanMessage
 
 # Import agent-based system
-from agent.agent import stream_agent, invoke_agent
+from agent.agent import stream_agent, ainvoke_agent, visa_agent
 from agent.state import AgentState
-from agent.config.settings import langfuse_config
+from agent.thread_store import thread_state_store
+from agent.response_cache import enquiry_cache
+from agent.knowledge_base import knowledge_base
+from agent.history import conversation_compactor
+from agent.prompts import prompt_cache_usage_handler, prompt_stats
+from agent.streaming import SSEFrameFormatter, SSETokenStream, TokenCoalescer, stream_stats
+from agent.readiness import ReadinessProbe
+from agent.tool_registry import tool_registry
+from agent.config.settings import langfuse_config, app_config, llm_config
+from config.workflow_registry import workflow_registry, WORKFLOW_RELOAD_INTERVAL
 
 # Import database and API routes
 import sys
 sys.path.append('..')  # Add parent directory to path for imports
-from database.mongodb import init_db
-from api.countries import router as countries_router
-from api.auth import router as auth_router, get_current_user
-from database.models.user import User
-
-# Global state management for threads
-thread_states = {}
+from database.mongodb import init_db, db
+from database.index_audit import run_startup_audit
+from database.bootstrap import pool_metrics
+from api.countries import router as countries_router, countries_cache
+from services.visa_purpose_index import purpose_indexes
+from api.auth import router as auth_router, get_current_principal
+from services.principal_cache import Principal, principal_cache
+from services.twilio_service import twilio_service
+from services.application_write_buffer import application_writes
+from services.extraction_jobs import extraction_jobs
 
 def _extract_clean_content(content) -> str:
     """Extract clean text content from potentially complex message content"""
@@ -56,14 +70,47 @@ def _extract_clean_content(content) -> str:
         # Fallback for any other type
         return str(content)
 
+async def _check_database():
+    await db.client.admin.command("ping")
+
+async def _check_twilio():
+    if not twilio_service.configured:
+        raise RuntimeError("Twilio credentials not configured")
+
+# Remote dependencies are checked here on demand; nothing calls out at import time
+readiness = ReadinessProbe(ttl=app_config.readiness_cache_ttl, timeout=app_config.readiness_timeout)
+readiness.register("database", _check_database)
+readiness.register("llm", llm_config.check_ready)
+readiness.register("langfuse", langfuse_config.check_ready, critical=False)
+readiness.register("twilio", _check_twilio, critical=False)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    # Bound the executor LangGraph uses for sync tools so wait-mode runs cannot spawn unbounded threads
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=app_config.sync_tool_workers, thread_name_prefix="sync-tool")
+    )
     print("Initializing database connection...")
     await init_db()
+    # Compile workflow definitions once; sessions share them and edits are picked up by the watcher
+    await workflow_registry.load()
+    workflow_watcher = None
+    if WORKFLOW_RELOAD_INTERVAL > 0:
+        workflow_watcher = asyncio.create_task(workflow_registry.watch(WORKFLOW_RELOAD_INTERVAL))
+    if app_config.index_audit_on_startup:
+        asyncio.create_task(run_startup_audit())
+    if app_config.warmup_on_startup:
+        # Warm LLM/Langfuse connections without delaying the first request
+        asyncio.create_task(readiness.check(force=True))
     print("Agent-based Visa Assistant Production Server initialized")
     yield
     # Shutdown
+    if workflow_watcher:
+        workflow_watcher.cancel()
+    await application_writes.close()
+    await extraction_jobs.close()
+    twilio_service.shutdown()
     print("Server shutdown")
 
 app = FastAPI(
@@ -107,6 +154,46 @@ class RunResponse(BaseModel):
 def health_check():
     return {"status": "healthy", "service": "agent-based-visa-agent"}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: database and LLM must answer; Langfuse and Twilio are reported only.
+    Unauthenticated, so results always come from the READINESS_CACHE_TTL cache - callers
+    can't force a (billable) LLM check on every hit.
+    """
+    result = await readiness.check()
+    if not result["ready"]:
+        return JSONResponse(status_code=503, content={"status": "not_ready", **result})
+    return {"status": "ready", **result}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-worker performance counters"""
+    metrics = {
+        "thread_store": thread_state_store.stats(),
+        "intent_router": visa_agent.router.stats(),
+        "enquiry_cache": enquiry_cache.stats(),
+        "knowledge_base": knowledge_base.stats(),
+        "countries_cache": countries_cache.stats(),
+        "purpose_indexes": purpose_indexes.stats(),
+        "auth_cache": principal_cache.stats(),
+        "streaming": stream_stats.stats(),
+        "history": conversation_compactor.stats(),
+        "prompt": prompt_stats.stats(),
+        "llm_routes": llm_config.registry.stats(),
+        "tools": tool_registry.stats(),
+        "workflows": workflow_registry.stats(),
+        "application_writes": application_writes.stats(),
+        "mongo_pool": pool_metrics.stats(),
+        "extraction_jobs": extraction_jobs.stats()
+    }
+    try:
+        from agent.agents.workflow_session_store import workflow_sessions
+        metrics["workflow_sessions"] = workflow_sessions.stats()
+    except ImportError:
+        pass
+    return metrics
+
 # LangGraph React SDK compatible endpoints
 @app.get("/assistants/{assistant_id}")
 async def get_assistant(assistant_id: str):
@@ -120,16 +207,10 @@ async def get_assistant(assistant_id: str):
     raise HTTPException(status_code=404, detail="Assistant not found")
 
 @app.post("/threads", response_model=ThreadResponse)
-async def create_thread(current_user: User = Depends(get_current_user)):
+async def create_thread(principal: Principal = Depends(get_current_principal)):
     thread_id = str(uuid.uuid4())
     # Initialize thread state with user_id
-    thread_states[thread_id] = {
-        "messages": [],
-        "session_id": thread_id,
-        "user_id": str(current_user.id),  # Store user_id in thread state
-        "tool_call_count": 0,
-        "state_version": 1
-    }
+    await thread_state_store.get_or_create(thread_id, user_id=principal.user_id)
     return ThreadResponse(thread_id=thread_id)
 
 @app.post("/threads/{thread_id}/runs/wait", response_model=RunResponse)
@@ -139,20 +220,15 @@ async def run_thread(thread_id: str, request: MessageRequest):
         user_message = request.messages[-1]["content"]
         
         # Get current thread state or create new one (this endpoint doesn't have current_user, but shouldn't be used anyway)
-        if thread_id not in thread_states:
-            thread_states[thread_id] = {
-                "messages": [],
-                "session_id": thread_id,
-                "tool_call_count": 0,
-                "state_version": 1
-            }
-        
-        current_state = thread_states[thread_id]
+        current_state = await thread_state_store.get_or_create(thread_id)
         
         # Add user message to state
         user_msg = HumanMessage(content=user_message)
         current_state["messages"].append(user_msg)
         
+        # Compaction (if due) runs after the reply is saved; this only records the turn
+        conversation_compactor.record_turn(current_state)
+        
         # DEBUG: Check what messages the agent will see
         print(f"DEBUG: Agent will see {len(current_state['messages'])} messages:")
         for i, msg in enumerate(current_state['messages']):
@@ -176,12 +252,13 @@ async def run_thread(thread_id: str, request: MessageRequest):
         # Run the agent with config containing thread_id
         config = {"configurable": {"thread_id": thread_id}}
 
-        # Add Langfuse callback handler if available
+        # Record provider prompt-cache usage; add Langfuse callback handler if available
+        config["callbacks"] = [prompt_cache_usage_handler]
         langfuse_handler = langfuse_config.get_callback_handler()
         if langfuse_handler:
-            config["callbacks"] = [langfuse_handler]
+            config["callbacks"].append(langfuse_handler)
 
-        result = invoke_agent(agent_input, config)
+        result = await ainvoke_agent(agent_input, config)
         
         # DEBUG: Check what tools were called
         if "messages" in result and result["messages"]:
@@ -192,7 +269,11 @@ async def run_thread(thread_id: str, request: MessageRequest):
                         print(f"DEBUG: Agent called tool: {tool_call['name']}")
         
         # Update thread state with result
-        thread_states[thread_id].update(result)
+        current_state.update(result)
+        await thread_state_store.save(thread_id, current_state)
+        
+        # Fold older turns into conversation_summary in the background once past the thresholds
+        conversation_compactor.schedule(thread_id, current_state, thread_state_store)
         
         # Extract response messages - handle both message objects and direct responses
         response_messages = []
@@ -233,9 +314,10 @@ async def run_thread(thread_id: str, request: MessageRequest):
 @app.get("/threads/{thread_id}/state")
 async def get_thread_state(thread_id: str):
     try:
-        if thread_id in thread_states:
+        thread_state = await thread_state_store.get(thread_id)
+        if thread_state is not None:
             # Return clean state without internal message objects
-            state = thread_states[thread_id].copy()
+            state = thread_state.copy()
             # Convert messages to serializable format
             if "messages" in state:
                 serializable_messages = []
@@ -254,7 +336,7 @@ async def get_thread_state(thread_id: str):
 
 # Streaming endpoint that LangGraph React SDK expects
 @app.post("/threads/{thread_id}/runs/stream")
-async def stream_run(thread_id: str, request: dict, current_user: User = Depends(get_current_user)):
+async def stream_run(thread_id: str, request: dict, http_request: Request, principal: Principal = Depends(get_current_principal)):
     from fastapi.responses import StreamingResponse
     
     try:
@@ -268,21 +350,15 @@ async def stream_run(thread_id: str, request: dict, current_user: User = Depends
         user_message = messages[-1]["content"]
         
         # Get current thread state or create new one
-        if thread_id not in thread_states:
-            thread_states[thread_id] = {
-                "messages": [],
-                "session_id": thread_id,
-                "user_id": str(current_user.id),  # Add user_id to thread state
-                "tool_call_count": 0,
-                "state_version": 1
-            }
-        
-        current_state = thread_states[thread_id]
+        current_state = await thread_state_store.get_or_create(thread_id, user_id=principal.user_id)
         
         # Add user message to state
         user_msg = HumanMessage(content=user_message)
         current_state["messages"].append(user_msg)
         
+        # Compaction (if due) runs after the reply is saved; this only records the turn
+        conversation_compactor.record_turn(current_state)
+        
         # DEBUG: Check what messages the agent will see (STREAMING)
         print(f"DEBUG STREAM: Agent will see {len(current_state['messages'])} messages:")
         for i, msg in enumerate(current_state['messages']):
@@ -290,17 +366,15 @@ async def stream_run(thread_id: str, request: dict, current_user: User = Depends
             content_preview = str(getattr(msg, 'content', ''))[:50]
             print(f"  {i}: {msg_type} - {content_preview}...")
         
+        # Per-request overrides, e.g. {"stream_options": {"compact": true}}
+        stream_options = request.get("stream_options") or {}
+        formatter = SSEFrameFormatter(thread_id, compact=stream_options.get("compact", app_config.streaming_compact_frames))
+        
         async def generate_stream():
             print(f"Starting agent stream for thread {thread_id}, message: {user_message}")
             
             # First, yield the user message in LangGraph format
-            user_message_obj = {
-                "id": f"user_{thread_id}",
-                "type": "human", 
-                "content": user_message,
-                "created_at": "2025-01-01T00:00:00Z"
-            }
-            yield f"data: {json.dumps(user_message_obj)}\n\n"
+            yield formatter.human(thread_id, user_message)
             
             # Prepare input for agent streaming
             agent_input = {
@@ -315,30 +389,32 @@ async def stream_run(thread_id: str, request: dict, current_user: User = Depends
                 if key not in ["messages", "session_id", "tool_call_count", "state_version"] and value is not None:
                     agent_input[key] = value
             
-            # Stream the AI response using agent streaming
-            full_ai_response = ""
+            # Stream the AI response using agent streaming, coalescing tokens into fewer frames
             config = {"configurable": {"thread_id": thread_id}}
 
-            # Add Langfuse callback handler if available
+            # Record provider prompt-cache usage; add Langfuse callback handler if available
+            config["callbacks"] = [prompt_cache_usage_handler]
             langfuse_handler = langfuse_config.get_callback_handler()
             if langfuse_handler:
-                config["callbacks"] = [langfuse_handler]
+                config["callbacks"].append(langfuse_handler)
+
+            # Abandoned or runaway runs are cancelled instead of running (and billing) to the end
+            token_stream = SSETokenStream(
+                formatter,
+                TokenCoalescer(app_config.streaming_chunk_size, app_config.streaming_flush_interval),
+                final_event=stream_options.get("final_event", app_config.streaming_final_event),
+                is_disconnected=http_request.is_disconnected,
+                heartbeat_interval=app_config.streaming_heartbeat_interval,
+                timeout=app_config.streaming_timeout
+            )
 
             try:
-                async for chunk in stream_agent(agent_input, config):
-                    if chunk and chunk.get("type") == "token":
-                        token_content = chunk.get("token", "")
-                        full_ai_response += token_content
-                        ai_message_obj = {
-                            "id": f"ai_{thread_id}_{token_content[:10]}",
-                            "type": "ai",
-                            "content": token_content,
-                            "created_at": "2025-01-01T00:00:00Z"
-                        }
-                        yield f"data: {json.dumps(ai_message_obj)}\n\n"
+                async for frame in token_stream.frames(stream_agent(agent_input, config)):
+                    yield frame
                 
-                # CRITICAL FIX: Save the complete AI response to thread state
-                if full_ai_response.strip():
+                # CRITICAL FIX: Save the complete AI response to thread state (partial replies are dropped)
+                full_ai_response = token_stream.text
+                if token_stream.completed and full_ai_response.strip():
                     from langchain_core.messages import AIMessage
                     ai_msg = AIMessage(content=full_ai_response.strip())
                     current_state["messages"].append(ai_msg)
@@ -346,13 +422,13 @@ async def stream_run(thread_id: str, request: dict, current_user: User = Depends
                         
             except Exception as stream_error:
                 print(f"Streaming error: {stream_error}")
-                error_message = {
-                    "id": f"error_{thread_id}",
-                    "type": "ai",
-                    "content": "I encountered an issue processing your request. Please try again.",
-                    "created_at": "2025-01-01T00:00:00Z"
-                }
-                yield f"data: {json.dumps(error_message)}\n\n"
+                yield formatter.error("I encountered an issue processing your request. Please try again.")
+            finally:
+                # Persist the user turn (and AI reply, if any) so other workers see it
+                await thread_state_store.save(thread_id, current_state)
+                
+                # Fold older turns into conversation_summary in the background once past the thresholds
+                conversation_compactor.schedule(thread_id, current_state, thread_state_store)
             
             print("Agent stream completed")
         
@@ -8,7 +8,8 @@ from typing import Any, Dict, Optional
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from agent.state import AgentState, create_error_record
-from config.settings import invoke_llm_safe
+from config.settings import ainvoke_llm_safe
+from config.model_registry import EXTRACTION_ROUTE
 from database.models.country import Country
 
 
@@ -61,7 +62,7 @@ async def base_information_collector_tool(user_message: str) -> str:
 
     try:
         # Extract information from user message
-        extracted_info = _extract_basic_visa_info_simple(user_message)
+        extracted_info = await _extract_basic_visa_info_simple(user_message)
         
         # Check what information is still missing
         missing_fields = _get_missing_basic_fields(extracted_info)
@@ -93,7 +94,7 @@ async def base_information_collector_tool(user_message: str) -> str:
         return "I'm having difficulty processing your application details. Could you please tell me which country you want to visit and what is your purpose of travel?"
 
 
-def _extract_basic_visa_info_simple(user_message: str) -> dict:
+async def _extract_basic_visa_info_simple(user_message: str) -> dict:
     """Extract basic visa information from user message using simple LLM"""
     try:
         extraction_prompt = f"""Extract visa application information from this user message: "{user_message}"
@@ -112,7 +113,7 @@ Dates: [dates or "not mentioned"]
 
 Only extract what is explicitly stated, do not assume or guess."""
 
-        response = invoke_llm_safe([HumanMessage(content=extraction_prompt)])
+        response = await ainvoke_llm_safe([HumanMessage(content=extraction_prompt)], route=EXTRACTION_ROUTE)
         content = response.content.strip()
         
         # Parse the simple response format
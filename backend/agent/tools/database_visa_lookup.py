@@ -7,7 +7,7 @@ sys.path.append('../..')
 from typing import Any, Dict, Optional
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
-from config.settings import invoke_llm_safe
+from config.settings import ainvoke_llm_safe
 from database.models.visa_type_selection import VisaTypeSelection
 
 
@@ -44,7 +44,7 @@ async def database_visa_lookup_tool(country_code: str, user_details: str) -> str
             return f"I don't have visa information available for this destination yet. Please contact our support team for assistance."
         
         # Let LLM analyze user details and document to recommend visa type
-        recommendation = _get_llm_recommendation(user_details, visa_document.dict())
+        recommendation = await _get_llm_recommendation(user_details, visa_document.dict())
         
         return recommendation
         
@@ -52,7 +52,7 @@ async def database_visa_lookup_tool(country_code: str, user_details: str) -> str
         return "I'm having difficulty accessing visa information right now. Let me connect you with our support team for assistance."
 
 
-def _get_llm_recommendation(user_details: str, visa_document: dict) -> str:
+async def _get_llm_recommendation(user_details: str, visa_document: dict) -> str:
     """Let LLM analyze user details and visa document to recommend best visa type"""
     try:
         recommendation_prompt = f"""You are a professional visa consultant. Analyze the user's travel details and the visa document to recommend the best visa type.
@@ -78,7 +78,7 @@ Can we proceed with applying for the [EXACT VISA TYPE NAME] for [number] travele
 
 Keep the response conversational and end with asking if we can proceed with the visa application."""
 
-        response = invoke_llm_safe([HumanMessage(content=recommendation_prompt)])
+        response = await ainvoke_llm_safe([HumanMessage(content=recommendation_prompt)])
         return response.content.strip()
         
     except Exception as e:
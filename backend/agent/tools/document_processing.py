@@ -5,14 +5,25 @@ import sys
 sys.path.append('../..')
 
 import os
+import asyncio
 import base64
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
-from config.settings import invoke_llm_safe
-from database.models.visa_application import VisaApplication, DocumentInfo, TravelerData
+from config.settings import ainvoke_llm_safe
+from config.model_registry import EXTRACTION_ROUTE
+from agent.tool_registry import lazy_import
+from database.models.visa_application import DocumentInfo
+from database.repositories import visa_applications
+from services.extraction_jobs import COMPLETED, FAILED, EXTRACTION_WAIT_TIMEOUT, extraction_jobs
+from database.repositories.visa_application_repository import (
+    TRAVELER_PROJECTION, collected_data_update, completed_stage_update, traveler_document_update
+)
+
+# OpenAI SDK is only needed for vision extraction; imported on first use
+openai = lazy_import("openai")
 
 @tool
 async def document_processing_tool(
@@ -53,12 +64,14 @@ async def document_processing_tool(
 
         # Get user_id from parameter first, fallback to thread state
         if not user_id:
-            user_id = _get_user_id_from_thread(thread_id)
+            user_id = await _get_user_id_from_thread(thread_id)
 
         print(f"DEBUG: document_processing_tool - user_id={user_id}, thread_id={thread_id}")
 
-        # Direct database access - find by user_id and in_progress status
-        application = await VisaApplication.find_one({"user_id": user_id, "status": "in_progress"})
+        # Find by user_id and in_progress status, reading only traveler ids and the current stage
+        application = await visa_applications.find_active(
+            user_id, {**TRAVELER_PROJECTION, "workflow_info.current_stage": 1}
+        )
         if not application:
             print(f"DEBUG: No visa application found for user_id={user_id}")
             return "I couldn't find your visa application. Please start the application process first."
@@ -68,26 +81,31 @@ async def document_processing_tool(
         
         if analysis.get("message_intent") == "upload_confirmation":
             # Get or create primary traveler
-            primary_traveler = application.get_primary_traveler()
-            if not primary_traveler:
-                # Create first traveler
-                primary_traveler = TravelerData(
-                    traveler_id=1,
-                    is_primary_applicant=True
-                )
-                application.travelers.append(primary_traveler)
-
-            # Process each uploaded document with GPT-4 Vision
+            traveler_id = await visa_applications.primary_traveler_id(user_id, application)
+            if traveler_id is None:
+                return "I couldn't find your visa application. Please start the application process first."
+
+            # Process each uploaded document with GPT-4 Vision; writes are collected into one update
             processed_documents = []
+            pending_documents = []
             all_extracted_data = {}
+            updates = []
 
             for doc_type in analysis.get("document_types", []):
                 if doc_type in ["passport_bio_page", "passport"]:
                     # Get file path for uploaded document
                     file_path = await _get_uploaded_file_path(thread_id, "passport_bio_page")
 
-                    if file_path and os.path.exists(file_path):
-                        # Extract passport data using GPT-4 Vision
+                    # Extraction normally started in the background when the file was uploaded
+                    job_status, extracted_data = await _background_extraction(thread_id, "passport_bio_page")
+                    if job_status == "pending":
+                        pending_documents.append("Passport Bio Page")
+                        continue
+
+                    if job_status == COMPLETED:
+                        pass
+                    elif file_path and os.path.exists(file_path):
+                        # No usable background result: extract passport data using GPT-4 Vision
                         extracted_data = await _extract_passport_with_gpt4_vision(file_path)
                     else:
                         # Fallback to simulated extraction for testing
@@ -103,13 +121,10 @@ async def document_processing_tool(
                     )
 
                     # Store in primary traveler's documents
-                    primary_traveler.documents["passport_bio_page"] = doc_info
+                    updates.append(traveler_document_update("passport_bio_page", doc_info))
 
                     # Also store extracted personal data in collected_data
-                    if "personal_info" not in primary_traveler.collected_data:
-                        primary_traveler.collected_data["personal_info"] = {}
-
-                    primary_traveler.collected_data["personal_info"].update(extracted_data)
+                    updates.append(collected_data_update("personal_info", extracted_data))
 
                     processed_documents.append("Passport Bio Page")
                     all_extracted_data.update(extracted_data)
@@ -118,7 +133,14 @@ async def document_processing_tool(
                     # Get file path and validate passport photo
                     file_path = await _get_uploaded_file_path(thread_id, "passport_photo")
 
-                    if file_path and os.path.exists(file_path):
+                    job_status, validation_result = await _background_extraction(thread_id, "passport_photo")
+                    if job_status == "pending":
+                        pending_documents.append("Passport Photo")
+                        continue
+
+                    if job_status == COMPLETED:
+                        pass
+                    elif file_path and os.path.exists(file_path):
                         validation_result = await _validate_passport_photo_with_gpt4_vision(file_path)
                     else:
                         validation_result = {"status": "valid", "confidence": 0.9}
@@ -132,18 +154,16 @@ async def document_processing_tool(
                         extracted_data=validation_result
                     )
 
-                    primary_traveler.documents["passport_photo"] = doc_info
+                    updates.append(traveler_document_update("passport_photo", doc_info))
                     processed_documents.append("Passport Photo")
 
             if processed_documents:
                 # Mark documents stage as complete
-                current_stage = application.workflow_info.current_stage or "stage_1_documents"
-                if current_stage not in application.workflow_info.completed_stages:
-                    application.workflow_info.completed_stages.append(current_stage)
+                current_stage = application.get("workflow_info", {}).get("current_stage") or "stage_1_documents"
+                updates.append(completed_stage_update(current_stage))
 
-                # Update timestamp and save (single save operation)
-                application.update_timestamp()
-                await application.save()
+                # Single atomic update: only the touched document and field paths are sent
+                await visa_applications.update(user_id, *updates, traveler_id=traveler_id)
 
                 # Format extracted data for display
                 extracted_display = _format_extracted_data_for_display(all_extracted_data)
@@ -159,6 +179,8 @@ async def document_processing_tool(
 Your documents have been successfully processed and saved to your visa application.
 
 EXTRACTED_DATA_JSON: {json.dumps(all_extracted_data)}"""
+            elif pending_documents:
+                return f"Your {' and '.join(pending_documents)} {'is' if len(pending_documents) == 1 else 'are'} still being processed. This usually takes a few more seconds - let me know when you'd like me to check again."
             else:
                 return "I couldn't process the documents. Please confirm what type of documents you uploaded (passport bio page, passport photo)."
         
@@ -191,7 +213,7 @@ Determine:
 Respond with JSON:
 {{"document_types": ["type1", "type2"], "upload_status": "completed/pending", "message_intent": "upload_confirmation/requirements_question"}}"""
 
-    response = invoke_llm_safe([HumanMessage(content=analysis_prompt)])
+    response = await ainvoke_llm_safe([HumanMessage(content=analysis_prompt)], route=EXTRACTION_ROUTE)
     
     try:
         return json.loads(response.content.strip())
@@ -199,6 +221,27 @@ Respond with JSON:
         return {"document_types": ["passport_bio_page"], "upload_status": "completed", "message_intent": "upload_confirmation"}
 
 
+async def _background_extraction(thread_id: str, document_type: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Result of the extraction job queued when the document was uploaded
+
+    Returns:
+        ("completed", data) when the job finished, ("pending", None) if it is still
+        running after EXTRACTION_WAIT_TIMEOUT seconds, and (None, None) when there is
+        no job or it failed, in which case the caller extracts inline
+    """
+    job = await extraction_jobs.latest(thread_id, document_type)
+    if job is None:
+        return None, None
+
+    job = await extraction_jobs.wait(job, timeout=EXTRACTION_WAIT_TIMEOUT)
+    if job.status == COMPLETED:
+        print(f"DEBUG: Using background extraction {job.job_id} for {document_type}")
+        return COMPLETED, job.result
+    if job.status == FAILED:
+        return None, None
+    return "pending", None
+
+
 async def _get_uploaded_file_path(thread_id: str, document_type: str) -> Optional[str]:
     """Get the file path for uploaded document
 
@@ -232,13 +275,17 @@ async def _get_uploaded_file_path(thread_id: str, document_type: str) -> Optiona
         return None
 
 
+def _read_image_base64(file_path: str) -> str:
+    with open(file_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8')
+
+
 async def _extract_passport_with_gpt4_vision(file_path: str) -> Dict[str, Any]:
     """Extract passport data using GPT-4 Vision"""
     
     try:
-        # Read image file and convert to base64
-        with open(file_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        # Read image file and convert to base64 off the event loop
+        image_data = await asyncio.to_thread(_read_image_base64, file_path)
         
         # GPT-4 Vision prompt for passport extraction
         extraction_prompt = """
@@ -282,9 +329,8 @@ async def _validate_passport_photo_with_gpt4_vision(file_path: str) -> Dict[str,
     """Validate passport photo using GPT-4 Vision"""
     
     try:
-        # Read image file and convert to base64
-        with open(file_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        # Read image file and convert to base64 off the event loop
+        image_data = await asyncio.to_thread(_read_image_base64, file_path)
         
         # GPT-4 Vision prompt for photo validation
         validation_prompt = """
@@ -329,10 +375,7 @@ async def _call_gpt4_vision_api(prompt: str, image_base64: str) -> Dict[str, Any
             print("OpenAI API key not found, using fallback simulation")
             return await _simulate_passport_extraction("gpt4_vision_fallback")
         
-        # Import OpenAI client
-        from openai import AsyncOpenAI
-        
-        client = AsyncOpenAI(api_key=openai_api_key)
+        client = openai.AsyncOpenAI(api_key=openai_api_key)
         
         response = await client.chat.completions.create(
             model="gpt-4-vision-preview",  # or "gpt-4o" if available
@@ -400,7 +443,7 @@ Respond with JSON:
 
 Make it realistic and consistent."""
 
-    response = invoke_llm_safe([HumanMessage(content=simulation_prompt)])
+    response = await ainvoke_llm_safe([HumanMessage(content=simulation_prompt)])
     
     try:
         return json.loads(response.content.strip())
@@ -449,19 +492,23 @@ def _format_extracted_data_for_display(extracted_data: Dict[str, Any]) -> str:
     return "\n".join(formatted_lines) if formatted_lines else "Data extraction in progress..."
 
 
-def _get_user_id_from_thread(thread_id: str) -> Optional[str]:
-    """Get user_id from thread state (from production_app.py thread_states)"""
+async def _get_user_id_from_thread(thread_id: str) -> Optional[str]:
+    """Get user_id from the shared thread state store"""
     try:
         # Import here to avoid circular imports
-        import sys
-        sys.path.append('../..')
-        from agent.production_app import thread_states
-        
-        thread_state = thread_states.get(thread_id, {})
+        from agent.thread_store import thread_state_store
+
+        thread_state = await thread_state_store.get(thread_id) or {}
         return thread_state.get("user_id")
     except Exception as e:
         print(f"Could not get user_id from thread {thread_id}: {e}")
         return None
 
 
-__all__ = ["document_processing_tool"]
\ No newline at end of file
+# Uploads queue these extractions in the background (see api/document_upload.py)
+extraction_jobs.register_handler("passport_bio_page", _extract_passport_with_gpt4_vision)
+extraction_jobs.register_handler("passport_photo", _validate_passport_photo_with_gpt4_vision)
+
+
+__all__ = ["document_processing_tool"]
+
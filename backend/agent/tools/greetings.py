@@ -5,7 +5,6 @@ import os
 from typing import Any, Dict
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
-from langchain_groq import ChatGroq
 from agent.state import AgentState
 
 
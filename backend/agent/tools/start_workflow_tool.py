@@ -37,7 +37,6 @@ async def start_detailed_application_process(
         # Import workflow agent functions
         print(f"DEBUG: Importing workflow agent functions...")
         from agent.agents.intelligent_workflow_agent import (
-            workflow_sessions, 
             initialize_workflow_session, 
             load_workflow_dynamically,
             execute_current_stage
@@ -1,14 +1,14 @@
 # Visa information tool for agent
 # Purpose: Provide visa requirements, policies, and general country information
 
-import json
-import os
-import pprint
 from typing import Any, Dict, Optional
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from agent.state import AgentState
+from agent.response_cache import enquiry_cache
+from agent.knowledge_base import knowledge_base, CountryKnowledge
 from config.settings import invoke_llm_safe
+from config.model_registry import EXTRACTION_ROUTE
 
 
 @tool
@@ -42,14 +42,14 @@ def general_enquiry_tool(user_message: str) -> str:
         if not country:
             return "I'd be happy to help with visa information! Could you please specify which country's visa you're asking about?"
         
-        # Load and process visa information
-        visa_info = _load_visa_knowledge(country)
+        # Look up preloaded visa information
+        knowledge = knowledge_base.get(country)
         
-        if not visa_info:
+        if not knowledge:
             return f"I don't have detailed visa information for {country.title()} available at the moment. Please contact our support team for the most current information."
         
-        # Generate response using LLM with visa knowledge
-        response = _generate_visa_response(user_message, visa_info)
+        # Generate response using LLM with visa knowledge (cached per question)
+        response = _generate_visa_response(user_message, knowledge)
         
         return response
         
@@ -68,7 +68,7 @@ If no specific country is mentioned, return 'none'.
 
 Response format: Just the country name, nothing else."""
         
-        response = invoke_llm_safe([HumanMessage(content=extraction_prompt)])
+        response = invoke_llm_safe([HumanMessage(content=extraction_prompt)], route=EXTRACTION_ROUTE)
         country = response.content.strip().lower()
         
         # Simple validation - if it looks like a country name
@@ -81,39 +81,27 @@ Response format: Just the country name, nothing else."""
         return None
 
 
-def _load_visa_knowledge(country: str) -> dict:
-    """Load visa information from JSON knowledge base"""
-    if not country:
-        return {}
+def _format_visa_info_for_llm(user_message: str, knowledge: CountryKnowledge) -> str:
+    """Format the knowledge base sections relevant to the question for LLM context"""
+    context = knowledge_base.relevant_context(knowledge.country, user_message)
     
-    # Look for knowledge base in the current directory (agent_based_assistant)
-    knowledge_path = f"knowledge_base/{country}/visa_info.json"
-    
-    if os.path.exists(knowledge_path):
-        try:
-            with open(knowledge_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
-    
-    return {}
-
-
-def _format_visa_info_for_llm(visa_info: dict) -> str:
-    """Format entire visa information JSON for LLM context"""
-    if not visa_info:
+    if not context:
         return "No specific visa information available."
     
-    # Use pprint to format the entire JSON in a readable way
-    formatted_json = pprint.pformat(visa_info, indent=2, width=100, depth=None)
-    
-    return f"COMPLETE VISA KNOWLEDGE BASE:\n{formatted_json}"
+    return f"RELEVANT VISA KNOWLEDGE:\n{context}"
 
 
-def _generate_visa_response(user_message: str, visa_info: dict) -> str:
+def _generate_visa_response(user_message: str, knowledge: CountryKnowledge) -> str:
     """Generate structured visa response using LLM and knowledge base"""
     try:
-        context = _format_visa_info_for_llm(visa_info)
+        # Repeated and near-duplicate questions are served from cache until the knowledge changes
+        country = knowledge.country
+        knowledge_hash = knowledge.content_hash
+        cached_response = enquiry_cache.get(country, user_message, knowledge_hash)
+        if cached_response:
+            return cached_response
+        
+        context = _format_visa_info_for_llm(user_message, knowledge)
         
         prompt = f"""You are a professional visa assistant. Answer the user's question based ONLY on the provided visa information context.
 
@@ -150,7 +138,13 @@ For any question related to visa, you need to answer like a Highly experienced V
 Return ONLY the answer text, no JSON formatting."""
         
         response = invoke_llm_safe([HumanMessage(content=prompt)])
-        return response.content.strip()
+        answer = response.content.strip()
+        
+        usage = getattr(response, "usage_metadata", None) or {}
+        tokens = usage.get("total_tokens") or (len(prompt) + len(answer)) // 4
+        enquiry_cache.put(country, user_message, knowledge_hash, answer, tokens)
+        
+        return answer
         
     except Exception as e:
         return "I encountered an issue while processing your visa information request. Please try asking your question again or contact our support team."
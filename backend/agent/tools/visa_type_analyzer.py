@@ -5,7 +5,10 @@ import os
 from typing import Any
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
-from langchain_groq import ChatGroq
+from agent.tool_registry import lazy_import
+
+# Groq SDK is imported on the first analysis, not at module load
+langchain_groq = lazy_import("langchain_groq")
 
 
 def _get_groq_llm():
@@ -15,7 +18,7 @@ def _get_groq_llm():
         if not api_key:
             raise ValueError("GROQ_API_KEY environment variable not set")
         
-        return ChatGroq(
+        return langchain_groq.ChatGroq(
             model="llama-3.1-8b-instant",
             api_key=api_key,
             temperature=0.2,
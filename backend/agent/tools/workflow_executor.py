@@ -11,8 +11,10 @@ from datetime import datetime
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from langgraph.prebuilt import InjectedState
-from config.settings import invoke_llm_safe
+from config.settings import ainvoke_llm_safe
+from config.workflow_registry import CompiledWorkflow, workflow_registry
 from database.models.visa_application import VisaApplication, DocumentInfo
+from database.repositories import visa_applications
 
 # Workflow state management
 workflow_states = {}  # In-memory state store (can be moved to database later)
@@ -109,7 +111,7 @@ async def workflow_executor_tool(
                 advance_to_next_stage
             )
 
-            if thread_id in workflow_sessions:
+            if await workflow_sessions.get(thread_id) is not None:
                 print(f"DEBUG: Found active workflow session for {thread_id} - delegating to intelligent workflow agent")
 
                 # Delegate to intelligent workflow agent based on intent_type
@@ -207,14 +209,14 @@ async def workflow_executor_tool(
 
         # Fallback: try thread state if not in agent state
         if not user_id:
-            user_id = _get_user_id_from_thread(thread_id)
+            user_id = await _get_user_id_from_thread(thread_id)
             print(f"DEBUG: Fallback - Got user_id: {user_id} from thread: {thread_id}")
 
         # Get or create workflow state and database application
         workflow_state = _get_workflow_state(thread_id)
 
-        # Direct database access - ensure application exists (find by user_id)
-        db_application = await VisaApplication.find_one({"user_id": user_id, "status": "in_progress"})
+        # Ensure application exists (find by user_id, reading only its id)
+        db_application = await visa_applications.find_active(user_id, {"visa_application_id": 1})
         if not db_application:
             # Create new application linked to user_id
             unique_app_id = f"VA_{user_id}_{datetime.now().strftime('%Y%m%d')}_{thread_id[:8]}"
@@ -227,7 +229,7 @@ async def workflow_executor_tool(
             await db_application.insert()
             print(f"SUCCESS: Created new visa application: {unique_app_id} for user: {user_id}")
         else:
-            print(f"DEBUG: Found existing application: {db_application.visa_application_id}")
+            print(f"DEBUG: Found existing application: {db_application.get('visa_application_id')}")
 
         # Load workflow JSON if not already loaded
         if not workflow_state.workflow_json:
@@ -268,17 +270,13 @@ def _get_workflow_state(thread_id: str) -> WorkflowState:
     return workflow_states[thread_id]
 
 
-def _get_user_id_from_thread(thread_id: str) -> Optional[str]:
-    """Get user_id from thread state (from production_app.py thread_states)"""
+async def _get_user_id_from_thread(thread_id: str) -> Optional[str]:
+    """Get user_id from the shared thread state store"""
     try:
         # Import here to avoid circular imports
-        import sys
-        sys.path.append('..')
-        from agent.production_app import thread_states
-        
-        print(f"DEBUG: Available thread_ids in thread_states: {list(thread_states.keys())}")
-        thread_state = thread_states.get(thread_id, {})
-        print(f"DEBUG: Thread state for {thread_id}: {thread_state}")
+        from agent.thread_store import thread_state_store
+
+        thread_state = await thread_state_store.get(thread_id) or {}
         user_id = thread_state.get("user_id")
         print(f"DEBUG: Extracted user_id: {user_id}")
         return user_id
@@ -366,22 +364,20 @@ async def _start_stage(state: WorkflowState, stage: WorkflowStage) -> str:
         print("DEBUG: No workflow_json found!")
         return "Unable to load workflow configuration. Please try again."
     
-    print(f"DEBUG: Workflow JSON loaded, has {len(state.workflow_json.get('collection_sequence', []))} stages")
+    print(f"DEBUG: Workflow JSON loaded, has {len(state.workflow_json.stages)} stages")
     
-    # Find the stage in workflow JSON
-    collection_sequence = state.workflow_json.get("collection_sequence", [])
-    stage_config = next((s for s in collection_sequence if s["stage"] == stage), None)
+    # Find the stage in the compiled workflow
+    compiled_stage = state.workflow_json.stage(stage)
     
-    if not stage_config:
+    if not compiled_stage:
         print(f"DEBUG: Stage config for '{stage}' NOT FOUND!")
-        available_stages = [s.get("stage") for s in collection_sequence]
-        print(f"DEBUG: Available stages: {available_stages}")
+        print(f"DEBUG: Available stages: {list(state.workflow_json.stage_index)}")
         return f"Configuration for stage '{stage}' not found. Please contact support."
     
-    print(f"DEBUG: Found stage config for '{stage}': {stage_config.get('stage_title', 'No title')}")
+    print(f"DEBUG: Found stage config for '{stage}': {compiled_stage.title}")
     
     # Generate stage-specific prompt
-    stage_prompt = await _generate_stage_prompt(state, stage_config)
+    stage_prompt = await _generate_stage_prompt(state, compiled_stage.config)
     print(f"DEBUG: Generated stage prompt: {stage_prompt[:100]}...")
     return stage_prompt
 
@@ -464,7 +460,7 @@ async def _process_stage_input(state: WorkflowState, user_message: str) -> bool:
     analysis_prompt = f"""Analyze if the user has provided the required information for the current workflow stage.
 
 CURRENT STAGE: {state.current_stage}
-WORKFLOW JSON: {json.dumps(state.workflow_json, indent=2) if state.workflow_json else 'Not loaded'}
+WORKFLOW JSON: {state.workflow_json.json_text if state.workflow_json else 'Not loaded'}
 USER MESSAGE: "{user_message}"
 ALREADY COLLECTED: {json.dumps(state.collected_data, indent=2)}
 
@@ -476,7 +472,7 @@ Determine:
 Respond with JSON:
 {{"stage_complete": true/false, "extracted_info": {{}}, "missing_items": []}}"""
 
-    response = invoke_llm_safe([HumanMessage(content=analysis_prompt)])
+    response = await ainvoke_llm_safe([HumanMessage(content=analysis_prompt)])
     
     try:
         analysis = json.loads(response.content.strip())
@@ -509,7 +505,7 @@ Provide a helpful response that:
 2. Asks for any missing required information
 3. Guides them to complete the current stage"""
 
-    response = invoke_llm_safe([HumanMessage(content=prompt)])
+    response = await ainvoke_llm_safe([HumanMessage(content=prompt)])
     return response.content.strip()
 
 
@@ -534,7 +530,7 @@ Provide:
 
 Be conversational and helpful."""
 
-    response = invoke_llm_safe([HumanMessage(content=deviation_prompt)])
+    response = await ainvoke_llm_safe([HumanMessage(content=deviation_prompt)])
     return response.content.strip() + "\n\nWould you like to continue with your visa application where we left off?"
 
 
@@ -553,7 +549,7 @@ Determine:
 
 Respond with the updated information and ask if they want to continue."""
 
-    response = invoke_llm_safe([HumanMessage(content=modification_prompt)])
+    response = await ainvoke_llm_safe([HumanMessage(content=modification_prompt)])
     return response.content.strip()
 
 
@@ -660,59 +656,35 @@ Your application will be processed within 3-5 business days. You'll receive upda
 Is there anything else you'd like to know about your visa application?"""
 
 
-async def _get_workflow_json(visa_type: str) -> Optional[dict]:
-    """Get workflow JSON based on visa type"""
-    try:
-        # Map visa type to workflow file
-        workflow_mapping = {
-            "Vietnam Tourism Single Entry": "VNM_tourism_single_entry_workflow.json",
-        }
-        
-        workflow_file = workflow_mapping.get(visa_type, "VNM_tourism_single_entry_workflow.json")
-        # Get absolute path to backend directory
-        import os
-        backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        workflow_path = os.path.join(backend_dir, workflow_file)
-        
-        with open(workflow_path, 'r') as f:
-            return json.load(f)
-    
-    except Exception as e:
-        print(f"Error loading workflow JSON: {e}")
-        return None
+# This executor's stage names follow the original (v1) workflow definitions
+EXECUTOR_WORKFLOWS = {
+    "Vietnam Tourism Single Entry": "VNM_tourism_single_entry",
+}
+
+
+async def _get_workflow_json(visa_type: str) -> Optional[CompiledWorkflow]:
+    """Get the compiled workflow for a visa type from the shared registry"""
+    workflow = workflow_registry.get(EXECUTOR_WORKFLOWS.get(visa_type, "VNM_tourism_single_entry"))
+    if workflow is None:
+        print(f"Error loading workflow JSON: no workflow for {visa_type}")
+    return workflow
 
 
 async def _update_stage_data(thread_id: str, stage: str, stage_data: Dict[str, Any]) -> None:
     """Update stage-specific data in database using direct model access"""
     try:
         # Get user_id from thread
-        user_id = _get_user_id_from_thread(thread_id)
+        user_id = await _get_user_id_from_thread(thread_id)
         if not user_id:
             return
 
-        # Single fetch by user_id
-        application = await VisaApplication.find_one({"user_id": user_id, "status": "in_progress"})
-        if not application:
+        # Get or create primary traveler (reads traveler ids only)
+        traveler_id = await visa_applications.primary_traveler_id(user_id)
+        if traveler_id is None:
             return
-        
-        # Get or create primary traveler
-        primary_traveler = application.get_primary_traveler()
-        if not primary_traveler:
-            from database.models.visa_application import TravelerData
-            primary_traveler = TravelerData(traveler_id=1, is_primary_applicant=True)
-            application.travelers.append(primary_traveler)
-
-        # Store data dynamically in collected_data
-        if stage not in primary_traveler.collected_data:
-            primary_traveler.collected_data[stage] = {}
 
-        primary_traveler.collected_data[stage].update(stage_data)
-
-        # Update timestamp
-        application.update_timestamp()
-
-        # Single save
-        await application.save()
+        # Merge data into the stage's collected_data with a field-level $set
+        await visa_applications.merge_collected_data(user_id, traveler_id, stage, stage_data)
         
     except Exception as e:
         print(f"Error updating stage data: {e}")
@@ -722,27 +694,12 @@ async def _mark_stage_complete(thread_id: str, completed_stage: str) -> None:
     """Mark a stage as complete in database"""
     try:
         # Get user_id from thread
-        user_id = _get_user_id_from_thread(thread_id)
+        user_id = await _get_user_id_from_thread(thread_id)
         if not user_id:
             return
 
-        # Single fetch by user_id
-        application = await VisaApplication.find_one({"user_id": user_id, "status": "in_progress"})
-        if not application:
-            return
-
-        # Mark stage complete
-        if completed_stage not in application.workflow_info.completed_stages:
-            application.workflow_info.completed_stages.append(completed_stage)
-
-        # Update current stage
-        application.workflow_info.current_stage = completed_stage
-
-        # Update timestamp
-        application.update_timestamp()
-
-        # Single save
-        await application.save()
+        # Mark stage complete and update current stage in one atomic update
+        await visa_applications.push_completed_stage(user_id, completed_stage, current_stage=completed_stage)
         
     except Exception as e:
         print(f"Error marking stage complete: {e}")
@@ -752,7 +709,7 @@ async def _get_application_data(thread_id: str) -> Optional[Dict[str, Any]]:
     """Get complete application data from database"""
     try:
         # Get user_id from thread
-        user_id = _get_user_id_from_thread(thread_id)
+        user_id = await _get_user_id_from_thread(thread_id)
         if not user_id:
             return None
 
@@ -10,10 +10,15 @@ from beanie import PydanticObjectId
 from database.models.user import User
 from services.twilio_service import twilio_service
 from services.jwt_service import jwt_service
+from services.principal_cache import Principal, UserSnapshot, principal_cache
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 security = HTTPBearer(auto_error=False)
 
+# When enabled, hot-path routes accept the signed user_id claim without loading the user.
+# A deleted user then keeps access until the token expires.
+TRUST_TOKEN_CLAIMS = os.getenv('AUTH_TRUST_TOKEN_CLAIMS', 'false').lower() == 'true'
+
 # Request/Response Models
 class SendOTPRequest(BaseModel):
     country_code: str = Field(..., description="Country code with + prefix", example="+91")
@@ -63,13 +68,18 @@ async def check_rate_limit(phone_number: str) -> bool:
     
     return True
 
-# Dependency for authenticated routes
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
-    """Get current authenticated user from JWT token in Authorization header"""
+async def _authenticate(credentials: Optional[HTTPAuthorizationCredentials]) -> UserSnapshot:
+    """Verify the bearer token and return a read-only snapshot of its user"""
     if not credentials:
         raise HTTPException(status_code=401, detail="Authentication required")
     
     token = credentials.credentials
+    
+    # Recently verified token - skip JWT decode and the user lookup
+    snapshot = principal_cache.get(token)
+    if snapshot:
+        return snapshot
+    
     result = jwt_service.verify_token(token)
     if not result['success']:
         raise HTTPException(status_code=401, detail=result['error'])
@@ -79,8 +89,38 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
+    snapshot = UserSnapshot.from_user(user)
+    principal_cache.set(token, snapshot, result['data'].get('exp'))
+    return snapshot
+
+# Dependency for authenticated routes that modify the user
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+    """Get the current user's document (loaded fresh, never shared) from the JWT in the Authorization header"""
+    snapshot = await _authenticate(credentials)
+    user = await User.get(PydanticObjectId(snapshot.user_id))
+    if not user:
+        principal_cache.invalidate_user(snapshot.user_id)
+        raise HTTPException(status_code=401, detail="User not found")
     return user
 
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """
+    Get the caller's identity for hot-path routes that only read it.
+    With AUTH_TRUST_TOKEN_CLAIMS the signed token is enough and no user is loaded.
+    """
+    if not TRUST_TOKEN_CLAIMS:
+        snapshot = await _authenticate(credentials)
+        return Principal(user_id=snapshot.user_id, user=snapshot)
+    
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    
+    result = jwt_service.verify_token(credentials.credentials)
+    if not result['success']:
+        raise HTTPException(status_code=401, detail=result['error'])
+    
+    return Principal(user_id=result['data']['user_id'], claims=result['data'])
+
 @router.get("/countries", response_model=list[CountryCodeResponse])
 async def get_supported_countries():
     """Get list of supported countries with their codes"""
@@ -121,7 +161,7 @@ async def send_otp(request: SendOTPRequest):
         await user.save()
         
         # Send OTP via Twilio Verify (no need to generate OTP ourselves)
-        sms_result = twilio_service.send_otp(full_phone)
+        sms_result = await twilio_service.asend_otp(full_phone)
         
         if not sms_result['success']:
             raise HTTPException(
@@ -158,11 +198,20 @@ async def verify_otp(request: VerifyOTPRequest, response: Response):
             raise HTTPException(status_code=400, detail="Maximum OTP attempts exceeded")
         
         # Verify OTP using Twilio Verify
-        verify_result = twilio_service.verify_otp(full_phone, request.otp_code)
+        verify_result = await twilio_service.averify_otp(full_phone, request.otp_code)
+        
+        if not verify_result['success'] and verify_result.get('retryable'):
+            # No definite answer from Twilio (timeout, outage) - don't count the attempt
+            raise HTTPException(
+                status_code=503,
+                detail="Could not verify the OTP right now. Please try again in a moment",
+                headers={"Retry-After": "5"}
+            )
         
         if not verify_result['success']:
             user.otp_attempts += 1
             await user.save()
+            principal_cache.invalidate_user(str(user.id))
             
             error_message = "Invalid OTP code"
             if 'error' in verify_result:
@@ -178,6 +227,7 @@ async def verify_otp(request: VerifyOTPRequest, response: Response):
         user.updated_at = datetime.utcnow()
         
         await user.save()
+        principal_cache.invalidate_user(str(user.id))
         
         # Don't generate JWT or set cookie yet - wait for complete registration
         
@@ -194,12 +244,13 @@ async def verify_otp(request: VerifyOTPRequest, response: Response):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/session", response_model=AuthResponse)
-async def check_session(current_user: User = Depends(get_current_user)):
+async def check_session(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Check if user has valid session"""
+    current_user = await _authenticate(credentials)
     return AuthResponse(
         success=True,
         message="Valid session",
-        user_id=str(current_user.id),
+        user_id=current_user.user_id,
         phone_number=current_user.phone,
         first_name=current_user.first_name,
         last_name=current_user.last_name,
@@ -213,6 +264,7 @@ async def logout(current_user: User = Depends(get_current_user)):
     # Clear session token in database
     current_user.session_token = None
     await current_user.save()
+    principal_cache.invalidate_user(str(current_user.id))
     
     return {"success": True, "message": "Logged out successfully"}
 
@@ -280,6 +332,7 @@ async def complete_registration(request: CompleteRegistrationRequest, response:
         
         # Save user to database
         await user.save()
+        principal_cache.invalidate_user(str(user.id))
         
         # Return token in response instead of setting cookie
         return AuthResponse(
@@ -1,15 +1,54 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-import time
+from fastapi import APIRouter, HTTPException, Request
+from typing import List
+import os
 from database.models.country import Country
 from database.models.visa_type_selection import VisaTypeSelection
+from services.cache_service import AsyncSWRCache, cached_json_response
+from services.visa_purpose_index import PurposeIndex, purpose_indexes
 
 router = APIRouter(prefix="/api/countries", tags=["countries"])
 
-# Global cache variables
-_countries_cache: Optional[List[dict]] = None
-_cache_timestamp: Optional[float] = None
-CACHE_TTL = 3600  # 1 hour in seconds
+# Cache settings
+CACHE_TTL = int(os.getenv("COUNTRIES_CACHE_TTL", "3600"))  # 1 hour in seconds
+CACHE_STALE_TTL = int(os.getenv("COUNTRIES_CACHE_STALE_TTL", "600"))  # Serve stale while refreshing
+BROWSER_MAX_AGE = int(os.getenv("COUNTRIES_BROWSER_MAX_AGE", "300"))  # Clients revalidate with ETag after this
+
+# Shared by all country endpoints; invalidated across workers via clear_countries_cache()
+countries_cache = AsyncSWRCache(
+    namespace="countries",
+    ttl=CACHE_TTL,
+    stale_ttl=CACHE_STALE_TTL,
+    max_entries=int(os.getenv("COUNTRIES_CACHE_MAX_ENTRIES", "1024"))
+)
+
+# Countries joined to their visa type selection in a single round trip,
+# with purposes collected from every rule's criteria
+SUPPORTED_COUNTRIES_PIPELINE = [
+    {"$lookup": {
+        "from": "visa_type_selections",
+        "localField": "code",
+        "foreignField": "country_code",
+        "as": "selections"
+    }},
+    # Keep only the first selection's rules, matching the previous find_one()
+    {"$project": {
+        "code": 1,
+        "name": 1,
+        "official_name": 1,
+        "rules": {"$arrayElemAt": ["$selections.rules", 0]}
+    }},
+    {"$unwind": "$rules"},
+    {"$unwind": "$rules.criteria.purpose"},
+    {"$group": {
+        "_id": "$_id",
+        "code": {"$first": "$code"},
+        "name": {"$first": "$name"},
+        "official_name": {"$first": "$official_name"},
+        "purposes": {"$addToSet": "$rules.criteria.purpose"}
+    }},
+    # Keep insertion order, as Country.find_all() did
+    {"$sort": {"_id": 1}}
+]
 
 async def _fetch_countries_with_purposes() -> List[dict]:
     """
@@ -17,31 +56,20 @@ async def _fetch_countries_with_purposes() -> List[dict]:
     This is the expensive operation we want to cache.
     """
     try:
-        countries = await Country.find_all().to_list()
-        result = []
-        
-        for country in countries:
-            # Get visa type selection rules for this country
-            visa_selection = await VisaTypeSelection.find_one({"country_code": country.code})
-            
-            # Extract unique purposes from all visa rules
-            purposes = set()
-            if visa_selection and visa_selection.rules:
-                for rule in visa_selection.rules:
-                    if rule.criteria and rule.criteria.purpose:
-                        purposes.update(rule.criteria.purpose)
-            
-            # Only include countries that have supported visas
-            if purposes:
-                result.append({
-                    "id": str(country.id),
-                    "code": country.code,
-                    "name": country.name,
-                    "official_name": country.official_name,
-                    "purposes": sorted(list(purposes))  # Sort for consistency
-                })
+        countries = await Country.aggregate(SUPPORTED_COUNTRIES_PIPELINE).to_list()
         
-        return result
+        # Countries without a selection or purposes are dropped by the $unwind stages,
+        # so only countries that have supported visas are returned
+        return [
+            {
+                "id": str(country["_id"]),
+                "code": country["code"],
+                "name": country["name"],
+                "official_name": country.get("official_name"),
+                "purposes": sorted(country["purposes"])  # Sort for consistency
+            }
+            for country in countries
+        ]
         
     except Exception as e:
         print(f"Error fetching countries with purposes: {e}")
@@ -77,159 +105,85 @@ async def _fetch_countries_with_purposes() -> List[dict]:
             }
         ]
 
-def clear_countries_cache():
-    """Clear the countries cache - useful when data is updated"""
-    global _countries_cache, _cache_timestamp
-    _countries_cache = None
-    _cache_timestamp = None
+async def _fetch_countries() -> List[dict]:
+    """Fetch all countries with their basic information"""
+    countries = await Country.find_all().to_list()
+    
+    # Return only essential fields for dropdown
+    return [
+        {
+            "id": str(country.id),
+            "code": country.code,
+            "name": country.name,
+            "official_name": country.official_name
+        }
+        for country in countries
+    ]
+
+async def clear_countries_cache():
+    """Clear the countries cache in every worker - useful when data is updated"""
+    await countries_cache.invalidate_everywhere()
 
 
 @router.get("/", response_model=List[dict])
-async def get_countries():
+async def get_countries(request: Request):
     """
-    Get all countries with their basic information
+    Get all countries with their basic information (with caching)
     """
     try:
-        countries = await Country.find_all().to_list()
-        
-        # Return only essential fields for dropdown
-        return [
-            {
-                "id": str(country.id),
-                "code": country.code,
-                "name": country.name,
-                "official_name": country.official_name
-            }
-            for country in countries
-        ]
+        entry = await countries_cache.get("all", _fetch_countries)
+        return cached_json_response(request, entry, BROWSER_MAX_AGE, CACHE_STALE_TTL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching countries: {str(e)}")
 
 @router.get("/supported", response_model=List[dict])  
-async def get_supported_countries():
+async def get_supported_countries(request: Request):
     """
     Get countries with their supported purposes (with caching)
     """
-    global _countries_cache, _cache_timestamp
-    
     try:
-        # Check if cache is valid
-        current_time = time.time()
-        if (_countries_cache is not None and 
-            _cache_timestamp is not None and 
-            current_time - _cache_timestamp < CACHE_TTL):
-            print("Serving countries from cache")
-            return _countries_cache
-        
-        print("Cache miss - fetching countries from database")
-        
-        # Cache miss - fetch from database
-        countries = await _fetch_countries_with_purposes()
-        
-        # Update cache
-        _countries_cache = countries
-        _cache_timestamp = current_time
-        
-        print(f"Cached {len(countries)} countries with purposes")
-        return countries
+        entry = await countries_cache.get("supported", _fetch_countries_with_purposes)
+        return cached_json_response(request, entry, BROWSER_MAX_AGE, CACHE_STALE_TTL)
         
     except Exception as e:
         print(f"Error in get_supported_countries: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching supported countries: {str(e)}")
 
 @router.get("/{country_code}/purposes/{purpose}/visa-details")
-async def get_visa_details_by_purpose(country_code: str, purpose: str):
+async def get_visa_details_by_purpose(request: Request, country_code: str, purpose: str):
     """
-    Get detailed visa information based on country and purpose selection
+    Get detailed visa information based on country and purpose selection.
+    Served from the country's precompiled purpose index (no database round trip when cached).
     """
     try:
-        # Find visa selection for the country
-        visa_selection = await VisaTypeSelection.find_one({"country_code": country_code.upper()})
-        
-        if not visa_selection:
-            raise HTTPException(status_code=404, detail=f"Country {country_code} not found")
+        index = (await countries_cache.get(
+            ("purpose-index", country_code.upper()),
+            lambda: _load_purpose_index(country_code)
+        )).value
         
         # Find the best matching visa rule based on purpose
-        best_match = None
-        highest_score = 0
+        entry = index.response_for(purpose)
         
-        for rule in visa_selection.rules:
-            if rule.criteria and rule.criteria.purpose:
-                # Calculate match score
-                score = 0
-                purpose_lower = purpose.lower()
-                
-                for rule_purpose in rule.criteria.purpose:
-                    if purpose_lower == rule_purpose.lower():
-                        score += 10  # Exact match
-                    elif purpose_lower in rule_purpose.lower() or rule_purpose.lower() in purpose_lower:
-                        score += 5   # Partial match
-                
-                # Consider priority (lower number = higher priority)
-                if rule.priority:
-                    score += (10 - rule.priority)
-                
-                if score > highest_score:
-                    highest_score = score
-                    best_match = rule
-        
-        if not best_match:
+        if entry is None:
             raise HTTPException(status_code=404, detail=f"No visa found for purpose: {purpose}")
         
-        # Return complete visa information
-        result = {
-            "country_name": visa_selection.country_name,
-            "country_code": visa_selection.country_code,
-            "matched_purpose": purpose,
-            "visa_type": best_match.visa_type,
-            "visa_code": best_match.visa_code,
-            "priority": best_match.priority,
-            "criteria": {
-                "purpose": best_match.criteria.purpose,
-                "max_days": best_match.criteria.max_days,
-                "min_travellers": best_match.criteria.min_travellers,
-                "max_travellers": best_match.criteria.max_travellers
-            }
-        }
-        
-        # Add enhanced information if available
-        if best_match.visa_details:
-            result["visa_details"] = {
-                "stay_duration": best_match.visa_details.stay_duration,
-                "validity_period": best_match.visa_details.validity_period,
-                "entry_type": best_match.visa_details.entry_type,
-                "processing_time": best_match.visa_details.processing_time,
-                "fee_range": best_match.visa_details.fee_range,
-                "description": best_match.visa_details.description
-            }
-        
-        if best_match.document_requirements:
-            result["document_requirements"] = [
-                {
-                    "name": doc.name,
-                    "description": doc.description,
-                    "required": doc.required,
-                    "category": doc.category,
-                    "notes": doc.notes
-                }
-                for doc in best_match.document_requirements
-            ]
-        
-        if best_match.approval_process:
-            result["approval_process"] = [
-                {
-                    "step_number": step.step_number,
-                    "title": step.title,
-                    "description": step.description,
-                    "estimated_time": step.estimated_time
-                }
-                for step in best_match.approval_process
-            ]
-        
-        return result
+        return cached_json_response(request, entry, BROWSER_MAX_AGE, CACHE_STALE_TTL)
         
     except HTTPException:
         raise
     except Exception as e:
         print(f"Error in get_visa_details_by_purpose: {e}")
-        raise HTTPException(status_code=500, detail=f"Error fetching visa details: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching visa details: {str(e)}")
+
+async def _load_purpose_index(country_code: str) -> PurposeIndex:
+    """
+    Load a country's visa selection and return its purpose index.
+    The index is only rebuilt when the document version changes. Unknown countries
+    raise a 404 inside the loader, so the miss is never cached.
+    """
+    visa_selection = await VisaTypeSelection.find_one({"country_code": country_code.upper()})
+    
+    if not visa_selection:
+        raise HTTPException(status_code=404, detail=f"Country {country_code} not found")
+    
+    return purpose_indexes.get_or_build(visa_selection)
@@ -1,12 +1,19 @@
 # Document Upload API Endpoint
 # Purpose: Handle file uploads from frontend and store for processing
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from typing import Optional
+import asyncio
+import json
 import os
 import uuid
 from datetime import datetime
 
+from api.auth import get_current_principal
+from services.extraction_jobs import ExtractionJob, extraction_jobs
+from services.principal_cache import Principal
+
 router = APIRouter(prefix="/api", tags=["documents"])
 
 # Configure upload directory
@@ -62,6 +69,9 @@ async def upload_document(
         with open(file_path, "wb") as f:
             f.write(content)
         
+        # Start extraction now so it overlaps with the user's next message
+        job = await extraction_jobs.enqueue(thread_id, document_type, file_path)
+        
         return {
             "status": "success",
             "message": "File uploaded successfully",
@@ -70,7 +80,9 @@ async def upload_document(
             "thread_id": thread_id,
             "filename": unique_filename,
             "upload_timestamp": datetime.utcnow().isoformat(),
-            "file_size": len(content)
+            "file_size": len(content),
+            "extraction_job_id": job.job_id if job else None,
+            "extraction_status": job.status if job else None
         }
         
     except HTTPException:
@@ -128,4 +140,63 @@ async def delete_uploaded_file(thread_id: str, filename: str):
         raise
     except Exception as e:
         print(f"File deletion error: {e}")
-        raise HTTPException(status_code=500, detail="File deletion failed")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="File deletion failed")
+
+
+async def _owned_job(job_id: str, principal: Principal) -> ExtractionJob:
+    """The job if its thread belongs to the caller; 404 otherwise, so other users' job ids aren't confirmed"""
+    # Imported here to avoid circular imports (the thread store lives with the agent app)
+    from agent.thread_store import thread_state_store
+
+    job = await extraction_jobs.get(job_id)
+    if job:
+        thread_state = await thread_state_store.get(job.thread_id) or {}
+        if thread_state.get("user_id") == principal.user_id:
+            return job
+    raise HTTPException(status_code=404, detail="Extraction job not found")
+
+
+@router.get("/extraction-jobs/{job_id}")
+async def get_extraction_job(job_id: str, principal: Principal = Depends(get_current_principal)):
+    """Status (and result, once finished) of a document extraction job"""
+    job = await _owned_job(job_id, principal)
+    return job.to_dict()
+
+
+@router.get("/extraction-jobs/{job_id}/events")
+async def stream_extraction_job(job_id: str, principal: Principal = Depends(get_current_principal)):
+    """Server-sent events with the job's status on every change, ending when it finishes"""
+    job = await _owned_job(job_id, principal)
+
+    async def generate_events():
+        updates = extraction_jobs.subscribe(job)
+        next_update = None
+        try:
+            while True:
+                if next_update is None:
+                    next_update = asyncio.ensure_future(updates.__anext__())
+                # Heartbeat comments keep proxies from closing the idle connection
+                done, _ = await asyncio.wait({next_update}, timeout=15)
+                if not done:
+                    yield ": heartbeat\n\n"
+                    continue
+                try:
+                    snapshot = next_update.result()
+                except StopAsyncIteration:
+                    return
+                next_update = None
+                yield f"event: status\ndata: {json.dumps(snapshot)}\n\n"
+        finally:
+            if next_update is not None and not next_update.done():
+                next_update.cancel()
+                await asyncio.gather(next_update, return_exceptions=True)
+            await updates.aclose()
+
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive"
+        }
+    )
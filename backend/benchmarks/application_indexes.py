@@ -0,0 +1,141 @@
+# Application index benchmark
+# Purpose: Seed a scratch database with N visa applications and N comprehensive applications
+# (1M each by default), then time the hot lookups and show their explain() plans with only
+# the old single-field indexes and with the declared compound/unique indexes
+#
+# Usage (from backend/):
+#   python -m benchmarks.application_indexes
+#   python -m benchmarks.application_indexes --documents 200000 --lookups 500 --keep
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from database.index_audit import HOT_QUERIES, audit, print_report
+
+BATCH_SIZE = 10000
+STATUSES = ["in_progress"] * 2 + ["completed", "submitted", "approved", "rejected"]
+
+# Before: only user_id was indexed in practice; the comprehensive model's thread_id index was
+# declared but never built because the model wasn't registered with init_beanie
+OLD_INDEXES = {
+    "visa_applications": [IndexModel([("user_id", ASCENDING)], name="user_id_1")],
+    "comprehensive_visa_applications": [],
+}
+NEW_INDEXES = {
+    "visa_applications": [IndexModel(
+        [("user_id", ASCENDING), ("status", ASCENDING), ("updated_at", DESCENDING)], name="user_status_updated"
+    )],
+    "comprehensive_visa_applications": [IndexModel([("thread_id", ASCENDING)], name="thread_id_unique", unique=True)],
+}
+
+
+async def seed(database, documents: int, users: int) -> None:
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    for offset in range(0, documents, BATCH_SIZE):
+        count = min(BATCH_SIZE, documents - offset)
+        applications, comprehensive = [], []
+        for i in range(offset, offset + count):
+            user_id = f"user_{random.randrange(users)}"
+            updated_at = now - timedelta(minutes=random.randrange(60 * 24 * 365))
+            applications.append({
+                "visa_application_id": f"VA_{i}",
+                "user_id": user_id,
+                "status": random.choice(STATUSES),
+                "basic_info": {"country": "Vietnam", "visa_type": "Vietnam Tourism Single Entry"},
+                "workflow_info": {"current_stage": "documents", "completed_stages": []},
+                "travelers": [{"traveler_id": 1, "is_primary_applicant": True, "documents": {}, "collected_data": {}}],
+                "created_at": updated_at,
+                "updated_at": updated_at,
+            })
+            comprehensive.append({
+                "application_id": f"CA_{i}",
+                "thread_id": f"thread_{i}",
+                "user_id": user_id,
+                "raw_collected_data": {},
+                "updated_at": updated_at,
+            })
+        await database["visa_applications"].insert_many(applications, ordered=False)
+        await database["comprehensive_visa_applications"].insert_many(comprehensive, ordered=False)
+        print(f"\rseeded {offset + count:,}/{documents:,}", end="", flush=True)
+    print(f"\nseeding took {time.perf_counter() - started:.0f}s")
+
+
+async def set_indexes(database, indexes: dict) -> None:
+    for collection_name, models in indexes.items():
+        collection = database[collection_name]
+        await collection.drop_indexes()
+        if not models:
+            print(f"  {collection_name}: _id index only")
+            continue
+        started = time.perf_counter()
+        await collection.create_indexes(models)
+        print(f"  built {', '.join(model.document['name'] for model in models)} in {time.perf_counter() - started:.1f}s")
+
+
+async def time_lookups(database, documents: int, users: int, lookups: int) -> None:
+    timings = {"active application by user": [], "comprehensive application by thread": []}
+    for _ in range(lookups):
+        started = time.perf_counter()
+        await database["visa_applications"].find_one(
+            {"user_id": f"user_{random.randrange(users)}", "status": "in_progress"}, sort=[("updated_at", -1)]
+        )
+        timings["active application by user"].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await database["comprehensive_visa_applications"].find_one({"thread_id": f"thread_{random.randrange(documents)}"})
+        timings["comprehensive application by thread"].append((time.perf_counter() - started) * 1000)
+
+    for name, values in timings.items():
+        values.sort()
+        p95 = values[max(0, int(len(values) * 0.95) - 1)]
+        print(f"  {name:<38} median {statistics.median(values):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+async def run_benchmark(documents: int, users: int, lookups: int, keep: bool) -> None:
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    database_name = os.getenv("DATABASE_NAME", "veazy_db") + "_index_bench"
+    database = client[database_name]
+
+    # Hot query shapes with values that exist in the seeded data, so explain() examines real documents
+    queries = [{**query, "filter": {key: ("user_1" if key == "user_id" else "thread_1" if key == "thread_id" else value)
+                                    for key, value in query["filter"].items()}}
+               for query in HOT_QUERIES]
+
+    existing = await database["visa_applications"].estimated_document_count()
+    if existing != documents:
+        await client.drop_database(database_name)
+        await seed(database, documents, users)
+
+    for label, indexes in (("single-field indexes (before)", OLD_INDEXES), ("declared indexes (after)", NEW_INDEXES)):
+        print(f"\n=== {label} ===")
+        await set_indexes(database, indexes)
+        results = await audit(database, queries)
+        print_report(results)
+        for result in results:
+            if not result.get("error"):
+                print(f"  {result['name']:<38} docs examined {result['docs_examined']}, keys examined {result['keys_examined']}")
+        await time_lookups(database, documents, users, lookups)
+
+    if not keep:
+        await client.drop_database(database_name)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hot application query latency before/after the declared indexes")
+    parser.add_argument("--documents", type=int, default=1_000_000, help="Documents per collection")
+    parser.add_argument("--users", type=int, default=250_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database for another run")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.documents, args.users, args.lookups, args.keep))
@@ -0,0 +1,151 @@
+# Application write benchmark
+# Purpose: Count MongoDB operations needed to take one application through every stage of a
+# workflow, replaying the workflow tools' calls (stage read, one collect per field, stage
+# advance) against both stores they write: workflow_sessions and comprehensive_visa_applications.
+# Both paths save the session delta once per tool call; they differ in the application write:
+# find_one + full save per field versus the write-behind buffer (one upserting $set per stage).
+# Needs a reachable MongoDB; uses a scratch database.
+#
+# Usage (from backend/):
+#   python -m benchmarks.application_writes --applications 20
+#   MONGODB_URL=mongodb://localhost:27017 python -m benchmarks.application_writes --workflow VNM_tourism_single_entry
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from agents.workflow_session_store import WorkflowSessionStore
+from config.workflow_registry import workflow_registry
+from database.mongodb import db
+from services.application_write_buffer import ApplicationWriteBuffer
+
+COLLECTION = "comprehensive_visa_applications"
+SESSION_COLLECTION = "workflow_sessions"
+HANDOFF = {"country": "Vietnam", "visa_type": "Vietnam Tourism Single Entry"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str) and event.command_name not in ("endSessions", "hello", "isMaster"):
+            self.commands[(collection, event.command_name)] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _stage_fields(workflow_ref: str) -> list:
+    workflow = workflow_registry.get(workflow_ref)
+    if workflow is None:
+        raise SystemExit(f"Unknown workflow: {workflow_ref}. Available: {workflow_registry.available()}")
+    return [[(name, f"value-{name}") for name in stage.fields] for stage in workflow.stages]
+
+
+async def _seed(collection, thread_id: str) -> None:
+    await collection.insert_one({
+        "application_id": f"bench_{thread_id}",
+        "thread_id": thread_id,
+        "raw_collected_data": {},
+        "basic_info": HANDOFF
+    })
+
+
+async def fill_per_field(store: WorkflowSessionStore, collection, thread_id: str, stages: list) -> None:
+    """Per-field writes: the session is saved and the application read and rewritten for every field"""
+    await store.create(thread_id, HANDOFF)
+    for index, stage in enumerate(stages):
+        await store.get(thread_id)                      # execute_current_stage
+        for field_name, value in stage:
+            session = await store.get(thread_id)        # collect_data_item
+            session.set_collected(field_name, value)
+            await store.save(session)
+            document = await collection.find_one({"thread_id": thread_id})
+            document["raw_collected_data"][field_name] = value
+            await collection.replace_one({"_id": document["_id"]}, document)
+        session = await store.get(thread_id)            # advance_to_next_stage
+        session.set("current_stage_index", index + 1)
+        await store.save(session)
+
+
+async def fill_buffered(store: WorkflowSessionStore, buffer: ApplicationWriteBuffer, thread_id: str, stages: list) -> None:
+    """Session delta saved per tool call; application fields buffered and written once per stage"""
+    await store.create(thread_id, HANDOFF)
+    for index, stage in enumerate(stages):
+        await store.get(thread_id)                      # execute_current_stage
+        for field_name, value in stage:
+            session = await store.get(thread_id)        # collect_data_item
+            session.set_collected(field_name, value)
+            await store.save(session)
+            await buffer.set_fields(thread_id, {field_name: value}, on_insert={"basic_info": HANDOFF})
+        session = await store.get(thread_id)            # advance_to_next_stage
+        session.set("current_stage_index", index + 1)
+        await buffer.flush(thread_id, reason="stage")
+        await store.save(session)
+
+
+async def run_benchmark(applications: int, workflow_ref: str) -> None:
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"), event_listeners=[counter])
+    database_name = os.getenv("DATABASE_NAME", "veazy_db") + "_write_bench"
+    db.client, db.database = client, client[database_name]
+    collection = db.database[COLLECTION]
+    await client.drop_database(database_name)
+    await collection.create_index("thread_id")
+
+    stages = _stage_fields(workflow_ref)
+    field_count = sum(len(stage) for stage in stages)
+    print(f"{workflow_ref}: {len(stages)} stages, {field_count} fields per application\n")
+
+    buffer = ApplicationWriteBuffer(COLLECTION, flush_interval=3600, max_pending=50)
+    store = WorkflowSessionStore(SESSION_COLLECTION, max_entries=applications * 2, cache_ttl=3600, ttl=3600)
+    await store.get("warm-up")  # Builds the TTL index outside the measurement
+
+    runs = (
+        ("per-field writes", lambda t: fill_per_field(store, collection, t, stages), True),
+        ("buffered writes", lambda t: fill_buffered(store, buffer, t, stages), False),
+    )
+    for label, fill, seed in runs:
+        thread_ids = [f"{label[:3]}-{i}" for i in range(applications)]
+        if seed:
+            # The per-field path only ever updated an application that already existed
+            for thread_id in thread_ids:
+                await _seed(collection, thread_id)
+
+        counter.commands.clear()
+        started = time.perf_counter()
+        for thread_id in thread_ids:
+            await fill(thread_id)
+        elapsed = time.perf_counter() - started
+
+        total = sum(counter.commands.values())
+        print(f"{label:<20} {total / applications:6.1f} ops/application   {elapsed / applications * 1000:7.1f} ms/application")
+        for collection_name in (SESSION_COLLECTION, COLLECTION):
+            commands = {name: count for (coll, name), count in counter.commands.items() if coll == collection_name}
+            breakdown = ", ".join(f"{name} {count / applications:.0f}" for name, count in sorted(commands.items()))
+            print(f"  {collection_name:<33} {sum(commands.values()) / applications:6.1f}  ({breakdown})")
+
+    await client.drop_database(database_name)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mongo operations per completed application")
+    parser.add_argument("--applications", type=int, default=20)
+    parser.add_argument("--workflow", default="Vietnam Tourism Single Entry", help="Workflow id or visa type")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.applications, args.workflow))
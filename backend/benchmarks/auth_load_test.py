@@ -0,0 +1,95 @@
+# Auth throughput load test
+# Purpose: Drive concurrent /api/auth/send-otp + /verify-otp logins against a running API
+# (configured for the fake Verify server) and measure throughput, latency and how long a
+# cheap endpoint takes while logins are in flight - a blocked event loop shows up there
+#
+# Usage (from backend/), with benchmarks.fake_twilio_verify running and the API started
+# with TWILIO_API_BASE_URL pointing at it:
+#   python -m benchmarks.auth_load_test --url http://127.0.0.1:8000 --users 200 --concurrency 50
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import httpx
+
+PROBE_PATH = "/health"
+
+
+def _summary(timings: list) -> str:
+    if not timings:
+        return "n/a"
+    timings = sorted(timings)
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    return f"median {statistics.median(timings):7.1f} ms   p95 {p95:7.1f} ms   max {timings[-1]:7.1f} ms"
+
+
+async def login(client: httpx.AsyncClient, local_phone: str, code: str, timings: dict, errors: list) -> None:
+    """One full OTP login: send-otp then verify-otp"""
+    body = {"country_code": "+1", "local_phone": local_phone}
+
+    for path, payload in (("/api/auth/send-otp", body), ("/api/auth/verify-otp", {**body, "otp_code": code})):
+        start = time.perf_counter()
+        response = await client.post(path, json=payload)
+        timings[path].append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            errors.append(f"{path} {response.status_code}: {response.text[:120]}")
+            return
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, timings: list) -> None:
+    """Hit a trivial endpoint every 50ms; its latency reflects event-loop stalls"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(PROBE_PATH)
+        timings.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.05)
+
+
+async def run_load_test(url: str, users: int, concurrency: int, code: str) -> None:
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        timings = {"/api/auth/send-otp": [], "/api/auth/verify-otp": []}
+        probe_timings = []
+        errors = []
+
+        # Random phone block so reruns don't trip the 1-minute OTP rate limit
+        base = random.randint(2000000000, 8999999999 - users)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited_login(i: int):
+            async with semaphore:
+                await login(client, str(base + i), code, timings, errors)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, probe_timings))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited_login(i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await probe_task
+
+    completed = users - len(errors)
+    print(f"Logins: {completed}/{users} ok in {elapsed:.2f}s ({completed / elapsed:.1f} logins/s, concurrency {concurrency})")
+    for path, values in timings.items():
+        print(f"  {path:<24}{_summary(values)}")
+    print(f"  {'probe ' + PROBE_PATH:<24}{_summary(probe_timings)}")
+
+    if errors:
+        print(f"\n{len(errors)} errors, first few:")
+        for error in errors[:5]:
+            print(f"  {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test OTP login throughput")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--code", default="123456")
+    args = parser.parse_args()
+
+    asyncio.run(run_load_test(args.url, args.users, args.concurrency, args.code))
@@ -0,0 +1,72 @@
+# Cold-start benchmark
+# Purpose: Measure time from `uvicorn` launch to the first served request (/health) and to
+# the first passing readiness probe (/health/ready), over several fresh processes
+#
+# Usage (from backend/):
+#   python -m benchmarks.cold_start --runs 5
+#   LLM_PROVIDER=fake LANGFUSE_ENABLED=false python -m benchmarks.cold_start --runs 5
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent")
+
+
+def _wait_for(url: str, deadline: float, accept_status=(200,)) -> float:
+    """Poll `url` until it answers with an accepted status; returns the time it did"""
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code in accept_status:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} not ready before deadline")
+
+
+def measure_once(port: int, timeout: float, check_ready: bool) -> dict:
+    command = [sys.executable, "-m", "uvicorn", "production_app:app", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    # No readiness caching in the benchmarked process, so a not-ready result isn't reused while polling
+    env = {**os.environ, "READINESS_CACHE_TTL": "0"}
+    process = subprocess.Popen(command, cwd=AGENT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        first_request = _wait_for(f"{base_url}/health", started + timeout)
+        result = {"first_request_s": first_request - started}
+        if check_ready:
+            ready = _wait_for(f"{base_url}/health/ready", started + timeout)
+            result["ready_s"] = ready - started
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def run_benchmark(runs: int, port: int, timeout: float, check_ready: bool) -> None:
+    results = []
+    for i in range(runs):
+        result = measure_once(port, timeout, check_ready)
+        results.append(result)
+        print(f"run {i + 1}: " + "   ".join(f"{key} {value:6.2f}" for key, value in result.items()))
+
+    print()
+    for key in results[0]:
+        values = [result[key] for result in results]
+        print(f"{key:<18}median {statistics.median(values):6.2f}s   min {min(values):6.2f}s   max {max(values):6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure API cold start (launch to first served request)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--skip-ready", action="store_true", help="Only time the first /health response")
+    args = parser.parse_args()
+
+    run_benchmark(args.runs, args.port, args.timeout, not args.skip_ready)
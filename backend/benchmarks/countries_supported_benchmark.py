@@ -0,0 +1,148 @@
+# Benchmark for /api/countries/supported cold-path latency
+# Purpose: Seed N countries with visa type selections in a throwaway database and compare
+# the old per-country find_one (N+1) fetch with the single aggregation pipeline
+#
+# Usage (from backend/):
+#   python -m benchmarks.countries_supported_benchmark --countries 200 --runs 20
+#
+# Needs a reachable mongod (MONGODB_URL, default mongodb://localhost:27017).
+# The benchmark database is dropped afterwards.
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+from dotenv import load_dotenv
+
+from database.models.country import Country
+from database.models.visa_type_selection import VisaTypeSelection, VisaTypeRule, SelectionCriteria
+from api.countries import _fetch_countries_with_purposes
+
+load_dotenv()
+
+PURPOSES = [
+    ["tourism", "leisure", "vacation"],
+    ["business", "meeting", "conference"],
+    ["transit", "stopover"],
+    ["family visit", "social"],
+    ["medical", "treatment"],
+]
+
+
+async def _fetch_countries_with_purposes_n_plus_one() -> list:
+    """The previous implementation: one find_one per country"""
+    countries = await Country.find_all().to_list()
+    result = []
+
+    for country in countries:
+        visa_selection = await VisaTypeSelection.find_one({"country_code": country.code})
+
+        purposes = set()
+        if visa_selection and visa_selection.rules:
+            for rule in visa_selection.rules:
+                if rule.criteria and rule.criteria.purpose:
+                    purposes.update(rule.criteria.purpose)
+
+        if purposes:
+            result.append({
+                "id": str(country.id),
+                "code": country.code,
+                "name": country.name,
+                "official_name": country.official_name,
+                "purposes": sorted(list(purposes))
+            })
+
+    return result
+
+
+async def seed(country_count: int) -> None:
+    """Insert country_count countries; every 10th one has no visa selection"""
+    countries = []
+    selections = []
+
+    for i in range(country_count):
+        code = f"C{i:03d}"
+        countries.append(Country(code=code, name=f"Country {i}", official_name=f"Republic of Country {i}"))
+
+        if i % 10 == 9:
+            continue
+
+        rules = [
+            VisaTypeRule(
+                visa_type=f"Visa {j}",
+                visa_code=f"V{j}",
+                priority=j + 1,
+                criteria=SelectionCriteria(purpose=PURPOSES[(i + j) % len(PURPOSES)], max_days=30 * (j + 1))
+            )
+            for j in range(3)
+        ]
+        selections.append(VisaTypeSelection(
+            country_code=code,
+            country_name=f"Country {i}",
+            rules=rules,
+            default_suggestion="Visa 0"
+        ))
+
+    await Country.insert_many(countries)
+    await VisaTypeSelection.insert_many(selections)
+
+
+async def measure(fetch, runs: int) -> dict:
+    """Time `runs` sequential calls and return latency stats in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fetch()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[max(0, int(len(timings) * 0.95) - 1)],
+        "max": timings[-1]
+    }
+
+
+async def run_benchmark(country_count: int, runs: int) -> None:
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    database_name = os.getenv("BENCHMARK_DATABASE_NAME", "veazy_benchmark")
+
+    client = AsyncIOMotorClient(mongodb_url)
+    await client.drop_database(database_name)
+    database = client[database_name]
+
+    try:
+        await init_beanie(database=database, document_models=[Country, VisaTypeSelection])
+        await seed(country_count)
+        print(f"Seeded {country_count} countries into {database_name}")
+
+        # Both implementations must return the same payload
+        old_result = await _fetch_countries_with_purposes_n_plus_one()
+        new_result = await _fetch_countries_with_purposes()
+        if old_result != new_result:
+            raise AssertionError("Aggregation result differs from the N+1 result")
+        print(f"Results match ({len(new_result)} supported countries)")
+
+        before = await measure(_fetch_countries_with_purposes_n_plus_one, runs)
+        after = await measure(_fetch_countries_with_purposes, runs)
+
+        print(f"\n{'':<24}{'median':>10}{'p95':>10}{'max':>10}   (ms, {runs} runs)")
+        for label, stats in (("before (N+1 find_one)", before), ("after (aggregation)", after)):
+            print(f"{label:<24}{stats['median']:>10.1f}{stats['p95']:>10.1f}{stats['max']:>10.1f}")
+        print(f"\nSpeedup (median): {before['median'] / after['median']:.1f}x")
+
+    finally:
+        await client.drop_database(database_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the supported countries cold path")
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.countries, args.runs))
@@ -0,0 +1,97 @@
+# Fake Twilio Verify server for local load tests
+# Purpose: Answer the Verify v2 endpoints the Twilio SDK calls, with configurable latency,
+# so auth throughput can be measured without sending real SMS
+#
+# Usage (from backend/):
+#   FAKE_VERIFY_LATENCY_MS=300 uvicorn benchmarks.fake_twilio_verify:app --port 8099
+#
+# Point the API at it with:
+#   TWILIO_API_BASE_URL=http://127.0.0.1:8099 TWILIO_ACCOUNT_SID=ACfake TWILIO_AUTH_TOKEN=fake
+#   TWILIO_VERIFY_SERVICE_SID=VAfake
+#
+# Every code equal to FAKE_VERIFY_CODE (default 123456) is approved.
+
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_SECONDS = int(os.getenv("FAKE_VERIFY_LATENCY_MS", "300")) / 1000
+VALID_CODE = os.getenv("FAKE_VERIFY_CODE", "123456")
+
+app = FastAPI(title="Fake Twilio Verify")
+
+stats = {"services": 0, "verifications": 0, "checks": 0, "approved": 0}
+
+
+def _sid(prefix: str) -> str:
+    return prefix + uuid.uuid4().hex
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@app.post("/v2/Services")
+async def create_service(request: Request):
+    form = await request.form()
+    await asyncio.sleep(LATENCY_SECONDS)
+    stats["services"] += 1
+    sid = _sid("VA")
+    return JSONResponse(status_code=201, content={
+        "sid": sid,
+        "account_sid": "ACfake",
+        "friendly_name": form.get("FriendlyName", "Fake Verify"),
+        "code_length": len(VALID_CODE),
+        "date_created": _now(),
+        "date_updated": _now(),
+        "url": f"https://verify.twilio.com/v2/Services/{sid}"
+    })
+
+
+@app.post("/v2/Services/{service_sid}/Verifications")
+async def create_verification(service_sid: str, request: Request):
+    form = await request.form()
+    await asyncio.sleep(LATENCY_SECONDS)
+    stats["verifications"] += 1
+    return JSONResponse(status_code=201, content={
+        "sid": _sid("VE"),
+        "service_sid": service_sid,
+        "account_sid": "ACfake",
+        "to": form.get("To"),
+        "channel": form.get("Channel", "sms"),
+        "status": "pending",
+        "valid": False,
+        "date_created": _now(),
+        "date_updated": _now()
+    })
+
+
+@app.post("/v2/Services/{service_sid}/VerificationCheck")
+async def create_verification_check(service_sid: str, request: Request):
+    form = await request.form()
+    await asyncio.sleep(LATENCY_SECONDS)
+    stats["checks"] += 1
+
+    approved = form.get("Code") == VALID_CODE
+    if approved:
+        stats["approved"] += 1
+
+    return JSONResponse(status_code=200, content={
+        "sid": _sid("VE"),
+        "service_sid": service_sid,
+        "account_sid": "ACfake",
+        "to": form.get("To"),
+        "channel": "sms",
+        "status": "approved" if approved else "pending",
+        "valid": approved,
+        "date_created": _now(),
+        "date_updated": _now()
+    })
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,101 @@
+# Startup import profiler
+# Purpose: Import the API module in a fresh interpreter with `-X importtime` and report the
+# slowest modules, self time per top-level package, total boot time and peak RSS. With
+# --compare-ref the same measurement runs on another git revision (e.g. before a change).
+#
+# Usage (from backend/):
+#   python -m benchmarks.import_profile
+#   python -m benchmarks.import_profile --compare-ref HEAD~1 --runs 3
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+
+
+def profile_once(agent_dir: str, module: str) -> dict:
+    """Import `module` in a new interpreter; returns wall time, peak RSS and importtime rows"""
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    started = time.perf_counter()
+    # A fresh child per run so RUSAGE_CHILDREN's peak reflects this import only
+    probe = [sys.executable, "-c", (
+        "import resource, subprocess, sys; "
+        f"p = subprocess.run({command!r}, cwd={agent_dir!r}, capture_output=True, text=True); "
+        "sys.stderr.write(p.stderr); "
+        "print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss); "
+        "sys.exit(p.returncode)"
+    )]
+    result = subprocess.run(probe, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+
+    rss = int(result.stdout.strip().splitlines()[-1]) if result.stdout.strip() else 0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        print(f"Import failed in {agent_dir}:\n" + "\n".join(errors[-10:]))
+    return {"boot_s": elapsed, "rss_mb": rss_mb, "rows": rows}
+
+
+def report(label: str, runs: list, top: int) -> None:
+    rows = runs[-1]["rows"]
+    print(f"\n=== {label} ===")
+    print(f"boot (interpreter + import): median {statistics.median(r['boot_s'] for r in runs):.2f}s over {len(runs)} runs")
+    print(f"peak RSS:                    median {statistics.median(r['rss_mb'] for r in runs):.1f} MB")
+
+    by_package = defaultdict(int)
+    for self_us, _, name in rows:
+        by_package[name.strip().split(".")[0]] += self_us
+    print(f"\nSelf time by top-level package (top {top}):")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+
+    print(f"\nSlowest modules by cumulative time (top {top}):")
+    for _, cumulative_us, name in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+
+def profile_tree(agent_dir: str, module: str, runs: int) -> list:
+    return [profile_once(agent_dir, module) for _ in range(runs)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile API import time and memory")
+    parser.add_argument("--module", default="production_app")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--compare-ref", help="Also profile this git revision (checked out to a temp worktree)")
+    args = parser.parse_args()
+
+    current = profile_tree(os.path.join(BACKEND_DIR, "agent"), args.module, args.runs)
+
+    if args.compare_ref:
+        worktree = tempfile.mkdtemp(prefix="import-profile-")
+        try:
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, args.compare_ref], cwd=REPO_DIR, check=True, capture_output=True)
+            # Untracked files (.env, etc.) are not in the worktree; reuse this checkout's .env
+            for env_dir in ("backend", os.path.join("backend", "agent")):
+                env_file = os.path.join(REPO_DIR, env_dir, ".env")
+                if os.path.exists(env_file):
+                    shutil.copy(env_file, os.path.join(worktree, env_dir, ".env"))
+            baseline = profile_tree(os.path.join(worktree, "backend", "agent"), args.module, args.runs)
+            report(f"{args.compare_ref}", baseline, args.top)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_DIR, capture_output=True)
+
+    report("working tree", current, args.top)
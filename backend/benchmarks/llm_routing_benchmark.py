@@ -0,0 +1,72 @@
+# LLM routing benchmark
+# Purpose: Drive the structured-extraction helpers concurrently against the fake LLM provider
+# and report latency per helper plus per-route stats (calls, queueing under the concurrency
+# limit, timeouts), without API keys
+#
+# Usage (from backend/):
+#   python -m benchmarks.llm_routing_benchmark --calls 200 --extraction-latency-ms 80 --main-latency-ms 400
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Fake provider for every route unless the caller overrides it
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("LANGFUSE_ENABLED", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+from config.model_registry import MAIN_ROUTE, EXTRACTION_ROUTE
+from config.settings import llm_config
+from tools.visa_information import _extract_country_from_query
+from tools.application_basic import _extract_basic_visa_info_simple
+from tools.document_processing import _analyze_upload_message
+
+
+def _summary(timings: list) -> str:
+    timings = sorted(timings)
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    return f"median {statistics.median(timings):7.1f} ms   p95 {p95:7.1f} ms   max {timings[-1]:7.1f} ms"
+
+
+async def _timed(call, timings: list) -> None:
+    start = time.perf_counter()
+    await call()
+    timings.append((time.perf_counter() - start) * 1000)
+
+
+async def run_benchmark(calls: int) -> None:
+    helpers = {
+        "_extract_country_from_query": lambda: asyncio.to_thread(_extract_country_from_query, "What documents do I need for a Thailand visa?"),
+        "_extract_basic_visa_info_simple": lambda: _extract_basic_visa_info_simple("Thailand for tourism, 2 people, 24/01/26 to 02/02/26"),
+        "_analyze_upload_message": lambda: _analyze_upload_message("I have uploaded my passport bio page"),
+    }
+
+    for name, helper in helpers.items():
+        timings = []
+        start = time.perf_counter()
+        await asyncio.gather(*(_timed(helper, timings) for _ in range(calls)))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<34}{calls} calls in {elapsed:6.2f}s   {_summary(timings)}")
+
+    print()
+    for name, stats in llm_config.registry.stats().items():
+        print(f"route {name:<12}{stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark routed extraction helpers on the fake LLM")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--main-latency-ms", type=int, default=400)
+    parser.add_argument("--extraction-latency-ms", type=int, default=80)
+    args = parser.parse_args()
+
+    # Simulate a slow main model and a fast extraction model
+    for route, latency_ms in ((MAIN_ROUTE, args.main_latency_ms), (EXTRACTION_ROUTE, args.extraction_latency_ms)):
+        model = llm_config.registry.get(route).llm
+        if hasattr(model, "latency"):
+            model.latency = latency_ms / 1000
+
+    asyncio.run(run_benchmark(args.calls))
@@ -5,6 +5,7 @@ from database.models.user import User, UserProfile
 from database.models.visa_application import VisaApplication
 from database.models.document import DocumentModel
 from database.models.country import Country
+from services.cache_service import bump_cache_generation
 
 async def create_all_collections():
     print("Creating all MongoDB collections...")
@@ -45,6 +46,9 @@ async def create_all_collections():
             await visa_app.save()
             print(f"Created visa application: {visa_app.reference_number}")
         
+        # Drop cached country API responses in every running worker
+        await bump_cache_generation(database, "countries")
+        
         print("All collections created successfully!")
         
         # List all collections
@@ -8,6 +8,7 @@ from database.models.visa_type_selection import (
     MatchWeights
 )
 from database.models.country import Country
+from services.cache_service import bump_cache_generation
 
 async def create_real_visa_data():
     """Create real visa type data for Vietnam, Indonesia, and UAE based on 2025 research"""
@@ -323,6 +324,10 @@ async def create_real_visa_data():
         
         print(f"Total visa type selections: {total_selections}")
         print(f"Total countries: {total_countries}")
+        
+        # Drop cached country API responses in every running worker
+        await bump_cache_generation(database, "countries")
+        
         print("Real visa type data created successfully!")
         
     except Exception as e:
@@ -7,6 +7,7 @@ from database.models.visa_type_selection import (
     SelectionCriteria, 
     MatchWeights
 )
+from services.cache_service import bump_cache_generation
 
 async def create_visa_type_selection_data():
     """Create sample visa type selection rules following Beanie documentation patterns"""
@@ -129,6 +130,9 @@ async def create_visa_type_selection_data():
         total_selections = await VisaTypeSelection.count()
         print(f"Total visa type selections in database: {total_selections}")
         
+        # Drop cached country API responses in every running worker
+        await bump_cache_generation(database, "countries")
+        
         print("Visa type selection data created successfully!")
         
     except Exception as e:
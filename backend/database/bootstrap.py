@@ -0,0 +1,234 @@
+# database/bootstrap.py
+# Database bootstrap: builds the Motor client from environment settings (pool
+# sizing, idle time, compression, read preference, timeouts), attaches a pool
+# listener for utilization metrics and registers every Beanie document model.
+import importlib.util
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from pymongo import monitoring
+
+# Server error codes from an index build that startup reports instead of crashing on
+DUPLICATE_KEY = 11000
+INDEX_BUILD_ERRORS = {
+    85: "an existing index has the same keys with different options",   # IndexOptionsConflict
+    86: "an existing index has the same name with different keys",       # IndexKeySpecsConflict
+    DUPLICATE_KEY: "existing documents violate a unique index",
+}
+
+# Compressors and the optional package each one needs (zlib ships with Python)
+COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def _optional_int(name: str) -> Any:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+@dataclass
+class MongoSettings:
+    url: str = field(default_factory=lambda: os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    database_name: str = field(default_factory=lambda: os.getenv("DATABASE_NAME", "veazy_db"))
+    max_pool_size: int = field(default_factory=lambda: int(os.getenv("MONGO_MAX_POOL_SIZE", "50")))
+    min_pool_size: int = field(default_factory=lambda: int(os.getenv("MONGO_MIN_POOL_SIZE", "5")))          # Kept warm between bursts
+    max_idle_time_ms: int = field(default_factory=lambda: int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000")))
+    max_connecting: int = field(default_factory=lambda: int(os.getenv("MONGO_MAX_CONNECTING", "4")))        # Concurrent connection handshakes
+    wait_queue_timeout_ms: Any = field(default_factory=lambda: _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"))
+    compressors: List[str] = field(default_factory=lambda: [
+        name.strip() for name in os.getenv("MONGO_COMPRESSORS", "zstd,snappy").split(",") if name.strip()
+    ])
+    read_preference: str = field(default_factory=lambda: os.getenv("MONGO_READ_PREFERENCE", "primary"))
+    server_selection_timeout_ms: int = field(default_factory=lambda: int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")))
+    connect_timeout_ms: int = field(default_factory=lambda: int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")))
+    socket_timeout_ms: Any = field(default_factory=lambda: _optional_int("MONGO_SOCKET_TIMEOUT_MS"))
+
+    def available_compressors(self) -> List[str]:
+        """Configured compressors whose optional packages are installed"""
+        available = []
+        for name in self.compressors:
+            if name not in COMPRESSOR_PACKAGES:
+                print(f"Unknown MongoDB compressor '{name}' ignored")
+            elif COMPRESSOR_PACKAGES[name] and importlib.util.find_spec(COMPRESSOR_PACKAGES[name]) is None:
+                print(f"MongoDB compressor '{name}' skipped: install pymongo[{name}]")
+            else:
+                available.append(name)
+        return available
+
+    def client_options(self) -> Dict[str, Any]:
+        options = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "maxConnecting": self.max_connecting,
+            "readPreference": self.read_preference,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+        }
+        if self.wait_queue_timeout_ms is not None:
+            options["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        if self.socket_timeout_ms is not None:
+            options["socketTimeoutMS"] = self.socket_timeout_ms
+        compressors = self.available_compressors()
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+        return options
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters per server, fed by PyMongo pool events (which
+    arrive on driver threads, hence the lock). `stats()` reports open and
+    checked-out connections, utilization against maxPoolSize, queued checkouts
+    and checkout failures.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict[str, Any]] = {}
+        self._pending_checkouts: Dict[str, List[float]] = {}
+
+    def _server(self, address) -> Dict[str, Any]:
+        key = f"{address[0]}:{address[1]}"
+        if key not in self._servers:
+            self._servers[key] = {
+                "open": 0, "in_use": 0, "peak_in_use": 0, "waiting": 0, "peak_waiting": 0,
+                "created": 0, "closed": 0, "checkouts": 0, "checkout_failures": 0,
+                "pool_cleared": 0, "checkout_wait_ms_total": 0.0, "checkout_wait_ms_max": 0.0
+            }
+            self._pending_checkouts[key] = []
+        return self._servers[key]
+
+    def pool_created(self, event):
+        with self._lock:
+            self._server(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._server(event.address)["pool_cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["open"] += 1
+            server["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["open"] = max(0, server["open"] - 1)
+            server["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            self._pending_checkouts[f"{event.address[0]}:{event.address[1]}"].append(time.perf_counter())
+            server["waiting"] += 1
+            server["peak_waiting"] = max(server["peak_waiting"], server["waiting"])
+
+    def _checkout_finished(self, event) -> Dict[str, Any]:
+        server = self._server(event.address)
+        pending = self._pending_checkouts[f"{event.address[0]}:{event.address[1]}"]
+        # Events carry no request id; pairing with the oldest pending start is close enough for wait times
+        if pending:
+            waited_ms = (time.perf_counter() - pending.pop(0)) * 1000
+            server["checkout_wait_ms_total"] += waited_ms
+            server["checkout_wait_ms_max"] = max(server["checkout_wait_ms_max"], waited_ms)
+        server["waiting"] = max(0, server["waiting"] - 1)
+        return server
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._checkout_finished(event)["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            server = self._checkout_finished(event)
+            server["checkouts"] += 1
+            server["in_use"] += 1
+            server["peak_in_use"] = max(server["peak_in_use"], server["in_use"])
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["in_use"] = max(0, server["in_use"] - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            servers = {}
+            for key, server in self._servers.items():
+                checkouts = server["checkouts"] + server["checkout_failures"]
+                servers[key] = {
+                    **{name: value for name, value in server.items() if name != "checkout_wait_ms_total"},
+                    "utilization": round(server["in_use"] / self.max_pool_size, 3) if self.max_pool_size else None,
+                    "peak_utilization": round(server["peak_in_use"] / self.max_pool_size, 3) if self.max_pool_size else None,
+                    "checkout_wait_ms_avg": round(server["checkout_wait_ms_total"] / checkouts, 2) if checkouts else 0.0,
+                    "checkout_wait_ms_max": round(server["checkout_wait_ms_max"], 2)
+                }
+            return {"max_pool_size": self.max_pool_size, "servers": servers}
+
+
+def document_models() -> List[type]:
+    """Every Beanie document model exported by database.models"""
+    from beanie import Document
+    import database.models as models
+
+    return [
+        model for model in (getattr(models, name) for name in models.__all__)
+        if isinstance(model, type) and issubclass(model, Document)
+    ]
+
+
+# Settings and pool listener for the application client
+mongo_settings = MongoSettings()
+pool_metrics = PoolMetrics(mongo_settings.max_pool_size)
+
+
+def create_client(settings: MongoSettings = None, listeners: List[Any] = None):
+    """Motor client with the configured pool, compression, read preference and timeouts"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    settings = settings or mongo_settings
+    return AsyncIOMotorClient(
+        settings.url,
+        event_listeners=[pool_metrics] if listeners is None else listeners,
+        **settings.client_options()
+    )
+
+
+async def initialize_models(database) -> List[str]:
+    """
+    Register every document model with Beanie; returns the registered model names.
+    If a declared index can't be built (a legacy index with the same keys, or
+    duplicates under a unique index), the problem is reported and the models are
+    registered without building indexes, so the API still starts.
+    """
+    from beanie import init_beanie
+    from pymongo.errors import OperationFailure
+
+    models = document_models()
+    try:
+        await init_beanie(database=database, document_models=models)
+    except OperationFailure as e:
+        if e.code not in INDEX_BUILD_ERRORS:
+            raise
+        print(f"❌ Index build failed ({INDEX_BUILD_ERRORS[e.code]}): {e}")
+        print("   Indexes were not built; queries may scan whole collections until this is fixed.")
+        if e.code == DUPLICATE_KEY:
+            print("   Remove the duplicate documents named above, then restart.")
+        else:
+            print("   Run `python -m database.index_audit --drop-legacy-indexes` (from backend/), then restart.")
+        await init_beanie(database=database, document_models=models, skip_indexes=True)
+    return [model.__name__ for model in models]
@@ -0,0 +1,183 @@
+# database/index_audit.py
+# Index audit for the hot application queries: runs explain() on each known query
+# shape and flags the ones MongoDB answers with a collection scan. Runs from the
+# CLI (and optionally at API startup):
+#
+#   python -m database.index_audit                   (from backend/)
+#   python -m database.index_audit --fail-on-collscan
+#   python -m database.index_audit --drop-legacy-indexes   (one-off migration, then restart the API)
+import argparse
+import asyncio
+import sys
+from typing import Any, Dict, List
+
+# Single-field indexes replaced by the declared compound/unique indexes. They share
+# keys with the new ones (different options), so they must be dropped once with
+# --drop-legacy-indexes before init_beanie can build the replacements.
+LEGACY_INDEXES = {
+    "visa_applications": ["user_id_1"],
+    "comprehensive_visa_applications": ["thread_id_1"],
+}
+
+# Server error codes that mean the index (or its collection) is already gone
+INDEX_NOT_FOUND = 27
+NAMESPACE_NOT_FOUND = 26
+
+# Query shapes issued on every workflow turn; values are placeholders for explain()
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {
+        "name": "active application by user",
+        "collection": "visa_applications",
+        "filter": {"user_id": "audit-user", "status": "in_progress"},
+        "used_by": "workflow_executor, document_processing, visa_applications repository",
+    },
+    {
+        "name": "latest active application by user",
+        "collection": "visa_applications",
+        "filter": {"user_id": "audit-user", "status": "in_progress"},
+        "sort": [("updated_at", -1)],
+        "used_by": "visa_applications repository",
+    },
+    {
+        "name": "comprehensive application by thread",
+        "collection": "comprehensive_visa_applications",
+        "filter": {"thread_id": "audit-thread"},
+        "used_by": "intelligent_workflow_agent, application write buffer",
+    },
+]
+
+
+async def drop_legacy_indexes(database) -> List[str]:
+    """
+    Drop superseded indexes so the declared ones can be built; returns what was dropped.
+    An index another process already dropped is skipped, so reruns are harmless.
+    """
+    from pymongo.errors import OperationFailure
+
+    dropped = []
+    for collection_name, index_names in LEGACY_INDEXES.items():
+        for index_name in index_names:
+            try:
+                await database[collection_name].drop_index(index_name)
+            except OperationFailure as e:
+                if e.code in (INDEX_NOT_FOUND, NAMESPACE_NOT_FOUND):
+                    continue
+                raise
+            dropped.append(f"{collection_name}.{index_name}")
+            print(f"Dropped legacy index {collection_name}.{index_name}")
+    return dropped
+
+
+def _walk_plan(plan: Dict[str, Any], stages: List[str], indexes: List[str]) -> None:
+    if not plan:
+        return
+    if "queryPlan" in plan:  # Slot-based engine explain format
+        plan = plan["queryPlan"]
+    stages.append(plan.get("stage", "?"))
+    if plan.get("indexName"):
+        indexes.append(plan["indexName"])
+    _walk_plan(plan.get("inputStage"), stages, indexes)
+    for child in plan.get("inputStages", []):
+        _walk_plan(child, stages, indexes)
+
+
+async def explain_query(database, query: Dict[str, Any]) -> Dict[str, Any]:
+    cursor = database[query["collection"]].find(query["filter"]).limit(1)
+    if query.get("sort"):
+        cursor = cursor.sort(query["sort"])
+    explanation = await cursor.explain()
+
+    stages: List[str] = []
+    indexes: List[str] = []
+    _walk_plan(explanation.get("queryPlanner", {}).get("winningPlan", {}), stages, indexes)
+    execution = explanation.get("executionStats", {})
+    return {
+        "name": query["name"],
+        "collection": query["collection"],
+        "used_by": query.get("used_by", ""),
+        "stages": stages,
+        "indexes": indexes,
+        "collscan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+        "docs_examined": execution.get("totalDocsExamined"),
+        "keys_examined": execution.get("totalKeysExamined"),
+        "execution_ms": execution.get("executionTimeMillis"),
+    }
+
+
+async def audit(database, queries: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """explain() every hot query shape; results flag collection scans and in-memory sorts"""
+    results = []
+    for query in queries or HOT_QUERIES:
+        try:
+            results.append(await explain_query(database, query))
+        except Exception as e:
+            results.append({"name": query["name"], "collection": query["collection"], "error": str(e)})
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    for result in results:
+        if result.get("error"):
+            print(f"[ERROR]    {result['collection']}: {result['name']} - {result['error']}")
+            continue
+        status = "COLLSCAN" if result["collscan"] else ("SORT" if result["in_memory_sort"] else "ok")
+        index = ", ".join(result["indexes"]) or "no index"
+        print(f"[{status:<8}] {result['collection']}: {result['name']} -> {' > '.join(result['stages'])} ({index})")
+        if result["collscan"]:
+            print(f"           used by: {result['used_by']}")
+
+
+async def run_startup_audit() -> None:
+    """Audit in the background at API startup; problems are logged, never raised"""
+    from database.mongodb import get_database
+
+    try:
+        results = await audit(get_database())
+    except Exception as e:
+        print(f"Index audit failed: {e}")
+        return
+    flagged = [result for result in results if result.get("collscan") or result.get("error")]
+    if flagged:
+        print("Index audit found queries without a usable index:")
+        print_report(flagged)
+    else:
+        print(f"Index audit: all {len(results)} hot queries use an index")
+
+
+async def _drop_legacy_main() -> int:
+    # A plain client: connect_to_mongo would try to build the declared indexes first
+    from database.bootstrap import create_client, mongo_settings
+
+    client = create_client(listeners=[])
+    try:
+        dropped = await drop_legacy_indexes(client[mongo_settings.database_name])
+    finally:
+        client.close()
+    print(f"Dropped {len(dropped)} legacy index(es)" if dropped else "No legacy indexes left to drop")
+    return 0
+
+
+async def _main(fail_on_collscan: bool) -> int:
+    from database.mongodb import close_mongo_connection, connect_to_mongo, get_database
+
+    await connect_to_mongo()
+    try:
+        results = await audit(get_database())
+    finally:
+        await close_mongo_connection()
+    print_report(results)
+    if fail_on_collscan and any(result.get("collscan") or result.get("error") for result in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explain the hot application queries and flag collection scans")
+    parser.add_argument("--fail-on-collscan", action="store_true", help="Exit with status 1 if any query scans a collection")
+    parser.add_argument("--drop-legacy-indexes", action="store_true",
+                        help="Drop the superseded single-field indexes (one-off migration) instead of auditing")
+    args = parser.parse_args()
+    if args.drop_legacy_indexes:
+        sys.exit(asyncio.run(_drop_legacy_main()))
+    sys.exit(asyncio.run(_main(args.fail_on_collscan)))
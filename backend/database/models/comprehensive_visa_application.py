@@ -2,6 +2,7 @@
 # Purpose: Store complete visa application data following workflow JSON structure
 
 from beanie import Document
+from pymongo import ASCENDING, IndexModel
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -131,7 +132,7 @@ class WorkflowProgress(BaseModel):
 class ComprehensiveVisaApplication(Document):
     # Basic identification
     application_id: str = Field(index=True)
-    thread_id: str = Field(index=True)  # Links to conversation
+    thread_id: str  # Links to conversation (one application per thread, unique index)
     user_id: Optional[str] = Field(default=None, index=True)
     
     # Application metadata
@@ -178,6 +179,9 @@ class ComprehensiveVisaApplication(Document):
     
     class Settings:
         collection = "comprehensive_visa_applications"
+        indexes = [
+            IndexModel([("thread_id", ASCENDING)], name="thread_id_unique", unique=True)
+        ]
         
     def update_timestamp(self):
         """Update the updated_at timestamp"""
@@ -1,5 +1,6 @@
 # models/visa_application.py
 from beanie import Document
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -42,7 +43,7 @@ class TravelerData(BaseModel):
 class VisaApplication(Document):
     # Unique identifiers
     visa_application_id: Optional[str] = Field(default=None, index=True)  # Custom format: VA_{user_id}_{date}_{counter}
-    user_id: str = Field(index=True)
+    user_id: str  # Indexed by the (user_id, status, updated_at) compound index
 
     # Status tracking
     status: ApplicationStatus = ApplicationStatus.IN_PROGRESS
@@ -72,6 +73,13 @@ class VisaApplication(Document):
 
     class Settings:
         collection = "visa_applications"
+        indexes = [
+            # Active application per user: {"user_id", "status": "in_progress"}, newest first
+            IndexModel(
+                [("user_id", ASCENDING), ("status", ASCENDING), ("updated_at", DESCENDING)],
+                name="user_status_updated"
+            )
+        ]
 
     def update_timestamp(self):
         """Update the updated_at timestamp"""
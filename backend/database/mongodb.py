@@ -1,7 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie
-import os
 from typing import Optional
+from database.bootstrap import create_client, initialize_models, mongo_settings
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
@@ -17,27 +16,14 @@ async def init_db():
 
 async def connect_to_mongo():
     """Create database connection"""
-    # Get MongoDB URL from environment or use default
-    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-    database_name = os.getenv("DATABASE_NAME", "veazy_db")
+    # Create MongoDB client (pool, compression and timeouts from MONGO_* settings)
+    db.client = create_client()
+    db.database = db.client[mongo_settings.database_name]
     
-    # Create MongoDB client
-    db.client = AsyncIOMotorClient(mongodb_url)
-    db.database = db.client[database_name]
+    # Initialize Beanie with every document model in database.models
+    models = await initialize_models(db.database)
     
-    # Import all models we need
-    from database.models.user import User
-    from database.models.country import Country
-    from database.models.visa_type_selection import VisaTypeSelection
-    from database.models.visa_application import VisaApplication
-
-    # Initialize Beanie with all models
-    await init_beanie(
-        database=db.database,
-        document_models=[User, Country, VisaTypeSelection, VisaApplication]
-    )
-    
-    print(f"Connected to MongoDB database: {database_name}")
+    print(f"Connected to MongoDB database: {mongo_settings.database_name} ({len(models)} models registered)")
 
 async def close_mongo_connection():
     """Close database connection"""
@@ -0,0 +1,7 @@
+# repositories/__init__.py
+from .visa_application_repository import VisaApplicationRepository, visa_applications
+
+__all__ = [
+    "VisaApplicationRepository",
+    "visa_applications"
+]
@@ -0,0 +1,124 @@
+# repositories/visa_application_repository.py
+# Field-level reads and writes for the user's in-progress VisaApplication.
+# Reads project only the fields a caller needs, and writes are single atomic
+# $set/$addToSet/$push updates. An update never rewrites travelers' documents
+# and extracted data it didn't touch, so its size stays flat as applications grow.
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database.models.visa_application import ApplicationStatus, DocumentInfo, TravelerData, VisaApplication
+
+# Enough to pick the primary traveler without loading documents or collected data
+TRAVELER_PROJECTION = {"travelers.traveler_id": 1, "travelers.is_primary_applicant": 1}
+
+
+def traveler_document_update(document_type: str, document: DocumentInfo) -> Dict[str, Any]:
+    """Set one document on the traveler matched by the update filter"""
+    return {"$set": {f"travelers.$.documents.{document_type}": document.dict()}}
+
+
+def collected_data_update(section: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge keys into one collected_data section of the matched traveler"""
+    return {"$set": {f"travelers.$.collected_data.{section}.{key}": value for key, value in data.items()}}
+
+
+def completed_stage_update(stage: str, current_stage: Optional[str] = None) -> Dict[str, Any]:
+    """Add a stage to completed_stages once, optionally moving current_stage"""
+    update: Dict[str, Any] = {"$addToSet": {"workflow_info.completed_stages": stage}}
+    if current_stage is not None:
+        update["$set"] = {"workflow_info.current_stage": current_stage}
+    return update
+
+
+class VisaApplicationRepository:
+    """
+    Active application (status "in_progress") per user. Updates built by the
+    helpers above are merged and sent as one `update_one`; traveler-scoped
+    updates match the traveler by id and use the positional operator.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+
+    def _collection(self):
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            raise RuntimeError("MongoDB is not connected")
+        return database[self.collection_name]
+
+    @staticmethod
+    def _active(user_id: str) -> Dict[str, Any]:
+        return {"user_id": user_id, "status": ApplicationStatus.IN_PROGRESS.value}
+
+    async def find_active(self, user_id: str, projection: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """The user's in-progress application, limited to `projection`"""
+        return await self._collection().find_one(self._active(user_id), projection=projection)
+
+    @staticmethod
+    def _pick_primary(travelers: List[Dict[str, Any]]) -> Optional[int]:
+        for traveler in travelers:
+            if traveler.get("is_primary_applicant"):
+                return traveler["traveler_id"]
+        return travelers[0]["traveler_id"] if travelers else None
+
+    async def primary_traveler_id(self, user_id: str, application: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """
+        Id of the primary traveler (first traveler if none is flagged), creating
+        one if the application has no travelers yet. None if there is no
+        in-progress application.
+        """
+        if application is None or "travelers" not in application:
+            application = await self.find_active(user_id, TRAVELER_PROJECTION)
+        if application is None:
+            return None
+
+        traveler_id = self._pick_primary(application.get("travelers") or [])
+        if traveler_id is not None:
+            return traveler_id
+
+        # Only write while travelers is still missing, null or empty so concurrent
+        # callers can't add two primaries; $set because $push fails on a null field
+        traveler = TravelerData(traveler_id=1, is_primary_applicant=True)
+        result = await self._collection().update_one(
+            {**self._active(user_id), "travelers": {"$in": [None, []]}},
+            {"$set": {"travelers": [traveler.dict()], "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            return traveler.traveler_id
+
+        # Someone else added a traveler (or the application left in_progress): read once more
+        application = await self.find_active(user_id, TRAVELER_PROJECTION)
+        traveler_id = self._pick_primary(application.get("travelers") or []) if application else None
+        if traveler_id is None and application is not None:
+            print(f"Could not create a primary traveler for {user_id}: travelers is {application.get('travelers')!r}")
+        return traveler_id
+
+    async def update(self, user_id: str, *updates: Dict[str, Any], traveler_id: Optional[int] = None) -> bool:
+        """Apply several field updates in one write; returns False if nothing matched"""
+        merged: Dict[str, Dict[str, Any]] = {"$set": {"updated_at": datetime.utcnow()}}
+        for update in updates:
+            for operator, fields in update.items():
+                merged.setdefault(operator, {}).update(fields)
+
+        query = self._active(user_id)
+        if traveler_id is not None:
+            query["travelers.traveler_id"] = traveler_id
+        result = await self._collection().update_one(query, merged)
+        return result.matched_count > 0
+
+    async def set_traveler_document(self, user_id: str, traveler_id: int, document_type: str, document: DocumentInfo) -> bool:
+        return await self.update(user_id, traveler_document_update(document_type, document), traveler_id=traveler_id)
+
+    async def merge_collected_data(self, user_id: str, traveler_id: int, section: str, data: Dict[str, Any]) -> bool:
+        if not data:
+            return True
+        return await self.update(user_id, collected_data_update(section, data), traveler_id=traveler_id)
+
+    async def push_completed_stage(self, user_id: str, stage: str, current_stage: Optional[str] = None) -> bool:
+        return await self.update(user_id, completed_stage_update(stage, current_stage))
+
+
+# Global repository
+visa_applications = VisaApplicationRepository(VisaApplication.Settings.collection)
@@ -9,6 +9,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from database.models.visa_type_selection import VisaTypeSelection
 from database.models.country import Country
+from services.cache_service import bump_cache_generation
 
 async def export_local_data():
     """Export data from local MongoDB"""
@@ -90,6 +91,9 @@ async def import_to_atlas(atlas_connection_string):
         country = Country(**item)
         await country.save()
     
+    # Drop cached country API responses in every running worker
+    await bump_cache_generation(atlas_db, "countries")
+    
     print(f"✅ Imported {len(visa_data)} visa selections and {len(country_data)} countries to Atlas")
     
     atlas_client.close()
@@ -0,0 +1,152 @@
+# services/application_write_buffer.py
+# Write-behind buffer for field updates on comprehensive visa applications.
+# Fields collected during a workflow are held per application and sent as one
+# targeted `$set` instead of a read-modify-write of the whole document per field.
+# The write upserts, so the first flush of a thread creates its application.
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+APPLICATION_COLLECTION = os.getenv("APPLICATION_COLLECTION", "comprehensive_visa_applications")
+WRITE_FLUSH_INTERVAL = float(os.getenv("APPLICATION_WRITE_FLUSH_INTERVAL", "5"))   # Max seconds a field waits in the buffer
+WRITE_MAX_PENDING = int(os.getenv("APPLICATION_WRITE_MAX_PENDING", "20"))         # Pending fields that trigger a flush
+
+
+class ApplicationWriteBuffer:
+    """
+    Pending `raw_collected_data.<field>` updates keyed by thread id.
+
+    A thread's updates are flushed when its stage advances, when it holds
+    `max_pending` fields, or once the oldest update is `flush_interval` seconds
+    old. `close()` flushes everything and must run on shutdown. A failed flush
+    (an error, or a write that neither matched nor created a document) puts its
+    fields back without overwriting newer values, for the next attempt.
+
+    Writes upsert with `$setOnInsert` for the fields a new application needs:
+    its `application_id` plus whatever the caller passed as `on_insert`.
+    """
+
+    def __init__(self, collection_name: str, flush_interval: float, max_pending: int):
+        self.collection_name = collection_name
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._on_insert: Dict[str, Dict[str, Any]] = {}
+        self._first_pending_at: Dict[str, float] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self.fields_buffered = 0
+        self.writes = 0
+        self.applications_created = 0
+        self.write_errors = 0
+        self.flushes: Dict[str, int] = {}
+
+    def _collection(self):
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            raise RuntimeError("MongoDB is not connected")
+        return database[self.collection_name]
+
+    def _ensure_timer(self) -> None:
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._run_timer())
+
+    async def _run_timer(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            due = [thread_id for thread_id, first_at in list(self._first_pending_at.items())
+                   if time.monotonic() - first_at >= self.flush_interval]
+            for thread_id in due:
+                await self.flush(thread_id, reason="timer")
+
+    async def set_fields(self, thread_id: str, fields: Dict[str, Any], on_insert: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Buffer collected field values for the application linked to `thread_id`.
+        `on_insert` holds top-level fields (user_id, basic_info, ...) written only
+        if the flush creates the application.
+        """
+        if on_insert:
+            self._on_insert.setdefault(thread_id, {}).update(on_insert)
+        pending = self._pending.setdefault(thread_id, {})
+        self._first_pending_at.setdefault(thread_id, time.monotonic())
+        for field_name, value in fields.items():
+            pending[f"raw_collected_data.{field_name}"] = value
+        self.fields_buffered += len(fields)
+
+        if len(pending) >= self.max_pending:
+            await self.flush(thread_id, reason="size")
+        else:
+            self._ensure_timer()
+
+    @staticmethod
+    def new_application_fields(thread_id: str) -> Dict[str, Any]:
+        """Fields a comprehensive application needs when a flush creates it"""
+        return {"application_id": f"APP_{thread_id}", "created_at": datetime.utcnow()}
+
+    async def flush(self, thread_id: str, reason: str = "explicit") -> bool:
+        """Send a thread's pending updates as one upserting `$set`; returns False if the write failed"""
+        changes = self._pending.pop(thread_id, None)
+        on_insert = self._on_insert.pop(thread_id, {})
+        first_at = self._first_pending_at.pop(thread_id, None)
+        if not changes:
+            return True
+
+        try:
+            result = await self._collection().update_one(
+                {"thread_id": thread_id},
+                {
+                    "$set": {**changes, "updated_at": datetime.utcnow()},
+                    "$setOnInsert": {**on_insert, **self.new_application_fields(thread_id)}
+                },
+                upsert=True
+            )
+            if not result.matched_count and result.upserted_id is None:
+                raise RuntimeError("update matched no application and created none")
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Application write error for {thread_id}: {e}")
+            # Keep values buffered after the failed flush ahead of the retried ones
+            newer = self._pending.get(thread_id, {})
+            self._pending[thread_id] = {**changes, **newer}
+            self._on_insert[thread_id] = {**on_insert, **self._on_insert.get(thread_id, {})}
+            self._first_pending_at[thread_id] = first_at or time.monotonic()
+            return False
+
+        self.writes += 1
+        if result.upserted_id is not None:
+            self.applications_created += 1
+        self.flushes[reason] = self.flushes.get(reason, 0) + 1
+        return True
+
+    async def flush_all(self, reason: str) -> None:
+        for thread_id in list(self._pending):
+            await self.flush(thread_id, reason=reason)
+
+    async def close(self) -> None:
+        """Stop the timer and flush every pending update"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush_all(reason="shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_applications": len(self._pending),
+            "pending_fields": sum(len(changes) for changes in self._pending.values()),
+            "fields_buffered": self.fields_buffered,
+            "writes": self.writes,
+            "applications_created": self.applications_created,
+            "write_errors": self.write_errors,
+            "flushes": dict(self.flushes)
+        }
+
+
+# Global buffer
+application_writes = ApplicationWriteBuffer(
+    collection_name=APPLICATION_COLLECTION,
+    flush_interval=WRITE_FLUSH_INTERVAL,
+    max_pending=WRITE_MAX_PENDING
+)
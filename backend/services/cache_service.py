@@ -0,0 +1,222 @@
+# services/cache_service.py
+# Async response cache with single-flight loading, stale-while-revalidate and ETags.
+# Invalidation is shared across worker processes through a generation counter
+# stored in the `cache_generations` collection.
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+GENERATIONS_COLLECTION = "cache_generations"
+
+
+class CacheEntry:
+    """A cached value; its JSON body and ETag are serialized once, on first use"""
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.fetched_at = time.monotonic()
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = json.dumps(self.value, sort_keys=True, default=str).encode("utf-8")
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        return self._etag
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+async def bump_cache_generation(database, namespace: str) -> None:
+    """
+    Invalidate a cache namespace in every worker.
+    Takes a motor database so seeding scripts with their own client can call it too.
+    """
+    await database[GENERATIONS_COLLECTION].update_one(
+        {"_id": namespace},
+        {"$inc": {"generation": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    print(f"Bumped cache generation for '{namespace}'")
+
+
+class AsyncSWRCache:
+    """
+    In-process LRU cache for async loaders.
+
+    - Fresh entries (age < ttl) are served directly.
+    - Stale entries (age < ttl + stale_ttl) are served immediately while one
+      background task refreshes them.
+    - Concurrent misses for the same key share a single load (single-flight).
+    - The shared generation for `namespace` is polled at most every
+      `generation_check_interval` seconds; a change clears this worker's entries.
+    """
+
+    def __init__(self, namespace: str, ttl: int, stale_ttl: int,
+                 max_entries: int = 1024, generation_check_interval: float = 5.0):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.generation_check_interval = generation_check_interval
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._epoch = 0  # Bumped on invalidation so in-flight loads don't store old data
+        self._generation: Optional[int] = None
+        self._last_generation_check = 0.0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        """Return the entry for `key`, loading it with `loader` when missing or expired"""
+        await self._sync_generation()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+
+            if entry.age < self.ttl:
+                self.hits += 1
+                return entry
+
+            if entry.age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._start_load(key, loader, background=True)
+                return entry
+
+        self.misses += 1
+        # Shield the shared load so one cancelled request doesn't cancel it for the others
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every entry, from this worker"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+        self._epoch += 1
+
+    async def invalidate_everywhere(self) -> None:
+        """Drop every entry in this worker and signal the other workers to do the same"""
+        self.invalidate()
+
+        # Imported lazily so seeding scripts can import this module without the app database
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            return
+        try:
+            await bump_cache_generation(database, self.namespace)
+        except Exception as e:
+            print(f"Cache generation bump failed for '{self.namespace}': {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced_loads": self.coalesced,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "generation": self._generation
+        }
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], background: bool = False) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            if not background:
+                self.coalesced += 1
+            return task
+
+        task = asyncio.get_running_loop().create_task(self._load(key, loader))
+        task.add_done_callback(lambda finished: self._load_finished(key, finished, background))
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        # Errors propagate to every waiter, including foreground misses that
+        # coalesced onto a background refresh; stale hits keep the old entry
+        epoch = self._epoch
+        try:
+            entry = CacheEntry(await loader())
+        finally:
+            self._inflight.pop(key, None)
+
+        if epoch == self._epoch:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _load_finished(self, key: Hashable, task: asyncio.Task, background: bool) -> None:
+        if task.cancelled():
+            return
+        # Retrieving the exception also keeps unawaited refresh tasks from logging it as unhandled
+        error = task.exception()
+        if error is not None and background:
+            # Keep serving the stale entry; the next stale hit retries
+            self.refresh_errors += 1
+            print(f"Background refresh failed for {self.namespace}:{key}: {error}")
+
+    async def _sync_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._last_generation_check < self.generation_check_interval:
+            return
+        self._last_generation_check = now
+
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            return
+        try:
+            document = await database[GENERATIONS_COLLECTION].find_one({"_id": self.namespace})
+        except Exception as e:
+            print(f"Cache generation check failed for '{self.namespace}': {e}")
+            return
+
+        generation = document.get("generation", 0) if document else 0
+        if self._generation is not None and generation != self._generation:
+            print(f"Cache generation changed for '{self.namespace}' - invalidating")
+            self.invalidate()
+        self._generation = generation
+
+
+def cached_json_response(request: Request, entry: CacheEntry, max_age: int, stale_while_revalidate: int) -> Response:
+    """Serve a cache entry with ETag/Cache-Control, answering 304 when the client copy is current"""
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in client_etags or entry.etag in client_etags:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,365 @@
+# services/extraction_jobs.py
+# Background document extraction: uploads enqueue a job as soon as the file is
+# stored and a pool of asyncio workers runs the registered extraction handler,
+# so the chat turn only collects (or briefly waits for) the finished result.
+# Job status and results are also written to the `extraction_jobs` collection,
+# so the chat tool and the status endpoints work from any worker process.
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))
+EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", "200"))
+EXTRACTION_JOB_TIMEOUT = float(os.getenv("EXTRACTION_JOB_TIMEOUT", "90"))      # Seconds one extraction may run
+EXTRACTION_MAX_JOBS = int(os.getenv("EXTRACTION_MAX_JOBS", "2000"))            # Finished jobs kept for status lookups
+EXTRACTION_WAIT_TIMEOUT = float(os.getenv("EXTRACTION_WAIT_TIMEOUT", "20"))     # Seconds a chat turn waits for a running job
+EXTRACTION_POLL_INTERVAL = float(os.getenv("EXTRACTION_POLL_INTERVAL", "0.5"))  # Seconds between reads of a job run by another worker
+EXTRACTION_JOB_TTL = int(os.getenv("EXTRACTION_JOB_TTL", str(24 * 3600)))        # Seconds a stored job is kept
+EXTRACTION_JOB_COLLECTION = os.getenv("EXTRACTION_JOB_COLLECTION", "extraction_jobs")
+EXTRACTION_JOB_BACKEND = os.getenv("EXTRACTION_JOB_BACKEND", "mongo").lower()   # "mongo" or "memory"
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+TERMINAL_STATUSES = (COMPLETED, FAILED)
+
+ExtractionHandler = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class ExtractionJob:
+    job_id: str
+    thread_id: str
+    document_type: str
+    file_path: str
+    status: str = QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "thread_id": self.thread_id,
+            "document_type": self.document_type,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "ExtractionJob":
+        return cls(
+            job_id=document["_id"],
+            thread_id=document["thread_id"],
+            document_type=document["document_type"],
+            file_path=document.get("file_path", ""),
+            status=document.get("status", QUEUED),
+            result=document.get("result"),
+            error=document.get("error"),
+            created_at=document.get("created_at", time.time()),
+            started_at=document.get("started_at"),
+            finished_at=document.get("finished_at")
+        )
+
+
+class ExtractionJobQueue:
+    """
+    Bounded queue of extraction jobs served by `workers` asyncio tasks.
+
+    Handlers are registered per document type by the module that owns the
+    extraction logic. Each job has a completion event for `wait()`, and status
+    changes are pushed to `subscribe()` listeners (used for SSE). Jobs run in
+    the worker that received the upload; the latest job per (thread, document
+    type) is indexed so the chat tool can find the upload it refers to.
+
+    With `durable`, every status change is also stored in `collection_name`.
+    `get`, `latest`, `wait` and `subscribe` fall back to that collection (polling
+    every `poll_interval` seconds) for jobs another worker runs, and a job left
+    unfinished past twice its timeout is reported as failed, since its worker is gone.
+    """
+
+    def __init__(self, workers: int, max_queue: int, job_timeout: float, max_jobs: int,
+                 collection_name: str = EXTRACTION_JOB_COLLECTION, durable: bool = True,
+                 poll_interval: float = EXTRACTION_POLL_INTERVAL, ttl: int = EXTRACTION_JOB_TTL):
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.max_jobs = max_jobs
+        self.collection_name = collection_name
+        self.durable = durable
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self._indexes_ready = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_queue = max_queue
+        self._tasks: List[asyncio.Task] = []
+        self._handlers: Dict[str, ExtractionHandler] = {}
+        self._jobs: "OrderedDict[str, ExtractionJob]" = OrderedDict()
+        self._latest: Dict[tuple, str] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.run_ms_total = 0.0
+        self.queue_wait_ms_total = 0.0
+        self.remote_lookups = 0
+        self.store_errors = 0
+
+    async def _collection(self):
+        from database.mongodb import get_database
+
+        database = get_database()
+        if database is None:
+            raise RuntimeError("MongoDB is not connected")
+
+        collection = database[self.collection_name]
+        if not self._indexes_ready:
+            await collection.create_index([("thread_id", 1), ("document_type", 1), ("created_at", -1)])
+            await collection.create_index("updated_at", expireAfterSeconds=self.ttl)
+            self._indexes_ready = True
+        return collection
+
+    async def _store(self, job: ExtractionJob) -> None:
+        """Write the job's current state; errors are logged, the local job keeps working"""
+        if not self.durable:
+            return
+        try:
+            collection = await self._collection()
+            document = {key: value for key, value in job.to_dict().items() if key != "job_id"}
+            await collection.update_one(
+                {"_id": job.job_id},
+                {"$set": {**document, "file_path": job.file_path, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            self.store_errors += 1
+            print(f"Extraction job store error for {job.job_id}: {e}")
+
+    async def _load(self, query: Dict[str, Any]) -> Optional[ExtractionJob]:
+        """Newest stored job matching `query`, or None"""
+        if not self.durable:
+            return None
+        try:
+            collection = await self._collection()
+            document = await collection.find_one(query, sort=[("created_at", -1)])
+        except Exception as e:
+            self.store_errors += 1
+            print(f"Extraction job read error for {query}: {e}")
+            return None
+        if not document:
+            return None
+
+        self.remote_lookups += 1
+        job = ExtractionJob.from_document(document)
+        if job.status not in TERMINAL_STATUSES and time.time() - job.created_at > self.job_timeout * 2:
+            job.status = FAILED
+            job.error = "abandoned: the worker running it stopped"
+        return job
+
+    def register_handler(self, document_type: str, handler: ExtractionHandler) -> None:
+        self._handlers[document_type] = handler
+
+    def handles(self, document_type: str) -> bool:
+        return document_type in self._handlers
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        # A job finishing at the same moment can swallow the cancellation inside
+        # asyncio.wait_for, leaving its worker waiting on the queue; cancel again until all stop
+        pending = set(self._tasks)
+        while pending:
+            for task in pending:
+                task.cancel()
+            _, pending = await asyncio.wait(pending, timeout=0.1)
+        self._tasks = []
+
+    async def enqueue(self, thread_id: str, document_type: str, file_path: str) -> Optional[ExtractionJob]:
+        """Queue extraction of an uploaded file; None if no handler exists or the queue is full"""
+        if document_type not in self._handlers:
+            return None
+        self.start()
+
+        if self._queue.full():
+            self.rejected += 1
+            print(f"Extraction queue full, {document_type} for {thread_id} will be extracted inline")
+            return None
+
+        job = ExtractionJob(uuid.uuid4().hex, thread_id, document_type, file_path)
+        # Stored before a worker can pick it up, so the worker's updates always land after this one
+        await self._store(job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up while the job was being stored; failed jobs are extracted inline
+            self.rejected += 1
+            job.status = FAILED
+            job.error = "extraction queue full"
+            await self._store(job)
+            print(f"Extraction queue full, {document_type} for {thread_id} will be extracted inline")
+            return None
+
+        self._jobs[job.job_id] = job
+        self._latest[(thread_id, document_type)] = job.job_id
+        self._done[job.job_id] = asyncio.Event()
+        self.enqueued += 1
+        self._trim()
+        return job
+
+    def is_local(self, job: ExtractionJob) -> bool:
+        return self._jobs.get(job.job_id) is job
+
+    async def get(self, job_id: str) -> Optional[ExtractionJob]:
+        """A job by id, from this worker or the job store"""
+        return self._jobs.get(job_id) or await self._load({"_id": job_id})
+
+    async def latest(self, thread_id: str, document_type: str) -> Optional[ExtractionJob]:
+        """Most recent job for a thread's document type, from this worker or the job store"""
+        job_id = self._latest.get((thread_id, document_type))
+        job = self._jobs.get(job_id) if job_id else None
+        if job is not None:
+            return job
+        return await self._load({"thread_id": thread_id, "document_type": document_type})
+
+    async def wait(self, job: ExtractionJob, timeout: float) -> ExtractionJob:
+        """Wait up to `timeout` seconds for the job to finish; returns it in whatever state it is"""
+        if job.status in TERMINAL_STATUSES:
+            return job
+        if not self.is_local(job):
+            return await self._poll(job, timeout)
+
+        event = self._done.get(job.job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def _poll(self, job: ExtractionJob, timeout: float) -> ExtractionJob:
+        """Re-read a job another worker runs until it finishes or `timeout` passes"""
+        deadline = time.monotonic() + timeout
+        while job.status not in TERMINAL_STATUSES and time.monotonic() < deadline:
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+            job = await self._load({"_id": job.job_id}) or job
+        return job
+
+    async def subscribe(self, job: ExtractionJob) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job's state now and on every change until it finishes"""
+        if not self.is_local(job):
+            snapshot = job.to_dict()
+            yield snapshot
+            while snapshot["status"] not in TERMINAL_STATUSES:
+                job = await self._poll(job, self.poll_interval)
+                if job.to_dict() != snapshot:
+                    snapshot = job.to_dict()
+                    yield snapshot
+            return
+
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job.job_id, []).append(updates)
+        try:
+            snapshot = job.to_dict()
+            yield snapshot
+            while snapshot["status"] not in TERMINAL_STATUSES:
+                snapshot = await updates.get()
+                yield snapshot
+        finally:
+            listeners = self._subscribers.get(job.job_id, [])
+            if updates in listeners:
+                listeners.remove(updates)
+            if not listeners:
+                self._subscribers.pop(job.job_id, None)
+
+    def _publish(self, job: ExtractionJob) -> None:
+        snapshot = job.to_dict()
+        for updates in self._subscribers.get(job.job_id, []):
+            updates.put_nowait(snapshot)
+        if job.status in TERMINAL_STATUSES:
+            event = self._done.pop(job.job_id, None)
+            if event:
+                event.set()
+
+    def _trim(self) -> None:
+        """Forget the oldest finished jobs beyond `max_jobs`"""
+        while len(self._jobs) > self.max_jobs:
+            oldest_id = next((job_id for job_id, job in self._jobs.items() if job.status in TERMINAL_STATUSES), None)
+            if oldest_id is None:
+                return
+            job = self._jobs.pop(oldest_id)
+            if self._latest.get((job.thread_id, job.document_type)) == oldest_id:
+                del self._latest[(job.thread_id, job.document_type)]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ExtractionJob) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        self.queue_wait_ms_total += (job.started_at - job.created_at) * 1000
+        self._publish(job)
+        await self._store(job)
+        try:
+            job.result = await asyncio.wait_for(self._handlers[job.document_type](job.file_path), timeout=self.job_timeout)
+            job.status = COMPLETED
+            self.completed += 1
+        except Exception as e:
+            job.error = f"timed out after {self.job_timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)[:200]
+            job.status = FAILED
+            self.failed += 1
+            print(f"Extraction job {job.job_id} ({job.document_type}) failed: {job.error}")
+        job.finished_at = time.time()
+        self.run_ms_total += (job.finished_at - job.started_at) * 1000
+        # Stored before waiters wake, so a chat turn on another worker sees the result as soon as this one does
+        await self._store(job)
+        self._publish(job)
+        self._trim()
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "workers": len(self._tasks),
+            "handlers": sorted(self._handlers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": sum(1 for job in self._jobs.values() if job.status == RUNNING),
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "remote_lookups": self.remote_lookups,
+            "store_errors": self.store_errors,
+            "avg_queue_wait_ms": round(self.queue_wait_ms_total / finished, 1) if finished else 0.0,
+            "avg_run_ms": round(self.run_ms_total / finished, 1) if finished else 0.0
+        }
+
+
+# Global queue
+extraction_jobs = ExtractionJobQueue(
+    workers=EXTRACTION_WORKERS,
+    max_queue=EXTRACTION_QUEUE_SIZE,
+    job_timeout=EXTRACTION_JOB_TIMEOUT,
+    max_jobs=EXTRACTION_MAX_JOBS,
+    durable=EXTRACTION_JOB_BACKEND == "mongo"
+)
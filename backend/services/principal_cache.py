@@ -0,0 +1,136 @@
+# services/principal_cache.py
+# Short-lived cache of authenticated users keyed by a hash of the bearer token,
+# so repeat requests with the same token skip JWT decoding and the user lookup.
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Read-only copy of the User fields routes read. Cached entries are shared
+    across requests, so they never hold the mutable Beanie document.
+    """
+    user_id: str
+    phone: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    preferred_name: Optional[str] = None
+    verified_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: Any) -> "UserSnapshot":
+        return cls(
+            user_id=str(user.id),
+            phone=user.phone,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            email=user.email,
+            preferred_name=user.preferred_name,
+            verified_at=user.verified_at
+        )
+
+
+@dataclass
+class Principal:
+    """Identity of the caller; `user` is only loaded when claims are not trusted"""
+    user_id: str
+    claims: Dict[str, Any] = field(default_factory=dict)
+    user: Optional[UserSnapshot] = None
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    """
+    LRU cache of token hash -> UserSnapshot.
+
+    Entries live for `ttl` seconds, never past the token's own expiry. Logout and
+    profile changes invalidate every cached token of that user in this worker;
+    other workers pick the change up within `ttl`.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        key = _token_key(token)
+        entry = self._entries.get(key)
+
+        if entry is None or time.monotonic() >= entry["expires_at"]:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry["user"]
+
+    def set(self, token: str, user: UserSnapshot, token_exp: Optional[float] = None) -> None:
+        """Cache a user for a token; `token_exp` is the JWT `exp` claim (epoch seconds)"""
+        lifetime = self.ttl
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+
+        key = _token_key(token)
+        self._entries[key] = {
+            "user": user,
+            "user_id": user.user_id,
+            "expires_at": time.monotonic() + lifetime
+        }
+        self._entries.move_to_end(key)
+        self._tokens_by_user.setdefault(user.user_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached token of a user (login, logout, profile update)"""
+        for key in self._tokens_by_user.pop(user_id, set()):
+            self._entries.pop(key, None)
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry:
+            tokens = self._tokens_by_user.get(entry["user_id"])
+            if tokens:
+                tokens.discard(key)
+                if not tokens:
+                    del self._tokens_by_user[entry["user_id"]]
+
+
+# Create a singleton instance
+principal_cache = PrincipalCache(
+    ttl=int(os.getenv('AUTH_CACHE_TTL', 60)),
+    max_entries=int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000))
+)
@@ -1,27 +1,67 @@
 # services/twilio_service.py
+import asyncio
 import os
+import re
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, List
+from requests.adapters import HTTPAdapter
+from twilio.base.exceptions import TwilioRestException
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
 
+class RoutedTwilioHttpClient(TwilioHttpClient):
+    """Twilio HTTP client that can send every *.twilio.com request to another base URL (e.g. a fake Verify server)"""
+    
+    TWILIO_HOST_PATTERN = re.compile(r"^https://[a-z0-9.-]+\.twilio\.com")
+    
+    def __init__(self, base_url: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip('/') if base_url else None
+    
+    def request(self, method, url, *args, **kwargs):
+        if self.base_url:
+            url = self.TWILIO_HOST_PATTERN.sub(self.base_url, url)
+        return super().request(method, url, *args, **kwargs)
+
+
 class TwilioService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[TwilioHttpClient] = None):
         self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-        self.verify_service_sid = os.getenv('TWILIO_VERIFY_SERVICE_SID')
-        
-        if not all([self.account_sid, self.auth_token]):
-            raise ValueError("Missing Twilio credentials in environment variables")
-        
-        self.client = Client(self.account_sid, self.auth_token)
-        
-        # Create Verify service if not provided
-        if not self.verify_service_sid:
-            self.verify_service_sid = self.create_verify_service()
+        self._verify_service_sid = os.getenv('TWILIO_VERIFY_SERVICE_SID')
+        self._http_client = http_client
+        self._client = None
+        self._init_lock = threading.RLock()
+    
+    @property
+    def configured(self) -> bool:
+        return bool(self.account_sid and self.auth_token)
+    
+    @property
+    def client(self) -> Client:
+        """Twilio client, created on first use so importing this module makes no network calls"""
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    if not self.configured:
+                        raise ValueError("Missing Twilio credentials in environment variables")
+                    self._client = Client(self.account_sid, self.auth_token, http_client=self._http_client)
+        return self._client
+    
+    @property
+    def verify_service_sid(self) -> str:
+        # Create Verify service if not provided (first OTP request only)
+        if not self._verify_service_sid:
+            with self._init_lock:
+                if not self._verify_service_sid:
+                    self._verify_service_sid = self.create_verify_service()
+        return self._verify_service_sid
     
     def create_verify_service(self) -> str:
         """Create a Twilio Verify service"""
@@ -65,7 +105,11 @@ class TwilioService:
             }
     
     def verify_otp(self, phone_number: str, otp_code: str) -> dict:
-        """Verify OTP using Twilio Verify API"""
+        """
+        Verify OTP using Twilio Verify API.
+        `retryable` is True when Twilio gave no definite answer (network error,
+        5xx, rate limit), so the attempt must not count against the user.
+        """
         try:
             verification_check = self.client.verify.v2.services(self.verify_service_sid).verification_checks.create(
                 to=phone_number,
@@ -75,14 +119,23 @@ class TwilioService:
             return {
                 'success': verification_check.status == 'approved',
                 'status': verification_check.status,
-                'phone_number': phone_number
+                'phone_number': phone_number,
+                'retryable': False
             }
             
+        except TwilioRestException as e:
+            return {
+                'success': False,
+                'error': str(e.msg),
+                'phone_number': phone_number,
+                'retryable': e.status >= 500 or e.status == 429
+            }
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
-                'phone_number': phone_number
+                'phone_number': phone_number,
+                'retryable': True
             }
     
     def validate_local_phone(self, local_phone: str, country_code: str) -> bool:
@@ -129,5 +182,61 @@ class TwilioService:
             {'id': 'gb', 'code': '+44', 'name': 'United Kingdom', 'flag': '🇬🇧'},
         ]
 
+
+class AsyncTwilioService(TwilioService):
+    """
+    TwilioService with awaitable Verify calls for async request handlers.
+    
+    The blocking Twilio SDK calls run on a dedicated, bounded thread pool so an SMS
+    round trip never blocks the event loop. HTTP connections are pooled (one slot
+    per worker) and every request has a timeout. TWILIO_API_BASE_URL redirects all
+    Twilio API traffic, which is how load tests point at the fake Verify server.
+    """
+    
+    def __init__(self):
+        self.max_workers = int(os.getenv('TWILIO_MAX_WORKERS', 8))
+        self.timeout = float(os.getenv('TWILIO_TIMEOUT', 10))
+        
+        http_client = RoutedTwilioHttpClient(
+            base_url=os.getenv('TWILIO_API_BASE_URL'),
+            pool_connections=True,
+            timeout=self.timeout
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        http_client.session.mount('https://', adapter)
+        http_client.session.mount('http://', adapter)
+        
+        super().__init__(http_client=http_client)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="twilio")
+    
+    async def asend_otp(self, phone_number: str) -> dict:
+        """Send OTP using Twilio Verify API without blocking the event loop"""
+        return await self._run(self.send_otp, phone_number)
+    
+    async def averify_otp(self, phone_number: str, otp_code: str) -> dict:
+        """Verify OTP using Twilio Verify API without blocking the event loop"""
+        return await self._run(self.verify_otp, phone_number, otp_code)
+    
+    async def _run(self, func, *args) -> dict:
+        loop = asyncio.get_running_loop()
+        try:
+            # Bound the wait too, so a saturated pool can't hold a request forever
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, func, *args),
+                timeout=self.timeout * 2
+            )
+        except asyncio.TimeoutError:
+            # The call keeps running in its thread and may still succeed at Twilio,
+            # so the outcome is unknown rather than a rejection
+            return {
+                'success': False,
+                'error': 'SMS provider timed out',
+                'phone_number': args[0],
+                'retryable': True
+            }
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
 # Create a singleton instance
-twilio_service = TwilioService()
\ No newline at end of file
+twilio_service = AsyncTwilioService()
\ No newline at end of file
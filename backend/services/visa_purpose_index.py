@@ -0,0 +1,201 @@
+# services/visa_purpose_index.py
+# Precompiled purpose -> visa rule index for the visa-details endpoint.
+# Built once per VisaTypeSelection document version; lookups are dictionary hits
+# against pre-ranked rules and pre-built response payloads.
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.models.visa_type_selection import VisaTypeRule, VisaTypeSelection
+from services.cache_service import CacheEntry
+
+# Upper bound on memoized (LRU) lookups for purposes that are not in the rules
+# (the path parameter is free text); declared purposes are always kept
+MAX_MEMOIZED_PURPOSES = 256
+
+
+def normalize_purpose(purpose: str) -> str:
+    return purpose.lower()
+
+
+def _rule_payload(rule: VisaTypeRule) -> Dict[str, Any]:
+    """Response fields for a rule, everything after country/matched_purpose"""
+    payload = {
+        "visa_type": rule.visa_type,
+        "visa_code": rule.visa_code,
+        "priority": rule.priority,
+        "criteria": {
+            "purpose": rule.criteria.purpose,
+            "max_days": rule.criteria.max_days,
+            "min_travellers": rule.criteria.min_travellers,
+            "max_travellers": rule.criteria.max_travellers
+        }
+    }
+
+    # Add enhanced information if available
+    if rule.visa_details:
+        payload["visa_details"] = {
+            "stay_duration": rule.visa_details.stay_duration,
+            "validity_period": rule.visa_details.validity_period,
+            "entry_type": rule.visa_details.entry_type,
+            "processing_time": rule.visa_details.processing_time,
+            "fee_range": rule.visa_details.fee_range,
+            "description": rule.visa_details.description
+        }
+
+    if rule.document_requirements:
+        payload["document_requirements"] = [
+            {
+                "name": doc.name,
+                "description": doc.description,
+                "required": doc.required,
+                "category": doc.category,
+                "notes": doc.notes
+            }
+            for doc in rule.document_requirements
+        ]
+
+    if rule.approval_process:
+        payload["approval_process"] = [
+            {
+                "step_number": step.step_number,
+                "title": step.title,
+                "description": step.description,
+                "estimated_time": step.estimated_time
+            }
+            for step in rule.approval_process
+        ]
+
+    return payload
+
+
+def document_version(selection: VisaTypeSelection) -> Tuple[str, str, str]:
+    """
+    Identity of a selection document's content; a new version means a rebuild.
+    Includes a hash of the rules because the update scripts save() without bumping version.
+    """
+    rules_hash = hashlib.sha1(
+        json.dumps([rule.model_dump() for rule in selection.rules], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return (str(selection.id), selection.version, rules_hash)
+
+
+class PurposeIndex:
+    """
+    Purpose lookup table for one country's VisaTypeSelection.
+
+    Matching and ranking follow the original scoring exactly: +10 per exact
+    purpose match, +5 per substring match either way, plus (10 - priority);
+    the first rule with the highest positive score wins.
+    """
+
+    def __init__(self, selection: VisaTypeSelection):
+        self.version = document_version(selection)
+        self.country_name = selection.country_name
+        self.country_code = selection.country_code
+
+        # (lowercased purposes, priority bonus, response payload) per candidate rule
+        self._rules: List[Tuple[List[str], int, Dict[str, Any]]] = [
+            (
+                [normalize_purpose(p) for p in rule.criteria.purpose],
+                (10 - rule.priority) if rule.priority else 0,
+                _rule_payload(rule)
+            )
+            for rule in selection.rules
+            if rule.criteria and rule.criteria.purpose
+        ]
+
+        # Pre-rank and pre-build every purpose the rules declare
+        declared = [purpose for _, _, payload in self._rules for purpose in payload["criteria"]["purpose"]]
+
+        # Normalized declared purpose -> index of the winning rule (None = no match)
+        self._best_rule: Dict[str, Optional[int]] = {
+            normalize_purpose(purpose): self._rank(normalize_purpose(purpose)) for purpose in declared
+        }
+
+        # Raw declared purpose -> ready-to-serve response; never evicted
+        self._declared_responses: Dict[str, Optional[CacheEntry]] = {
+            purpose: self._build_response(purpose) for purpose in declared
+        }
+
+        # Free-text purposes, least recently used first
+        self._memoized: "OrderedDict[str, Optional[CacheEntry]]" = OrderedDict()
+
+    def response_for(self, purpose: str) -> Optional[CacheEntry]:
+        """Ready response for a purpose, or None when no rule matches"""
+        if purpose in self._declared_responses:
+            return self._declared_responses[purpose]
+
+        if purpose in self._memoized:
+            self._memoized.move_to_end(purpose)
+            return self._memoized[purpose]
+
+        response = self._build_response(purpose)
+        self._memoized[purpose] = response
+        while len(self._memoized) > MAX_MEMOIZED_PURPOSES:
+            self._memoized.popitem(last=False)
+        return response
+
+    def _build_response(self, purpose: str) -> Optional[CacheEntry]:
+        normalized = normalize_purpose(purpose)
+        if normalized in self._best_rule:
+            rule_index = self._best_rule[normalized]
+        else:
+            rule_index = self._rank(normalized)
+
+        if rule_index is None:
+            return None
+
+        return CacheEntry({
+            "country_name": self.country_name,
+            "country_code": self.country_code,
+            "matched_purpose": purpose,
+            **self._rules[rule_index][2]
+        })
+
+    def _rank(self, normalized: str) -> Optional[int]:
+        best_index = None
+        highest_score = 0
+
+        for index, (purposes, priority_bonus, _) in enumerate(self._rules):
+            score = priority_bonus
+            for rule_purpose in purposes:
+                if normalized == rule_purpose:
+                    score += 10  # Exact match
+                elif normalized in rule_purpose or rule_purpose in normalized:
+                    score += 5   # Partial match
+
+            if score > highest_score:
+                highest_score = score
+                best_index = index
+
+        return best_index
+
+
+class PurposeIndexRegistry:
+    """Keeps the latest index per country and rebuilds only when the document version changes"""
+
+    def __init__(self):
+        self._indexes: Dict[str, PurposeIndex] = {}
+        self.builds = 0
+
+    def get_or_build(self, selection: VisaTypeSelection) -> PurposeIndex:
+        current = self._indexes.get(selection.country_code)
+        if current and current.version == document_version(selection):
+            return current
+
+        index = PurposeIndex(selection)
+        self._indexes[selection.country_code] = index
+        self.builds += 1
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "countries": len(self._indexes),
+            "builds": self.builds
+        }
+
+
+# Global registry shared by the countries API
+purpose_indexes = PurposeIndexRegistry()
@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from database.models.country import Country
 from database.models.visa_type_selection import VisaTypeSelection
+from services.cache_service import bump_cache_generation
 
 async def sync_visa_codes():
     """Synchronize visa codes between Country and VisaTypeSelection collections"""
@@ -77,6 +78,9 @@ async def sync_visa_codes():
                     print(f"  Country: {country_codes}")
                     print(f"  Selection: {selection_codes}")
         
+        # Drop cached country API responses in every running worker
+        await bump_cache_generation(database, "countries")
+        
         print("\nVisa codes synchronization completed!")
         
     except Exception as e:
@@ -0,0 +1,11 @@
+# tests/conftest.py
+# Put backend/ (database, services, api) and backend/agent/ (config, tools, agent)
+# on sys.path, matching how the API and the agent import their modules.
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, "agent")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
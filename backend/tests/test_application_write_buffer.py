@@ -0,0 +1,99 @@
+# tests/test_application_write_buffer.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.application_write_buffer import ApplicationWriteBuffer
+
+
+class FakeCollection:
+    """update_one with $set/$setOnInsert and upsert, reporting matched_count/upserted_id like motor"""
+
+    def __init__(self):
+        self.documents = {}
+        self.calls = []
+        self.fail_writes = 0
+        self.ignore_writes = 0
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append((query, update, upsert))
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise ConnectionError("primary stepped down")
+        if self.ignore_writes:
+            # Acknowledged but applied to nothing, e.g. filter and upsert both lost
+            self.ignore_writes -= 1
+            return SimpleNamespace(matched_count=0, upserted_id=None)
+
+        document = self.documents.get(query["thread_id"])
+        upserted_id = None
+        if document is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None)
+            document = self.documents[query["thread_id"]] = {"thread_id": query["thread_id"], **update["$setOnInsert"]}
+            upserted_id = query["thread_id"]
+        for path, value in update["$set"].items():
+            target = document
+            *parents, leaf = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+        return SimpleNamespace(matched_count=0 if upserted_id else 1, upserted_id=upserted_id)
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = ApplicationWriteBuffer("comprehensive_visa_applications", flush_interval=3600, max_pending=10)
+    collection = FakeCollection()
+    monkeypatch.setattr(buffer, "_collection", lambda: collection)
+    buffer.fake = collection
+    return buffer
+
+
+def test_first_flush_creates_the_application_with_insert_fields(buffer):
+    async def scenario():
+        await buffer.set_fields("thread-1", {"full_name": "Ana"}, on_insert={"user_id": "user-1"})
+        await buffer.set_fields("thread-1", {"nationality": "PT"})
+        assert await buffer.flush("thread-1", reason="stage") is True
+        await buffer.close()
+
+    asyncio.run(scenario())
+    stored = buffer.fake.documents["thread-1"]
+    assert stored["raw_collected_data"] == {"full_name": "Ana", "nationality": "PT"}
+    assert stored["user_id"] == "user-1"
+    assert stored["application_id"] == "APP_thread-1"
+    assert len(buffer.fake.calls) == 1
+    assert buffer.stats()["applications_created"] == 1
+
+
+def test_failed_flush_requeues_under_newer_values(buffer):
+    async def scenario():
+        await buffer.set_fields("thread-1", {"full_name": "Ana", "nationality": "PT"}, on_insert={"user_id": "user-1"})
+        buffer.fake.fail_writes = 1
+        assert await buffer.flush("thread-1") is False
+
+        await buffer.set_fields("thread-1", {"full_name": "Ana Maria"})
+        assert await buffer.flush("thread-1") is True
+        await buffer.close()
+
+    asyncio.run(scenario())
+    stored = buffer.fake.documents["thread-1"]
+    assert stored["raw_collected_data"] == {"full_name": "Ana Maria", "nationality": "PT"}
+    assert stored["user_id"] == "user-1"
+    assert buffer.stats()["write_errors"] == 1
+    assert buffer.stats()["pending_fields"] == 0
+
+
+def test_write_that_matches_nothing_counts_as_failure(buffer):
+    async def scenario():
+        await buffer.set_fields("thread-1", {"full_name": "Ana"})
+        buffer.fake.ignore_writes = 1
+        assert await buffer.flush("thread-1") is False
+        assert buffer.stats()["pending_fields"] == 1
+        assert await buffer.flush("thread-1") is True
+        await buffer.close()
+
+    asyncio.run(scenario())
+    assert buffer.fake.documents["thread-1"]["raw_collected_data"] == {"full_name": "Ana"}
+    assert buffer.stats()["writes"] == 1
@@ -0,0 +1,98 @@
+# tests/test_cache_service.py
+import asyncio
+
+import pytest
+
+from services.cache_service import AsyncSWRCache
+
+
+def make_cache(ttl: int = 60, stale_ttl: int = 60) -> AsyncSWRCache:
+    # A huge check interval keeps the generation poll (and its database lookup) out of the tests
+    return AsyncSWRCache("test", ttl=ttl, stale_ttl=stale_ttl, generation_check_interval=1e9)
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = make_cache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"countries": ["Vietnam"]}
+
+        entries = await asyncio.gather(*(cache.get("countries", loader) for _ in range(5)))
+        return cache, calls, entries
+
+    cache, calls, entries = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(entry.value == {"countries": ["Vietnam"]} for entry in entries)
+    assert cache.stats()["coalesced_loads"] == 4
+
+
+def test_stale_entry_is_served_when_refresh_fails():
+    async def scenario():
+        cache = make_cache(ttl=0)
+
+        async def loader():
+            return "old"
+
+        async def failing_loader():
+            raise RuntimeError("database down")
+
+        await cache.get("key", loader)
+        entry = await cache.get("key", failing_loader)
+        await asyncio.sleep(0)
+        return cache, entry
+
+    cache, entry = asyncio.run(scenario())
+    assert entry.value == "old"
+    assert cache.stats()["refresh_errors"] == 1
+
+
+def test_miss_coalesced_onto_failing_refresh_raises_loader_error():
+    async def scenario():
+        cache = make_cache(ttl=0)
+        release = asyncio.Event()
+
+        async def loader():
+            return "old"
+
+        async def failing_loader():
+            await release.wait()
+            raise RuntimeError("database down")
+
+        await cache.get("key", loader)
+        await cache.get("key", failing_loader)  # Stale hit starts the background refresh
+        cache._entries.clear()                   # Entry evicted while the refresh is in flight
+
+        waiter = asyncio.create_task(cache.get("key", failing_loader))
+        await asyncio.sleep(0)
+        release.set()
+        await waiter
+
+    with pytest.raises(RuntimeError, match="database down"):
+        asyncio.run(scenario())
+
+
+def test_not_found_loads_are_not_cached_and_evict_nothing():
+    async def scenario():
+        cache = AsyncSWRCache("test", ttl=60, stale_ttl=60, max_entries=1, generation_check_interval=1e9)
+
+        async def hot_loader():
+            return {"code": "VNM"}
+
+        async def unknown_country():
+            raise LookupError("Country XYZ not found")
+
+        await cache.get("VNM", hot_loader)
+        for _ in range(3):
+            with pytest.raises(LookupError):
+                await cache.get("XYZ", unknown_country)
+        await cache.get("VNM", hot_loader)
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
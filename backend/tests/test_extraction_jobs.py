@@ -0,0 +1,157 @@
+# tests/test_extraction_jobs.py
+import asyncio
+import time
+
+from services.extraction_jobs import COMPLETED, FAILED, RUNNING, ExtractionJobQueue
+
+
+class FakeCollection:
+    """Shared job store: update_one with $set/upsert and find_one with equality filters and a sort"""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def create_index(self, *args, **kwargs):
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"]})
+        document.update(update["$set"])
+
+    async def find_one(self, query, sort=None):
+        matches = [document for document in self.documents.values()
+                   if all(document.get(key) == value for key, value in query.items())]
+        matches.sort(key=lambda document: document["created_at"], reverse=True)
+        return dict(matches[0]) if matches else None
+
+
+def make_queue(collection=None, **kwargs) -> ExtractionJobQueue:
+    settings = {"workers": 1, "max_queue": 10, "job_timeout": 5, "max_jobs": 100,
+                "durable": collection is not None, "poll_interval": 0.01}
+    settings.update(kwargs)
+    queue = ExtractionJobQueue(**settings)
+    if collection is not None:
+        async def fake_collection():
+            return collection
+        queue._collection = fake_collection
+    return queue
+
+
+def test_wait_returns_the_finished_result():
+    async def scenario():
+        queue = make_queue()
+
+        async def extract(file_path):
+            return {"passport_number": "X123"}
+
+        queue.register_handler("passport_bio_page", extract)
+        job = await queue.enqueue("thread-1", "passport_bio_page", "/tmp/p.jpg")
+        job = await queue.wait(await queue.latest("thread-1", "passport_bio_page"), timeout=1)
+        await queue.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == COMPLETED
+    assert job.result == {"passport_number": "X123"}
+
+
+def test_wait_times_out_on_a_slow_job():
+    async def scenario():
+        queue = make_queue()
+        release = asyncio.Event()
+
+        async def slow_extract(file_path):
+            await release.wait()
+            return {}
+
+        queue.register_handler("passport_bio_page", slow_extract)
+        job = await queue.enqueue("thread-1", "passport_bio_page", "/tmp/p.jpg")
+        job = await queue.wait(job, timeout=0.05)
+        status = job.status
+        release.set()
+        await queue.close()
+        return status
+
+    assert asyncio.run(scenario()) == RUNNING
+
+
+def test_failed_or_unqueued_jobs_fall_back_to_inline_extraction():
+    async def scenario():
+        queue = make_queue()
+
+        async def failing_extract(file_path):
+            raise ValueError("unreadable image")
+
+        queue.register_handler("passport_bio_page", failing_extract)
+        assert await queue.enqueue("thread-1", "passport_photo", "/tmp/p.jpg") is None  # No handler
+
+        job = await queue.enqueue("thread-1", "passport_bio_page", "/tmp/p.jpg")
+        job = await queue.wait(job, timeout=1)
+        await queue.close()
+        return job, queue.stats()
+
+    job, stats = asyncio.run(scenario())
+    assert job.status == FAILED and "unreadable image" in job.error
+    assert stats["failed"] == 1
+
+
+def test_full_queue_rejects_the_job():
+    async def scenario():
+        queue = make_queue(max_queue=1)
+        release = asyncio.Event()
+
+        async def slow_extract(file_path):
+            await release.wait()
+            return {}
+
+        queue.register_handler("passport_bio_page", slow_extract)
+        running = await queue.enqueue("thread-1", "passport_bio_page", "/tmp/1.jpg")
+        await asyncio.sleep(0)  # The worker takes the first job
+        queued = await queue.enqueue("thread-2", "passport_bio_page", "/tmp/2.jpg")
+        rejected = await queue.enqueue("thread-3", "passport_bio_page", "/tmp/3.jpg")
+        await queue.close()
+        return running, queued, rejected, queue.stats()
+
+    running, queued, rejected, stats = asyncio.run(scenario())
+    assert running is not None and queued is not None
+    assert rejected is None
+    assert stats["rejected"] == 1
+
+
+def test_job_run_by_another_worker_is_found_and_awaited():
+    collection = FakeCollection()
+
+    async def scenario():
+        uploader, chat_worker = make_queue(collection), make_queue(collection)
+        release = asyncio.Event()
+
+        async def extract(file_path):
+            await release.wait()
+            return {"passport_number": "X123"}
+
+        uploader.register_handler("passport_bio_page", extract)
+        job = await uploader.enqueue("thread-1", "passport_bio_page", "/tmp/p.jpg")
+
+        remote = await chat_worker.latest("thread-1", "passport_bio_page")
+        assert remote.job_id == job.job_id and not chat_worker.is_local(remote)
+        assert (await chat_worker.get(job.job_id)).thread_id == "thread-1"
+
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        remote = await chat_worker.wait(remote, timeout=2)
+        await uploader.close()
+        return remote
+
+    remote = asyncio.run(scenario())
+    assert remote.status == COMPLETED
+    assert remote.result == {"passport_number": "X123"}
+
+
+def test_unfinished_job_of_a_stopped_worker_is_reported_failed():
+    collection = FakeCollection()
+    collection.documents["job-1"] = {
+        "_id": "job-1", "thread_id": "thread-1", "document_type": "passport_bio_page",
+        "status": RUNNING, "created_at": time.time() - 60
+    }
+
+    job = asyncio.run(make_queue(collection).latest("thread-1", "passport_bio_page"))
+    assert job.status == FAILED
@@ -0,0 +1,154 @@
+# tests/test_history.py
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.history import ConversationCompactor
+from agent.thread_store import InMemoryThreadStateBackend, ThreadStateStore
+
+
+def make_compactor(**kwargs) -> ConversationCompactor:
+    settings = {"enabled": True, "max_turns": 6, "max_tokens": 10_000, "keep_recent_turns": 2, "summary_max_words": 50}
+    settings.update(kwargs)
+    return ConversationCompactor(**settings)
+
+
+def conversation(turns: int, reply_chars: int = 40):
+    messages = []
+    for n in range(turns):
+        messages.append(HumanMessage(content=f"question {n}"))
+        messages.append(AIMessage(content="x" * reply_chars))
+    return {"messages": messages}
+
+
+async def fake_summary(previous_summary, older):
+    return f"summary of {len(older)} messages"
+
+
+def make_store() -> ThreadStateStore:
+    return ThreadStateStore(InMemoryThreadStateBackend(max_entries=10, ttl=3600))
+
+
+class RecordingStore(ThreadStateStore):
+    """In-memory store that records what each successful save wrote"""
+
+    def __init__(self):
+        super().__init__(InMemoryThreadStateBackend(max_entries=10, ttl=3600))
+        self.saved = []
+
+    async def save(self, thread_id, state, expected_revision=None):
+        written = await super().save(thread_id, state, expected_revision)
+        if written:
+            self.saved.append((thread_id, len(state["messages"])))
+        return written
+
+
+def test_compacts_after_the_turn_and_saves(monkeypatch):
+    compactor = make_compactor()
+    state = conversation(7)
+    store = RecordingStore()
+
+    async def scenario():
+        await store.save("thread-1", state)
+        store.saved.clear()
+        summarizing = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_summary(previous_summary, older):
+            summarizing.set()
+            await release.wait()
+            return await fake_summary(previous_summary, older)
+
+        monkeypatch.setattr(compactor, "_summarize", slow_summary)
+        compactor.schedule("thread-1", state, store)
+        await summarizing.wait()
+        state["messages"].append(HumanMessage(content="next turn while summarizing"))
+        release.set()
+        await asyncio.gather(*compactor._tasks)
+
+    asyncio.run(scenario())
+    assert state["conversation_summary"] == "summary of 10 messages"
+    assert len(state["messages"]) == 5  # Two kept turns plus the turn added meanwhile
+    assert store.saved == [("thread-1", 5)]
+
+
+def test_window_over_token_budget_does_not_retrigger(monkeypatch):
+    compactor = make_compactor(max_turns=100, max_tokens=100)
+    monkeypatch.setattr(compactor, "_summarize", fake_summary)
+    state = conversation(3, reply_chars=1000)  # Each kept turn alone is ~250 tokens
+
+    async def scenario():
+        compactor.schedule("thread-1", state, make_store())
+        await asyncio.gather(*compactor._tasks)
+
+    asyncio.run(scenario())
+    assert "conversation_summary" not in state
+    assert compactor.stats()["skipped_over_budget_window"] == 1
+
+
+def test_failed_summary_keeps_history(monkeypatch):
+    compactor = make_compactor()
+
+    async def failing_summary(previous_summary, older):
+        return None
+
+    monkeypatch.setattr(compactor, "_summarize", failing_summary)
+    state = conversation(7)
+    store = RecordingStore()
+
+    assert asyncio.run(compactor.compact("thread-1", state, store)) is False
+    assert store.saved == []
+    assert len(state["messages"]) == 14
+    assert compactor.stats()["failures"] == 1
+
+
+def test_turn_saved_by_another_worker_during_summary_is_kept(monkeypatch):
+    compactor = make_compactor()
+    store = make_store()
+    state = conversation(7)
+
+    async def scenario():
+        await store.save("thread-1", state)
+
+        async def summary_while_other_worker_saves(previous_summary, older):
+            # Another worker loads the thread, adds a turn and saves it: the revision moves on
+            other = {**state, "messages": list(state["messages"]) + [
+                HumanMessage(content="turn from another worker"), AIMessage(content="reply")
+            ]}
+            await store.save("thread-1", other)
+            return await fake_summary(previous_summary, older)
+
+        monkeypatch.setattr(compactor, "_summarize", summary_while_other_worker_saves)
+        assert await compactor.compact("thread-1", state, store) is True
+        return await store.get("thread-1")
+
+    stored = asyncio.run(scenario())
+    assert stored["conversation_summary"] == "summary of 10 messages"
+    assert [message.content for message in stored["messages"]][-2:] == ["turn from another worker", "reply"]
+    assert len(stored["messages"]) == 6
+
+
+def test_compaction_is_skipped_when_the_retry_also_conflicts(monkeypatch):
+    compactor = make_compactor()
+    store = make_store()
+    state = conversation(7)
+
+    async def scenario():
+        await store.save("thread-1", state)
+        original_save = store.save
+
+        async def always_newer(thread_id, saved_state, expected_revision=None):
+            if expected_revision is not None:
+                # Someone else wrote first every time
+                await original_save(thread_id, dict(await store.get(thread_id)))
+            return await original_save(thread_id, saved_state, expected_revision)
+
+        monkeypatch.setattr(compactor, "_summarize", fake_summary)
+        monkeypatch.setattr(store, "save", always_newer)
+        assert await compactor.compact("thread-1", state, store) is False
+        return await store.get("thread-1")
+
+    stored = asyncio.run(scenario())
+    assert "conversation_summary" not in stored
+    assert len(stored["messages"]) == 14
+    assert compactor.stats()["skipped_on_conflict"] == 1
@@ -0,0 +1,41 @@
+# tests/test_model_registry.py
+import asyncio
+
+from config.model_registry import ModelRoute
+
+
+def make_route(max_concurrency: int = 2) -> ModelRoute:
+    return ModelRoute(
+        name="extraction", provider="fake", model_name="fake-small", timeout=5,
+        max_concurrency=max_concurrency, max_tokens=256, temperature=0.0, llm=object()
+    )
+
+
+def test_async_slots_limit_concurrency():
+    route = make_route(max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with route.async_slot():
+            peak = max(peak, route.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert route.stats()["calls"] == 6
+
+
+def test_route_built_outside_a_loop_works_in_later_loops():
+    route = make_route()
+
+    async def call():
+        async with route.async_slot():
+            return route.in_flight
+
+    # Each asyncio.run is a new event loop, like uvicorn's loop after import
+    assert asyncio.run(call()) == 1
+    assert asyncio.run(call()) == 1
@@ -0,0 +1,44 @@
+# tests/test_principal_cache.py
+import dataclasses
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.principal_cache import PrincipalCache, UserSnapshot
+
+
+def make_user(user_id: str = "u1"):
+    return SimpleNamespace(
+        id=user_id, phone="+15550100", first_name="Amit", last_name="Singh",
+        email="amit@example.com", preferred_name=None, verified_at=None
+    )
+
+
+def test_cached_snapshot_is_immutable():
+    cache = PrincipalCache(ttl=60, max_entries=10)
+    cache.set("token", UserSnapshot.from_user(make_user()))
+
+    snapshot = cache.get("token")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.first_name = "Changed"
+
+
+def test_invalidate_user_drops_every_token():
+    cache = PrincipalCache(ttl=60, max_entries=10)
+    cache.set("token-a", UserSnapshot.from_user(make_user()))
+    cache.set("token-b", UserSnapshot.from_user(make_user()))
+    cache.set("token-c", UserSnapshot.from_user(make_user("u2")))
+
+    cache.invalidate_user("u1")
+
+    assert cache.get("token-a") is None
+    assert cache.get("token-b") is None
+    assert cache.get("token-c").user_id == "u2"
+
+
+def test_entry_never_outlives_token():
+    cache = PrincipalCache(ttl=60, max_entries=10)
+    cache.set("expired", UserSnapshot.from_user(make_user()), token_exp=time.time() - 1)
+
+    assert cache.get("expired") is None
@@ -0,0 +1,104 @@
+# tests/test_response_cache.py
+import threading
+
+from agent.response_cache import SemanticResponseCache, normalize_question, tokens_match
+
+KNOWLEDGE = "kb-hash"
+
+
+def make_cache(**kwargs) -> SemanticResponseCache:
+    return SemanticResponseCache(max_entries=kwargs.pop("max_entries", 100), ttl=3600, **kwargs)
+
+
+def words(question: str):
+    return normalize_question(question).split()
+
+
+def test_rephrased_question_is_an_exact_hit():
+    cache = make_cache()
+    cache.put("Vietnam", "What documents do I need for a Vietnam visa?", KNOWLEDGE, "passport, photo", 100)
+
+    assert cache.get("Vietnam", "For a Vietnam visa, what documents do I need", KNOWLEDGE) == "passport, photo"
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_typo_and_plural_are_similar_hits():
+    cache = make_cache()
+    cache.put("Vietnam", "processing time for vietnam visa", KNOWLEDGE, "3 working days", 100)
+
+    assert cache.get("Vietnam", "procesing times for vietnam visas", KNOWLEDGE) == "3 working days"
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_extra_content_word_does_not_match():
+    cache = make_cache()
+    cache.put("Vietnam", "processing time for vietnam visa", KNOWLEDGE, "3 working days", 100)
+
+    assert cache.get("Vietnam", "processing time for urgent vietnam visa", KNOWLEDGE) is None
+
+
+def test_different_numbers_do_not_match():
+    assert not tokens_match(words("30 days valid visa"), words("90 days valid visa"), 0.85)
+
+    cache = make_cache()
+    cache.put("Vietnam", "30 days valid visa", KNOWLEDGE, "30-day answer", 100)
+    assert cache.get("Vietnam", "90 days valid visa", KNOWLEDGE) is None
+
+
+def test_negation_does_not_match():
+    assert not tokens_match(words("vietnam visa"), words("not vietnam visa"), 0.85)
+    assert not tokens_match(words("visa on arrival"), words("no visa on arrival"), 0.85)
+    assert not tokens_match(words("can't extend visa"), words("can extend visa"), 0.85)
+
+    cache = make_cache()
+    cache.put("Vietnam", "vietnam visa", KNOWLEDGE, "answer", 100)
+    assert cache.get("Vietnam", "not vietnam visa", KNOWLEDGE) is None
+
+
+def test_questions_with_different_intent_get_different_keys():
+    questions = [
+        "How much is a Vietnam visa?",
+        "Do I need a Vietnam visa?",
+        "What is a Vietnam visa?",
+        "Is there a Vietnam visa?",
+        "How do I get a Vietnam visa?",
+    ]
+    keys = [normalize_question(question) for question in questions]
+    assert len(set(keys)) == len(questions)
+    assert not tokens_match(words(questions[0]), words(questions[1]), 0.85)
+
+    cache = make_cache()
+    cache.put("Vietnam", questions[0], KNOWLEDGE, "25 USD", 100)
+    for question in questions[1:]:
+        assert cache.get("Vietnam", question, KNOWLEDGE) is None
+
+
+def test_other_country_or_knowledge_version_misses():
+    cache = make_cache()
+    cache.put("Vietnam", "vietnam visa fees", KNOWLEDGE, "25 USD", 100)
+
+    assert cache.get("Thailand", "vietnam visa fees", KNOWLEDGE) is None
+    assert cache.get("Vietnam", "vietnam visa fees", "new-hash") is None
+    assert cache.stats()["entries"] == 0  # Knowledge change invalidated Vietnam's answers
+
+
+def test_concurrent_get_and_put():
+    cache = make_cache(max_entries=50)
+    errors = []
+
+    def worker(offset: int):
+        try:
+            for i in range(300):
+                cache.put("Vietnam", f"question {offset} {i} visa", KNOWLEDGE, "answer", 1)
+                cache.get("Vietnam", f"question {offset} {i - 1} visas", KNOWLEDGE)
+        except Exception as e:  # pragma: no cover - only reached on a regression
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.stats()["entries"] <= 50
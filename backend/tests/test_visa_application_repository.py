@@ -0,0 +1,63 @@
+# tests/test_visa_application_repository.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("beanie")
+
+from database.repositories.visa_application_repository import VisaApplicationRepository
+
+
+class FakeCollection:
+    """One in-progress application; update_one understands the primary traveler create filter"""
+
+    def __init__(self, application):
+        self.application = application
+        self.updates = 0
+
+    async def find_one(self, query, projection=None):
+        return dict(self.application) if self.application else None
+
+    async def update_one(self, query, update):
+        self.updates += 1
+        travelers = self.application.get("travelers")
+        if travelers not in query["travelers"]["$in"]:
+            return SimpleNamespace(matched_count=0, modified_count=0)
+        self.application.update(update["$set"])
+        return SimpleNamespace(matched_count=1, modified_count=1)
+
+
+def primary_traveler_id(application, passed=None):
+    repository = VisaApplicationRepository("visa_applications")
+    collection = FakeCollection(application)
+    repository._collection = lambda: collection
+    return asyncio.run(repository.primary_traveler_id("user-1", passed)), collection
+
+
+def test_creates_primary_traveler_when_travelers_is_missing():
+    application = {"user_id": "user-1", "status": "in_progress"}
+    traveler_id, collection = primary_traveler_id(application)
+
+    assert traveler_id == 1
+    assert application["travelers"][0]["is_primary_applicant"] is True
+    assert collection.updates == 1
+
+
+def test_creates_primary_traveler_when_travelers_is_null():
+    application = {"user_id": "user-1", "status": "in_progress", "travelers": None}
+    traveler_id, collection = primary_traveler_id(application)
+
+    assert traveler_id == 1
+    assert len(application["travelers"]) == 1
+    assert collection.updates == 1
+
+
+def test_lost_creation_race_rereads_once():
+    # Read with no travelers, but another request added its primary before our write
+    stored = {"user_id": "user-1", "status": "in_progress",
+              "travelers": [{"traveler_id": 2, "is_primary_applicant": True}]}
+    traveler_id, collection = primary_traveler_id(stored, passed={"travelers": []})
+
+    assert traveler_id == 2
+    assert collection.updates == 1
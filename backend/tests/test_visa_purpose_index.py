@@ -0,0 +1,56 @@
+# tests/test_visa_purpose_index.py
+from types import SimpleNamespace
+
+from services import visa_purpose_index
+from services.visa_purpose_index import PurposeIndex
+
+
+def make_rule(purposes, visa_type, priority=1):
+    rule = SimpleNamespace(
+        visa_type=visa_type,
+        visa_code=visa_type.upper(),
+        priority=priority,
+        criteria=SimpleNamespace(purpose=purposes, max_days=30, min_travellers=1, max_travellers=10),
+        visa_details=None,
+        document_requirements=[],
+        approval_process=[]
+    )
+    rule.model_dump = lambda: {"visa_type": visa_type, "purposes": purposes, "priority": priority}
+    return rule
+
+
+def make_index() -> PurposeIndex:
+    selection = SimpleNamespace(
+        id="selection-1",
+        version="1",
+        country_name="Vietnam",
+        country_code="VN",
+        rules=[make_rule(["Tourism", "Leisure"], "tourist"), make_rule(["Business"], "business", priority=2)]
+    )
+    return PurposeIndex(selection)
+
+
+def test_declared_purposes_survive_free_text_churn(monkeypatch):
+    monkeypatch.setattr(visa_purpose_index, "MAX_MEMOIZED_PURPOSES", 2)
+    index = make_index()
+    declared = index.response_for("Tourism")
+
+    for n in range(10):
+        index.response_for(f"tourism trip {n}")
+
+    assert index.response_for("Tourism") is declared
+    assert declared.value["visa_type"] == "tourist"
+
+
+def test_free_text_memo_is_lru(monkeypatch):
+    monkeypatch.setattr(visa_purpose_index, "MAX_MEMOIZED_PURPOSES", 2)
+    index = make_index()
+
+    first = index.response_for("business meeting")
+    index.response_for("leisure travel")
+    assert index.response_for("business meeting") is first  # Hit refreshes it
+
+    index.response_for("tourism with family")               # Evicts "leisure travel", not the refreshed entry
+    assert index.response_for("business meeting") is first
+    assert list(index._memoized) == ["tourism with family", "business meeting"]
+
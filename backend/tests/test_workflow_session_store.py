@@ -0,0 +1,109 @@
+# tests/test_workflow_session_store.py
+import asyncio
+
+import pytest
+
+from agents.workflow_session_store import WorkflowSession, WorkflowSessionStore
+
+
+class FakeCollection:
+    """Just enough of a motor collection for find_one_and_update with $set/$inc and upsert"""
+
+    def __init__(self, fail_writes: int = 0):
+        self.documents = {}
+        self.fail_writes = fail_writes
+        self.updates = []
+
+    async def create_index(self, *args, **kwargs):
+        return None
+
+    async def find_one_and_update(self, query, update, upsert=False, projection=None, return_document=None):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise ConnectionError("primary stepped down")
+        self.updates.append(update)
+        document = self.documents.get(query["_id"])
+        if document is None:
+            if not upsert:
+                return None
+            document = self.documents[query["_id"]] = {"_id": query["_id"], "revision": 0}
+        for path, value in update["$set"].items():
+            target = document
+            *parents, leaf = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+        document["revision"] += update["$inc"]["revision"]
+        return {"revision": document["revision"]}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = WorkflowSessionStore("workflow_sessions", max_entries=10, cache_ttl=60, ttl=3600)
+    collection = FakeCollection()
+
+    async def fake_collection():
+        return collection
+
+    monkeypatch.setattr(store, "_collection", fake_collection)
+    store.fake = collection
+    return store
+
+
+def test_failed_save_keeps_changes_for_the_next_save(store):
+    async def scenario():
+        session = await store.create("thread-1", {"country": "Vietnam"})
+        session.set_collected("full_name", "Ana")
+        store.fake.fail_writes = 1
+        assert await store.save(session) is False
+
+        session.set_collected("full_name", "Ana Maria")   # Newer value wins over the restored one
+        session.set_collected("passport_number", "X123")
+        assert await store.save(session) is True
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.pop_changes() == {}  # Nothing left over for the next save
+    stored = store.fake.documents["thread-1"]
+    assert stored["collected_data"] == {"full_name": "Ana Maria", "passport_number": "X123"}
+    assert store.stats()["write_errors"] == 1
+
+
+def test_session_whose_create_failed_is_written_in_full(store):
+    async def scenario():
+        store.fake.fail_writes = 1
+        session = await store.create("thread-1", {"country": "Vietnam"})
+        assert session.persisted is False
+
+        session.set_collected("full_name", "Ana")
+        await store.save(session)
+        return session
+
+    session = asyncio.run(scenario())
+    stored = store.fake.documents["thread-1"]
+    assert session.persisted is True
+    assert stored["handoff_data"] == {"country": "Vietnam"}
+    assert stored["collected_data"] == {"full_name": "Ana"}
+
+
+def test_expired_document_is_recreated_in_full(store):
+    async def scenario():
+        session = await store.create("thread-1", {"country": "Vietnam"})
+        store.fake.documents.clear()  # TTL index removed it
+        session.set_collected("full_name", "Ana")
+        await store.save(session)
+
+    asyncio.run(scenario())
+    stored = store.fake.documents["thread-1"]
+    assert stored["handoff_data"] == {"country": "Vietnam"}
+    assert stored["status"] == "initialized"
+
+
+def test_restore_changes_merges_older_under_newer():
+    session = WorkflowSession("thread-1", {"collected_data": {}})
+    session.set_collected("a", 1)
+    failed = session.pop_changes()
+    session.set_collected("a", 2)
+    session.restore_changes(failed)
+    assert session.pop_changes() == {"collected_data.a": 2}
+
@@ -2,6 +2,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from database.models.country import Country
+from services.cache_service import bump_cache_generation
 
 async def update_countries():
     """Update countries to have exactly 4: Thailand, Vietnam, UAE, Indonesia"""
@@ -72,6 +73,9 @@ async def update_countries():
             print(f"  Supported visas: {country.supported_visas}")
             print()
         
+        # Drop cached country API responses in every running worker
+        await bump_cache_generation(database, "countries")
+        
         print("Countries updated successfully!")
         
     except Exception as e:
@@ -3,6 +3,7 @@ import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from database.models.visa_type_selection import VisaTypeSelection, VisaDetails, DocumentRequirement, ProcessStep
+from services.cache_service import bump_cache_generation
 
 async def update_visa_enhanced_data():
     """Update existing visa type selection data with enhanced information"""
@@ -207,6 +208,9 @@ async def update_visa_enhanced_data():
         await selection.save()
         print(f"  ✅ Updated {selection.country_name} with enhanced data")
     
+    # Drop cached country API responses in every running worker
+    await bump_cache_generation(db, "countries")
+    
     print(f"\n🎉 Successfully updated {len(selections)} visa type selections with enhanced data!")
     client.close()
 
@@ -104,12 +104,14 @@ export default function ChatInterface({ isOpen, onClose, initialContext }: ChatI
 
       if (reader) {
         let currentAiMessage: Message | null = null;
+        let buffer = '';
         while (true) {
           const { done, value } = await reader.read();
-          if (done) break;
 
-          const chunk = decoder.decode(value);
-          const lines = chunk.split('\n');
+          // A frame can span reads - keep the trailing partial line until the rest arrives
+          buffer += done ? decoder.decode() : decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = done ? '' : lines.pop() ?? '';
 
           for (const line of lines) {
             if (line.startsWith('data: ')) {
@@ -141,6 +143,8 @@ export default function ChatInterface({ isOpen, onClose, initialContext }: ChatI
               }
             }
           }
+
+          if (done) break;
         }
       }
 
@@ -279,12 +283,14 @@ export default function ChatInterface({ isOpen, onClose, initialContext }: ChatI
 
           if (reader) {
             let currentAiMessage: Message | null = null;
+            let buffer = '';
             while (true) {
               const { done, value } = await reader.read();
-              if (done) break;
 
-              const chunk = decoder.decode(value);
-              const lines = chunk.split('\n');
+              // A frame can span reads - keep the trailing partial line until the rest arrives
+              buffer += done ? decoder.decode() : decoder.decode(value, { stream: true });
+              const lines = buffer.split('\n');
+              buffer = done ? '' : lines.pop() ?? '';
 
               for (const line of lines) {
                 if (line.startsWith('data: ')) {
@@ -316,6 +322,8 @@ export default function ChatInterface({ isOpen, onClose, initialContext }: ChatI
                   }
                 }
               }
+
+              if (done) break;
             }
           }
 